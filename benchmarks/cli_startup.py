@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure the startup time of the ``distro`` command line tool.
+
+Each invocation runs ``python -m distro`` in a fresh interpreter. The
+interpreter startup alone (``python -c pass``) is measured as a reference.
+Use ``--compare-with`` to point at the ``src`` directory of another checkout
+(e.g. a ``git worktree`` of an older release) to compare both versions::
+
+    git worktree add /tmp/distro-old v1.9.0
+    python benchmarks/cli_startup.py --compare-with /tmp/distro-old/src
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+ROOT_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "tests",
+    "resources",
+    "cli",
+    "fedora30",
+)
+
+INVOCATIONS = {
+    "no args": [],
+    "--json": ["--json"],
+    "--root-dir": ["--root-dir", ROOT_DIR],
+    "--root-dir --json": ["--root-dir", ROOT_DIR, "--json"],
+}
+
+
+def run(command: List[str], src_dir: Optional[str], repeat: int) -> float:
+    """Return the median wall clock time of *command*, in milliseconds."""
+    env = dict(os.environ)
+    if src_dir is not None:
+        env["PYTHONPATH"] = src_dir
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--compare-with",
+        metavar="SRC_DIR",
+        help="src directory of another distro checkout to compare against",
+    )
+    args = parser.parse_args()
+
+    trees: Dict[str, str] = {"current": os.path.abspath(SRC_DIR)}
+    if args.compare_with:
+        trees["baseline"] = os.path.abspath(args.compare_with)
+
+    interpreter = run([sys.executable, "-c", "pass"], None, args.repeat)
+    print(f"interpreter startup: {interpreter:7.2f} ms")
+    for label, argv in INVOCATIONS.items():
+        results = {
+            name: run([sys.executable, "-m", "distro", *argv], src, args.repeat)
+            for name, src in trees.items()
+        }
+        line = f"{label:<20} " + "  ".join(
+            f"{name}: {ms:7.2f} ms (+{ms - interpreter:6.2f})"
+            for name, ms in results.items()
+        )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
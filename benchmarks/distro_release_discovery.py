@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the discovery of distro release files in synthetic ``etc``
+directories of various sizes: ``os.listdir()`` with an ``os.path.isfile()``
+call for every entry, as done before, against the ``os.scandir()`` based
+discovery that only checks the file type of entries with matching names.
+
+Each directory holds two distro release files, a few directories and
+symbolic links like a real ``/etc``, and plain files for the rest.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from typing import Callable, List
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE, "src"))
+
+from distro.distro import (  # noqa: E402
+    _DISTRO_RELEASE_BASENAME_PATTERN,
+    _DISTRO_RELEASE_IGNORE_BASENAMES,
+    _distro_release_candidates,
+)
+
+
+def listdir_candidates(etc_dir: str) -> List[str]:
+    """The discovery of distro release files before os.scandir() was used."""
+    basenames = [
+        basename
+        for basename in os.listdir(etc_dir)
+        if basename not in _DISTRO_RELEASE_IGNORE_BASENAMES
+        and os.path.isfile(os.path.join(etc_dir, basename))
+    ]
+    basenames.sort()
+    return [
+        basename
+        for basename in basenames
+        if _DISTRO_RELEASE_BASENAME_PATTERN.match(basename)
+    ]
+
+
+def make_etc_dir(etc_dir: str, entries: int) -> None:
+    os.mkdir(etc_dir)
+    for name in ("centos-release", "redhat-release", "os-release", "lsb-release"):
+        with open(os.path.join(etc_dir, name), "w") as fp:
+            fp.write("CentOS Linux release 7.1.1503 (Core)\n")
+    os.symlink("centos-release", os.path.join(etc_dir, "system-release"))
+    for i in range(entries - 5):
+        path = os.path.join(etc_dir, f"entry{i}")
+        if i % 10 == 0:
+            os.mkdir(path + ".d")
+        elif i % 10 == 1:
+            os.symlink("os-release", path + ".conf")
+        else:
+            with open(path + ".conf", "w") as fp:
+                fp.write("\n")
+
+
+def bench(discover: Callable[[str], List[str]], etc_dir: str, number: int) -> float:
+    """Return the time of one discovery, in microseconds."""
+    seconds = min(timeit.repeat(lambda: discover(etc_dir), number=number, repeat=5))
+    return seconds / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for entries in (50, 400, 2000):
+            etc_dir = os.path.join(tmp_dir, f"etc{entries}")
+            make_etc_dir(etc_dir, entries)
+            assert listdir_candidates(etc_dir) == _distro_release_candidates(etc_dir)
+            listdir_us = bench(listdir_candidates, etc_dir, args.number)
+            scandir_us = bench(_distro_release_candidates, etc_dir, args.number)
+            print(f"{entries} entries:")
+            print(f"  listdir + isfile: {listdir_us:8.1f} us")
+            print(f"  scandir:          {scandir_us:8.1f} us")
+            print(f"  speedup: {listdir_us / scandir_us:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare reading the data source files of the test corpus through text mode
+file objects with the bytes-level readers of distro.
+"""
+
+import glob
+import os
+import sys
+import timeit
+from typing import Callable, List
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DISTROS_DIR = os.path.join(BASE, "tests", "resources", "distros")
+sys.path.insert(0, os.path.join(BASE, "src"))
+
+from distro.distro import _decode_text, _first_line, _read_file  # noqa: E402
+
+
+def text_read(path: str) -> str:
+    with open(path, encoding="utf-8") as fp:
+        return fp.read()
+
+
+def text_readline(path: str) -> str:
+    with open(path, encoding="utf-8") as fp:
+        return fp.readline()
+
+
+def bytes_read(path: str) -> str:
+    return _decode_text(_read_file(path), "utf-8")
+
+
+def bytes_readline(path: str) -> str:
+    return _first_line(_read_file(path)).decode("utf-8")
+
+
+def corpus(*patterns: str) -> List[str]:
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob.glob(os.path.join(DISTROS_DIR, pattern)))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def bench(paths: List[str], read: Callable[[str], str]) -> float:
+    """Return the time to read one file, in microseconds."""
+    number = 50
+    seconds = min(
+        timeit.repeat(lambda: [read(path) for path in paths], number=number, repeat=5)
+    )
+    return seconds / number / len(paths) * 1e6
+
+
+def main() -> None:
+    cases = (
+        (
+            "os-release (whole file)",
+            corpus("*/etc/os-release", "*/usr/lib/os-release"),
+            text_read,
+            bytes_read,
+        ),
+        (
+            "release files (first line)",
+            corpus("*/etc/*-release", "*/etc/*_version"),
+            text_readline,
+            bytes_readline,
+        ),
+    )
+    for label, paths, text, raw in cases:
+        text_us = bench(paths, text)
+        raw_us = bench(paths, raw)
+        print(
+            f"{label:<28} {len(paths):3} files  text mode: {text_us:6.2f} us"
+            f"  bytes: {raw_us:6.2f} us  speedup: {text_us / raw_us:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
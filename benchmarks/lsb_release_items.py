@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare running ``lsb_release -a`` with running it only for the information
+items that the os-release file does not provide, when calling
+:meth:`LinuxDistribution.info`.
+
+A stub ``lsb_release`` command is put on ``PATH``. It emulates the cost of
+computing the list of LSB modules, which is part of ``-a`` and which real
+implementations get from the package database, by sleeping for
+``--modules-delay`` milliseconds.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from typing import Callable, Dict
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE, "src"))
+
+from distro import distro  # noqa: E402
+
+LSB_RELEASE = """#!/bin/sh
+for option in "$@"; do
+  case $option in
+    -a) set -- -v -i -d -r -c ;;
+  esac
+done
+for option in "$@"; do
+  case $option in
+    -v) {sleep} {modules_delay}; echo "No LSB modules are available." ;;
+    -i) echo "Distributor ID:	Debian" ;;
+    -d) echo "Description:	Debian GNU/Linux trixie/sid" ;;
+    -r) echo "Release:	n/a" ;;
+    -c) echo "Codename:	trixie" ;;
+  esac
+done
+"""
+
+OS_RELEASE_FILES = {
+    # Debian testing does not define VERSION_ID.
+    "os-release without VERSION_ID": """\
+PRETTY_NAME="Debian GNU/Linux trixie/sid"
+NAME="Debian GNU/Linux"
+VERSION_CODENAME=trixie
+ID=debian
+""",
+    "no os-release": None,
+}
+
+
+def bench(call: Callable[[], object], number: int) -> float:
+    """Return the time of one call, in milliseconds."""
+    return min(timeit.repeat(call, number=number, repeat=5)) / number * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules-delay", type=float, default=50.0)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lsb_release = os.path.join(tmp_dir, "lsb_release")
+        with open(lsb_release, "w") as fp:
+            fp.write(
+                LSB_RELEASE.format(
+                    sleep=distro._find_command("sleep"),
+                    modules_delay=args.modules_delay / 1e3,
+                )
+            )
+        os.chmod(lsb_release, 0o755)
+        os.environ["PATH"] = tmp_dir
+        with open(os.path.join(tmp_dir, "debian_version"), "w") as fp:
+            fp.write("trixie/sid\n")
+        distro._UNIXCONFDIR = tmp_dir
+
+        for label, content in OS_RELEASE_FILES.items():
+            os_release_file = os.path.join(tmp_dir, "os-release")
+            if content is None:
+                os_release_file += ".missing"
+            else:
+                with open(os_release_file, "w") as fp:
+                    fp.write(content)
+            kwargs: Dict[str, object] = dict(
+                include_lsb=True,
+                include_uname=False,
+                include_oslevel=False,
+                os_release_file=os_release_file,
+                distro_release_file=os.path.join(tmp_dir, "missing-release"),
+            )
+
+            def items() -> distro.InfoDict:
+                return distro.LinuxDistribution(**kwargs).info()  # type: ignore
+
+            def all_items() -> distro.InfoDict:
+                # Resolving the whole data source runs lsb_release -a.
+                _distro = distro.LinuxDistribution(**kwargs)  # type: ignore
+                _distro.lsb_release_info()
+                return _distro.info()
+
+            assert items() == all_items()
+            items_ms = bench(items, args.number)
+            all_ms = bench(all_items, args.number)
+            print(f"{label}: {items()}")
+            print(f"  lsb_release -a: {all_ms:7.2f} ms")
+            print(f"  items only:     {items_ms:7.2f} ms")
+            print(f"  speedup: {all_ms / items_ms:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the os-release word splitting with the former shlex based one, over
+the os-release files of the test corpus.
+"""
+
+import glob
+import io
+import os
+import shlex
+import sys
+import timeit
+from typing import List
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DISTROS_DIR = os.path.join(BASE, "tests", "resources", "distros")
+sys.path.insert(0, os.path.join(BASE, "src"))
+
+from distro.distro import _split_os_release_content  # noqa: E402
+
+
+def shlex_split(content: str) -> List[str]:
+    lexer = shlex.shlex(io.StringIO(content), posix=True)
+    lexer.whitespace_split = True
+    return list(lexer)
+
+
+def main() -> None:
+    contents = []
+    for pattern in ("*/etc/os-release", "*/usr/lib/os-release"):
+        for path in sorted(glob.glob(os.path.join(DISTROS_DIR, pattern))):
+            with open(path, encoding="utf-8") as fp:
+                contents.append(fp.read())
+    size = sum(len(content) for content in contents)
+    print(f"{len(contents)} os-release files, {size} characters")
+
+    number = 20
+    results = {}
+    splitters = (("shlex", shlex_split), ("single pass", _split_os_release_content))
+    for name, split in splitters:
+        seconds = min(
+            timeit.repeat(
+                lambda: [split(content) for content in contents],
+                number=number,
+                repeat=5,
+            )
+        )
+        results[name] = seconds / number / len(contents) * 1e6
+        print(f"{name:<12} {results[name]:8.2f} us per file")
+    print(f"speedup: {results['shlex'] / results['single pass']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
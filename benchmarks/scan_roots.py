@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare detecting the OS distributions of many root directories in a Python
+loop of ``LinuxDistribution(root_dir=root).info()`` calls against
+:func:`distro.scan_roots` with various numbers of worker threads and worker
+processes.
+
+The root directories are ``--copies`` copies of the ``tests/resources/distros``
+corpus in a temporary directory (or in ``--dir``, e.g. on a network file
+system, where the threads overlap the latency of the file system). With a
+warm page cache, the parsing of the files dominates, which only processes
+run in parallel.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE, "src"))
+
+from distro import distro  # noqa: E402
+
+DISTROS_DIR = os.path.join(BASE, "tests", "resources", "distros")
+
+
+def make_roots(tmp_dir: str, copies: int) -> List[str]:
+    roots = []
+    for i in range(copies):
+        copy_dir = os.path.join(tmp_dir, f"copy{i}")
+        shutil.copytree(DISTROS_DIR, copy_dir, symlinks=True)
+        roots.extend(
+            os.path.join(copy_dir, dist)
+            for dist in sorted(os.listdir(copy_dir))
+            if dist != "__shared__"
+        )
+    return roots
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--dir", default=None)
+    parser.add_argument("--chunksize", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        roots = make_roots(tmp_dir, args.copies)
+
+        start = time.perf_counter()
+        expected = [
+            (root, distro.LinuxDistribution(root_dir=root).info()) for root in roots
+        ]
+        loop_s = time.perf_counter() - start
+        print(f"{len(roots)} roots:")
+        print(f"  loop:        {len(roots) / loop_s:8.0f} roots/s")
+
+        for pool in ("thread", "process"):
+            for workers in args.workers:
+                start = time.perf_counter()
+                results = list(
+                    distro.scan_roots(
+                        roots, workers=workers, pool=pool, chunksize=args.chunksize
+                    )
+                )
+                scan_s = time.perf_counter() - start
+                assert results == expected
+                print(
+                    f"  {pool:7s} x{workers:2d}: {len(roots) / scan_s:8.0f} roots/s"
+                    f" ({loop_s / scan_s:.2f}x)"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare detecting the OS distribution of a root file system archive by
+extracting it and using ``LinuxDistribution(root_dir=...)``, against
+:meth:`LinuxDistribution.from_tar`, which reads the archive without
+extracting it, and with ``assume_sorted=True`` only reads it up to the data
+source files.
+
+The archive holds the ``centos7`` root directory of the test corpus, and
+``--size`` MB of incompressible files under ``usr/share`` and ``var``, like
+the bulk of a container image.
+"""
+
+import argparse
+import os
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Callable
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE, "src"))
+
+from distro import distro  # noqa: E402
+
+ROOT_DIR = os.path.join(BASE, "tests", "resources", "distros", "centos7")
+
+
+def make_archive(archive: str, mode: str, size: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for directory in ("usr/share", "var"):
+            os.makedirs(os.path.join(tmp_dir, directory))
+            for i in range(size // 2):
+                with open(os.path.join(tmp_dir, directory, f"file{i}"), "wb") as fp:
+                    fp.write(os.urandom(1 << 20))
+        with tarfile.open(archive, mode=mode) as tar:
+            # Members are added in sorted order, like container image builders.
+            for name in sorted(os.listdir(ROOT_DIR)):
+                tar.add(os.path.join(ROOT_DIR, name), arcname=name)
+            tar.add(os.path.join(tmp_dir, "usr"), arcname="usr")
+            tar.add(os.path.join(tmp_dir, "var"), arcname="var")
+
+
+def bench(call: Callable[[], object], number: int) -> float:
+    """Return the best time of a call, in milliseconds."""
+    times = []
+    for _ in range(number):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=50)
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in ("w", "w:gz", "w:xz"):
+            archive = os.path.join(tmp_dir, "root.tar")
+            make_archive(archive, mode, args.size)
+
+            def extract() -> distro.InfoDict:
+                with tempfile.TemporaryDirectory(dir=tmp_dir) as root_dir:
+                    with tarfile.open(archive) as tar:
+                        tar.extractall(root_dir)
+                    return distro.LinuxDistribution(root_dir=root_dir).info()
+
+            def from_tar() -> distro.InfoDict:
+                return distro.LinuxDistribution.from_tar(archive).info()
+
+            def from_tar_sorted() -> distro.InfoDict:
+                return distro.LinuxDistribution.from_tar(
+                    archive, assume_sorted=True
+                ).info()
+
+            assert extract() == from_tar() == from_tar_sorted()
+            extract_ms = bench(extract, args.number)
+            from_tar_ms = bench(from_tar, args.number)
+            sorted_ms = bench(from_tar_sorted, args.number)
+            size_mb = os.path.getsize(archive) / (1 << 20)
+            print(f"{mode} ({size_mb:.0f} MB):")
+            print(f"  extract + root_dir: {extract_ms:9.2f} ms")
+            print(
+                f"  from_tar:           {from_tar_ms:9.2f} ms"
+                f" ({extract_ms / from_tar_ms:.1f}x)"
+            )
+            print(
+                f"  assume_sorted:      {sorted_ms:9.2f} ms"
+                f" ({extract_ms / sorted_ms:.0f}x)"
+            )
+            os.remove(archive)
+
+
+if __name__ == "__main__":
+    main()
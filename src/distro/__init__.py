@@ -1,3 +1,5 @@
+from typing import Any
+
 from .distro import (
     NORMALIZED_DISTRO_ID,
     NORMALIZED_LSB_ID,
@@ -6,6 +8,8 @@ from .distro import (
     __version__,
     build_number,
     codename,
+    command_probes,
+    command_timeout_counts,
     distro_release_attr,
     distro_release_info,
     id,
@@ -19,6 +23,9 @@ from .distro import (
     name,
     os_release_attr,
     os_release_info,
+    scan_image_storage,
+    scan_roots,
+    skipped_sources,
     uname_attr,
     uname_info,
     version,
@@ -32,6 +39,8 @@ __all__ = [
     "LinuxDistribution",
     "build_number",
     "codename",
+    "command_probes",
+    "command_timeout_counts",
     "distro_release_attr",
     "distro_release_info",
     "id",
@@ -45,6 +54,9 @@ __all__ = [
     "name",
     "os_release_attr",
     "os_release_info",
+    "scan_image_storage",
+    "scan_roots",
+    "skipped_sources",
     "uname_attr",
     "uname_info",
     "version",
@@ -52,3 +64,13 @@ __all__ = [
 ]
 
 __version__ = __version__
+
+
+def __getattr__(name: str) -> Any:
+    # The asyncio API is imported on first use, so that importing distro does
+    # not import asyncio.
+    if name == "aio":
+        import importlib
+
+        return importlib.import_module(".aio", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
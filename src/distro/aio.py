@@ -0,0 +1,136 @@
+# Copyright 2015-2021 Nir Cohen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Asynchronous versions of the accessor functions of the ``distro`` package,
+for use in :py:mod:`asyncio` applications.
+
+On first use, the data sources are resolved without blocking the running
+event loop: files are read in the default executor of the event loop, and
+the lsb_release and oslevel commands are run as asyncio subprocesses.
+Concurrent first callers share a single resolution, and later calls return
+without doing any I/O.
+
+For details about the returned information, see the synchronous function of
+the same name in the ``distro`` package.
+"""
+
+from typing import Dict, Tuple
+
+from .distro import InfoDict, LinuxDistribution, _get_distro
+
+__all__ = [
+    "build_number",
+    "codename",
+    "distro_release_attr",
+    "distro_release_info",
+    "id",
+    "info",
+    "like",
+    "lsb_release_attr",
+    "lsb_release_info",
+    "major_version",
+    "minor_version",
+    "name",
+    "os_release_attr",
+    "os_release_info",
+    "version",
+    "version_parts",
+]
+
+
+async def _aget_distro() -> LinuxDistribution:
+    _distro = _get_distro()
+    await _distro._aresolve()
+    return _distro
+
+
+async def id() -> str:
+    """Asynchronous version of :func:`distro.id`."""
+    return (await _aget_distro()).id()
+
+
+async def name(pretty: bool = False) -> str:
+    """Asynchronous version of :func:`distro.name`."""
+    return (await _aget_distro()).name(pretty)
+
+
+async def version(pretty: bool = False, best: bool = False) -> str:
+    """Asynchronous version of :func:`distro.version`."""
+    return (await _aget_distro()).version(pretty, best)
+
+
+async def version_parts(best: bool = False) -> Tuple[str, str, str]:
+    """Asynchronous version of :func:`distro.version_parts`."""
+    return (await _aget_distro()).version_parts(best)
+
+
+async def major_version(best: bool = False) -> str:
+    """Asynchronous version of :func:`distro.major_version`."""
+    return (await _aget_distro()).major_version(best)
+
+
+async def minor_version(best: bool = False) -> str:
+    """Asynchronous version of :func:`distro.minor_version`."""
+    return (await _aget_distro()).minor_version(best)
+
+
+async def build_number(best: bool = False) -> str:
+    """Asynchronous version of :func:`distro.build_number`."""
+    return (await _aget_distro()).build_number(best)
+
+
+async def like() -> str:
+    """Asynchronous version of :func:`distro.like`."""
+    return (await _aget_distro()).like()
+
+
+async def codename() -> str:
+    """Asynchronous version of :func:`distro.codename`."""
+    return (await _aget_distro()).codename()
+
+
+async def info(pretty: bool = False, best: bool = False) -> InfoDict:
+    """Asynchronous version of :func:`distro.info`."""
+    return (await _aget_distro()).info(pretty, best)
+
+
+async def os_release_info() -> Dict[str, str]:
+    """Asynchronous version of :func:`distro.os_release_info`."""
+    return (await _aget_distro()).os_release_info()
+
+
+async def lsb_release_info() -> Dict[str, str]:
+    """Asynchronous version of :func:`distro.lsb_release_info`."""
+    return (await _aget_distro()).lsb_release_info()
+
+
+async def distro_release_info() -> Dict[str, str]:
+    """Asynchronous version of :func:`distro.distro_release_info`."""
+    return (await _aget_distro()).distro_release_info()
+
+
+async def os_release_attr(attribute: str) -> str:
+    """Asynchronous version of :func:`distro.os_release_attr`."""
+    return (await _aget_distro()).os_release_attr(attribute)
+
+
+async def lsb_release_attr(attribute: str) -> str:
+    """Asynchronous version of :func:`distro.lsb_release_attr`."""
+    return (await _aget_distro()).lsb_release_attr(attribute)
+
+
+async def distro_release_attr(attribute: str) -> str:
+    """Asynchronous version of :func:`distro.distro_release_attr`."""
+    return (await _aget_distro()).distro_release_attr(attribute)
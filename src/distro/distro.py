@@ -28,28 +28,41 @@ access to OS distribution information is needed. See `Python issue 1322
 <https://bugs.python.org/issue1322>`_ for more information.
 """
 
-import argparse
-import json
-import logging
+import functools
 import os
+import posixpath
 import re
-import shlex
-import subprocess
 import sys
-import warnings
+import threading
+import time
 from typing import (
+    IO,
+    TYPE_CHECKING,
     Any,
     Callable,
     Dict,
+    FrozenSet,
+    Generator,
+    Generic,
     Iterable,
+    Iterator,
     List,
     Optional,
     Sequence,
+    Set,
     TextIO,
     Tuple,
     Type,
+    TypeVar,
+    Union,
 )
 
+if TYPE_CHECKING:
+    import asyncio
+    import subprocess
+    import tarfile
+    from concurrent.futures import Future
+
 try:
     from typing import TypedDict
 except ImportError:
@@ -73,6 +86,8 @@ class InfoDict(TypedDict):
     codename: str
 
 
+_T = TypeVar("_T")
+
 _UNIXCONFDIR = os.environ.get("UNIXCONFDIR", "/etc")
 _UNIXUSRLIBDIR = os.environ.get("UNIXUSRLIBDIR", "/usr/lib")
 _OS_RELEASE_BASENAME = "os-release"
@@ -120,6 +135,29 @@ _DISTRO_RELEASE_CONTENT_REVERSED_PATTERN = re.compile(
     r"(?:[^)]*\)(.*)\()? *(?:STL )?([\d.+\-a-z]*\d) *(?:esaeler *)?(.+)"
 )
 
+# Pattern for a word of an os-release file that has no escapes and at most one
+# quoted part, at its end
+_OS_RELEASE_SIMPLE_WORD_PATTERN = re.compile(
+    r"""([^ \t\r\n#'"\\]*)(?:"([^"\\]*)"|'([^']*)')?(?=[ \t\r\n]|\Z)"""
+)
+
+# Characters that end an unquoted run of characters in an os-release file
+_OS_RELEASE_UNQUOTED_END_PATTERN = re.compile(r"[ \t\r\n#'\"\\]")
+
+# Characters that end a run of characters within double quotes in an
+# os-release file
+_OS_RELEASE_DOUBLE_QUOTED_END_PATTERN = re.compile(r'["\\]')
+
+# Options of the lsb_release command that output a single information item,
+# and the os-release items that the accessors use instead of the lsb_release
+# information item if they are set, by lsb_release information item.
+_LSB_RELEASE_ITEM_OPTIONS = {
+    "distributor_id": ("-i", "id"),
+    "description": ("-d", "pretty_name"),
+    "release": ("-r", "version_id"),
+    "codename": ("-c", "codename"),
+}
+
 # Pattern for base file name of distro release file
 _DISTRO_RELEASE_BASENAME_PATTERN = re.compile(r"(\w+)[-_](release|version)$")
 
@@ -145,6 +183,16 @@ _DISTRO_RELEASE_BASENAMES = [
     "slackware-version",
 ]
 
+# Base file names of the distro release files of the distributions whose
+# os-release ID differs from the name in their base file name.
+_DISTRO_RELEASE_BASENAMES_BY_OS_RELEASE_ID = {
+    "ol": "oracle-release",
+    "rhel": "redhat-release",
+    "scientific": "sl-release",
+    "slackware": "slackware-version",
+    "sles": "SuSE-release",
+}
+
 # Base file names to be ignored when searching for distro release file
 _DISTRO_RELEASE_IGNORE_BASENAMES = (
     "debian_version",
@@ -159,6 +207,1139 @@ _DISTRO_RELEASE_IGNORE_BASENAMES = (
 )
 
 
+# Format version of the detection cache file, to be bumped whenever the
+# stored entries change in an incompatible way.
+_CACHE_VERSION = 1
+
+
+def _split_os_release_content(content: str) -> List[str]:
+    """
+    Split the content of an os-release file into shell words.
+
+    This implements the subset of the shell syntax that is used by os-release
+    files, in a single pass, and produces exactly the same words as
+    :py:class:`shlex.shlex` in POSIX mode with ``whitespace_split`` enabled:
+
+    * Words are separated by blanks, tabs and line breaks.
+    * ``#`` starts a comment that extends to the end of the line, also in the
+      middle of a word (which it ends).
+    * Single quotes preserve every character up to the closing quote.
+    * Double quotes preserve every character up to the closing quote, except
+      that a backslash escapes a double quote or another backslash.
+    * Outside of quotes, a backslash escapes any character, including a line
+      break, so that a word can continue on the next line.
+    * Quoted strings and unquoted characters that are not separated by blanks
+      form a single word, and a quoted empty string is an empty word.
+
+    Raises:
+
+    * :py:exc:`ValueError`: A quote is not closed, or the content ends with a
+      backslash.
+    """
+    words = []
+    word, pos = _next_os_release_word(content, 0)
+    while word is not None:
+        words.append(word)
+        word, pos = _next_os_release_word(content, pos)
+    return words
+
+
+def _next_os_release_word(content: str, pos: int) -> Tuple[Optional[str], int]:
+    """
+    Return the next shell word of the content of an os-release file, starting
+    at index *pos*, and the index from which to look for the following word.
+
+    The word is ``None`` if there are no more words. See
+    :func:`_split_os_release_content` for the supported syntax.
+    """
+    end = len(content)
+    while pos < end:
+        char = content[pos]
+        if char in " \t\r\n":
+            pos += 1
+        elif char == "#":
+            newline = content.find("\n", pos)
+            pos = end if newline < 0 else newline + 1
+        else:
+            break
+    else:
+        return None, pos
+
+    # Fast path for the usual words, e.g. KEY=value or KEY="value".
+    match = _OS_RELEASE_SIMPLE_WORD_PATTERN.match(content, pos)
+    if match:
+        unquoted, double_quoted, single_quoted = match.groups()
+        return unquoted + (double_quoted or single_quoted or ""), match.end()
+
+    # Otherwise, the word is assembled from its unquoted, quoted and escaped
+    # parts until an unquoted blank or comment.
+    parts = []
+    while pos < end:
+        match = _OS_RELEASE_UNQUOTED_END_PATTERN.search(content, pos)
+        stop = match.start() if match else end
+        if stop > pos:
+            parts.append(content[pos:stop])
+            pos = stop
+        if pos == end:
+            break
+        char = content[pos]
+        if char == "'":
+            pos += 1
+            closing = content.find("'", pos)
+            if closing < 0:
+                raise ValueError("No closing quotation")
+            parts.append(content[pos:closing])
+            pos = closing + 1
+        elif char == '"':
+            pos += 1
+            while True:
+                match = _OS_RELEASE_DOUBLE_QUOTED_END_PATTERN.search(content, pos)
+                if not match:
+                    raise ValueError("No closing quotation")
+                stop = match.start()
+                parts.append(content[pos:stop])
+                if content[stop] == '"':
+                    pos = stop + 1
+                    break
+                if stop + 1 == end:
+                    raise ValueError("No escaped character")
+                escaped = content[stop + 1]
+                # Only a double quote or a backslash can be escaped.
+                parts.append(escaped if escaped in '"\\' else "\\" + escaped)
+                pos = stop + 2
+        elif char == "\\":
+            if pos + 1 == end:
+                raise ValueError("No escaped character")
+            parts.append(content[pos + 1])
+            pos += 2
+        else:
+            if char == "#":
+                newline = content.find("\n", pos)
+                pos = end if newline < 0 else newline + 1
+            else:
+                pos += 1
+            break
+    return "".join(parts), pos
+
+
+class _OSReleaseParser:
+    """
+    Incremental parser of the content of an os-release file.
+
+    The content is only parsed as far as needed to know the final value of the
+    requested keys, which avoids parsing the whole file when only a few keys
+    near its start are used.
+
+    The parser may be used by several threads (see the prefetch parameter of
+    LinuxDistribution), which take turns advancing it.
+    """
+
+    def __init__(self, content: str) -> None:
+        self.content = content
+        self.pos = 0
+        self.done = False
+        #: The raw information items parsed so far, with lower case keys.
+        self.props: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str:
+        """
+        Return the value of a raw information item, parsing only as much of
+        the content as needed.
+        """
+        with self._lock:
+            if key not in self.props or self._may_reassign(key):
+                while not self.done:
+                    key_parsed = self._parse_assignment()
+                    if key_parsed == key and not self._may_reassign(key):
+                        break
+            return self.props.get(key, "")
+
+    def parse_all(self) -> Dict[str, str]:
+        """Return all raw information items, parsing the remaining content."""
+        with self._lock:
+            while not self.done:
+                self._parse_assignment()
+            return self.props
+
+    def _parse_assignment(self) -> Optional[str]:
+        """
+        Parse the next word, and return the key it assigns, if any.
+        """
+        word, self.pos = _next_os_release_word(self.content, self.pos)
+        if word is None:
+            self.done = True
+            return None
+        # At this point, all shell-like parsing has been done (i.e.
+        # comments processed, quotes and backslash escape sequences
+        # processed, multi-line values assembled, trailing newlines
+        # stripped, etc.), so the tokens are now either:
+        # * variable assignments: var=value
+        # * commands or their arguments (not allowed in os-release)
+        # Ignore any tokens that are not variable assignments
+        if "=" not in word:
+            return None
+        k, v = word.split("=", 1)
+        key = k.lower()
+        self.props[key] = v
+        return key
+
+    def _may_reassign(self, key: str) -> bool:
+        """
+        Return whether the unparsed content may assign *key* again.
+
+        This errs on the side of caution: any occurrence of the key name at
+        the start of a word, possibly quoted, and any backslash count.
+        """
+        if self.content.find("\\", self.pos) >= 0:
+            return True
+        pattern = _OS_RELEASE_KEY_PATTERNS.get(key)
+        if pattern is None:
+            pattern = _OS_RELEASE_KEY_PATTERNS[key] = re.compile(
+                r"(?<![^ \t\r\n'\"])['\"]*"
+                + "['\"]*".join(re.escape(char) for char in key)
+                + "['\"]*=",
+                re.IGNORECASE,
+            )
+        return pattern.search(self.content, self.pos) is not None
+
+
+# Patterns matching a possible assignment of an os-release key, by key
+_OS_RELEASE_KEY_PATTERNS: Dict[str, "re.Pattern[str]"] = {}
+
+
+# Size of the reads done by _read_file(), larger than any expected data source
+# file so that it is read by a single call
+_READ_SIZE = 8192
+
+
+# Default maximum number of bytes of a data source file that are used
+_FILE_SIZE_LIMIT = 8192
+
+
+def _read_file(path: str, size: Optional[int] = None) -> bytes:
+    """
+    Return the content of a small file, or its first *size* bytes if *size*
+    is not ``None``.
+
+    The file is read with :func:`os.open` and :func:`os.read`, bypassing the
+    buffering and decoding layers of :func:`open`, which are pure overhead for
+    data source files of a few hundred bytes.
+
+    Raises:
+
+    * :py:exc:`OSError`: The file cannot be opened or read.
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    try:
+        read_size = _READ_SIZE if size is None else min(size, _READ_SIZE)
+        content = os.read(fd, read_size)
+        if len(content) < read_size or size == read_size:
+            # A short read of a regular file means its end was reached.
+            return content
+        chunks = [content]
+        remaining = None if size is None else size - read_size
+        while content and remaining != 0:
+            read_size = _READ_SIZE if remaining is None else min(remaining, _READ_SIZE)
+            content = os.read(fd, read_size)
+            chunks.append(content)
+            if remaining is not None:
+                remaining -= len(content)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def _decode_text(content: bytes, encoding: str) -> str:
+    """
+    Decode the content of a file like :func:`open` in text mode does, i.e.
+    including the translation of universal newlines to ``"\\n"``.
+    """
+    text = content.decode(encoding)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _first_line(content: bytes) -> bytes:
+    """
+    Return the first line of the content of a file, like ``readline()`` of a
+    file opened in text mode, but without decoding it.
+
+    The line break, if any, is returned as ``b"\\n"``.
+    """
+    end = len(content)
+    for separator in (b"\n", b"\r"):
+        index = content.find(separator, 0, end)
+        if index >= 0:
+            end = index
+    if end == len(content):
+        return content
+    return content[:end] + b"\n"
+
+
+def _stat_signature(path: str) -> Optional[List[int]]:
+    """
+    Return the ``[st_dev, st_ino, st_size, st_mtime_ns]`` signature of a file,
+    or ``None`` if it cannot be stat'ed.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _command_search_path() -> List[str]:
+    """Return the directories searched for commands."""
+    return os.environ.get("PATH", os.defpath).split(os.pathsep)
+
+
+def _find_command(name: str) -> Optional[str]:
+    """
+    Return the path name of the executable that running the command *name*
+    would use, or ``None`` if there is no such executable.
+    """
+    for directory in _command_search_path():
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+#: Process-wide results of :func:`_probe_command`, valid for the ``PATH``
+#: stored under the ``None`` key.
+_command_probes: Dict[Optional[str], Optional[str]] = {}
+_command_probes_lock = threading.Lock()
+
+
+def _probe_command(name: str) -> Optional[str]:
+    """
+    Return the path name of the executable of the command *name*, or ``None``
+    if there is no such executable.
+
+    The result is cached for the whole process, so that looking for a command
+    that is not installed does not fork and exec again for every
+    :class:`LinuxDistribution` instance. The cache is discarded when the
+    ``PATH`` environment variable changes.
+    """
+    search_path = os.environ.get("PATH", os.defpath)
+    with _command_probes_lock:
+        if _command_probes.get(None) != search_path:
+            _command_probes.clear()
+            _command_probes[None] = search_path
+        try:
+            return _command_probes[name]
+        except KeyError:
+            return _command_probes.setdefault(name, _find_command(name))
+
+
+#: Process-wide number of times each command was killed because it did not
+#: complete within its timeout, by command name.
+_command_timeout_counts: Dict[str, int] = {}
+_command_timeout_counts_lock = threading.Lock()
+
+
+def _count_command_timeout(name: str) -> None:
+    with _command_timeout_counts_lock:
+        _command_timeout_counts[name] = _command_timeout_counts.get(name, 0) + 1
+
+
+def _kill_process_group(
+    process: Union["subprocess.Popen[bytes]", "asyncio.subprocess.Process"],
+) -> None:
+    """
+    Kill a command process started in a new session, together with all
+    processes it started in its process group.
+    """
+    if not hasattr(os, "killpg"):
+        # Windows
+        process.kill()
+        return
+    import signal
+
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _run_command(
+    name: str, args: Sequence[str], timeout: Optional[float]
+) -> Optional[bytes]:
+    """
+    Run the command *name* with the arguments *args*, and return its
+    standard output.
+
+    ``None`` is returned if the command is not found, returns an error, or
+    does not complete within *timeout* seconds. In the latter case, its
+    process group is killed and reaped, and the timeout is counted.
+    """
+    if _probe_command(name) is None:
+        return None
+    import subprocess
+
+    try:
+        return _command_output(name, args, timeout)
+    except subprocess.TimeoutExpired:
+        return None
+
+
+def _command_output(
+    name: str, args: Sequence[str], timeout: Optional[float]
+) -> Optional[bytes]:
+    """
+    Run the command *name* with the arguments *args*, and return its
+    standard output, or ``None`` if the command is not found or returns an
+    error.
+
+    Raises:
+
+    * :py:exc:`subprocess.TimeoutExpired`: The command did not complete
+      within *timeout* seconds. Its process group is killed and reaped, and
+      the timeout is counted.
+    """
+    path = _probe_command(name)
+    if path is None:
+        return None
+    import subprocess
+
+    if timeout is None:
+        try:
+            return subprocess.check_output((path, *args), stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    try:
+        process = subprocess.Popen(
+            (path, *args),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        return None
+    with process:
+        try:
+            stdout: bytes = process.communicate(timeout=timeout)[0]
+        except subprocess.TimeoutExpired:
+            _kill_process_group(process)
+            process.wait()
+            _count_command_timeout(name)
+            raise
+    if process.returncode:
+        return None
+    return stdout
+
+
+def _distro_release_candidates(etc_dir: str) -> List[str]:
+    """
+    Return the sorted base file names of the files in *etc_dir* that may be
+    distro release files.
+
+    The base file names are matched before checking that they are files, and
+    the file type is taken from the directory entries where the file system
+    provides it, so that only symbolic links and entries of unknown type
+    among the candidates are stat'ed.
+    """
+    basenames = []
+    with os.scandir(etc_dir) as entries:
+        for entry in entries:
+            if (
+                entry.name in _DISTRO_RELEASE_IGNORE_BASENAMES
+                or _DISTRO_RELEASE_BASENAME_PATTERN.match(entry.name) is None
+            ):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            basenames.append(entry.name)
+    # We sort for repeatability in cases where there are multiple distro
+    # specific files; e.g. CentOS, Oracle, Enterprise all containing
+    # `redhat-release` on top of their own.
+    basenames.sort()
+    return basenames
+
+
+class _Files:
+    """
+    Access to the files of the data sources of a :class:`LinuxDistribution`
+    instance, in the file system.
+    """
+
+    def read(self, path: str, size: Optional[int] = None) -> bytes:
+        return _read_file(path, size)
+
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(path)
+
+    def distro_release_candidates(self, etc_dir: str) -> List[str]:
+        return _distro_release_candidates(etc_dir)
+
+
+_FILES = _Files()
+
+
+class _Layer:
+    """
+    The data source files read from a tar archive or a directory, which may
+    be a layer of a layered file system (e.g. of a container image).
+    """
+
+    def __init__(self) -> None:
+        # The first bytes of the data source files, by absolute path names.
+        self.files: Dict[str, bytes] = {}
+        # The targets of the symbolic links among them.
+        self.links: Dict[str, str] = {}
+        # The path names deleted from the lower layers by whiteout files, and
+        # the directories whose content in the lower layers is hidden.
+        self.whiteouts: Set[str] = set()
+        self.opaque_dirs: Set[str] = set()
+
+    def hides(self, path: str) -> bool:
+        """Return whether this layer hides *path* in the lower layers."""
+        if not self.whiteouts and not self.opaque_dirs:
+            return False
+        if path in self.whiteouts:
+            return True
+        while path != "/":
+            path = posixpath.dirname(path)
+            if path in self.whiteouts or path in self.opaque_dirs:
+                return True
+        return False
+
+
+class _LayeredFiles(_Files):
+    """
+    Access to the files of the data sources in the layers of a layered file
+    system (e.g. a container image), held in memory.
+
+    The layers are given from the top one down, as callables reading them,
+    which are passed the path names of the link targets in the upper layers.
+    They are read on demand: a path name is looked up from the top layer
+    down, until a layer has it or hides it with a whiteout, so that lower
+    layers are only read when the upper ones do not settle the lookup.
+    """
+
+    def __init__(self, layers: Iterable[Callable[[Set[str]], _Layer]]) -> None:
+        self._readers = iter(layers)
+        self._layers: List[_Layer] = []
+        # Data sources may be resolved concurrently (see the prefetch
+        # parameter of LinuxDistribution).
+        self._lock = threading.Lock()
+
+    def _layer(self, index: int) -> Optional[_Layer]:
+        with self._lock:
+            while len(self._layers) <= index:
+                read = next(self._readers, None)
+                if read is None:
+                    return None
+                targets = {
+                    target for layer in self._layers for target in layer.links.values()
+                }
+                self._layers.append(read(targets))
+            return self._layers[index]
+
+    def _layers_from_top(self) -> Iterator[_Layer]:
+        index = 0
+        layer = self._layer(index)
+        while layer is not None:
+            yield layer
+            index += 1
+            layer = self._layer(index)
+
+    def _lookup(self, path: str) -> Optional[bytes]:
+        """
+        Return the content of the file *path*, following symbolic links, or
+        ``None`` if there is no such file.
+        """
+        for _ in range(_MAX_SYMLINKS):
+            for layer in self._layers_from_top():
+                if path in layer.files:
+                    return layer.files[path]
+                if path in layer.links:
+                    path = layer.links[path]
+                    break
+                if layer.hides(path):
+                    return None
+            else:  # the loop didn't "break": no layer has the path.
+                return None
+        return None
+
+    def read(self, path: str, size: Optional[int] = None) -> bytes:
+        content = self._lookup(path)
+        if content is None:
+            import errno
+
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+        return content if size is None else content[:size]
+
+    def isfile(self, path: str) -> bool:
+        return self._lookup(path) is not None
+
+    def distro_release_candidates(self, etc_dir: str) -> List[str]:
+        paths = set()
+        upper_layers: List[_Layer] = []
+        for layer in self._layers_from_top():
+            for path in [*layer.files, *layer.links]:
+                if posixpath.dirname(path) == etc_dir and not any(
+                    upper_layer.hides(path) for upper_layer in upper_layers
+                ):
+                    paths.add(path)
+            if etc_dir in layer.opaque_dirs or layer.hides(etc_dir):
+                break
+            upper_layers.append(layer)
+        return sorted(
+            basename
+            for basename in map(posixpath.basename, paths)
+            if basename not in _DISTRO_RELEASE_IGNORE_BASENAMES
+            and _DISTRO_RELEASE_BASENAME_PATTERN.match(basename)
+            and self.isfile(posixpath.join(etc_dir, basename))
+        )
+
+
+# The greatest path, as a tuple of its components, of the data source files,
+# for the detection of the end of the data source files in sorted archives.
+_LAST_DATA_SOURCE_PATH = ("", "usr", "lib", "os-release")
+
+# The maximum number of symbolic links followed to resolve a path name, like
+# the MAXSYMLINKS of Linux.
+_MAX_SYMLINKS = 40
+
+# The base file name prefix of whiteout files, and the base file name of the
+# whiteout files making their directory opaque, in container image layers.
+_WHITEOUT_PREFIX = ".wh."
+_OPAQUE_WHITEOUT = ".wh..wh..opq"
+
+
+def _is_data_source_path(path: str) -> bool:
+    """
+    Return whether the absolute path name *path*, relative to a root
+    directory, may be the path name of a data source file.
+    """
+    directory, basename = posixpath.split(path)
+    return path == "/usr/lib/os-release" or (
+        directory == "/etc"
+        and _DISTRO_RELEASE_BASENAME_PATTERN.match(basename) is not None
+    )
+
+
+def _read_tar_layer(
+    archive: Union[str, IO[bytes]],
+    size: int,
+    targets: Iterable[str] = (),
+    assume_sorted: bool = False,
+) -> _Layer:
+    """
+    Return the first *size* bytes of the data source files in the tar
+    archive *archive* (a path name or a binary file object), by their
+    absolute path names in the archive, with its symbolic links to them,
+    and its whiteout files. The files at the path names *targets* (e.g. the
+    targets of links in upper layers) are read as well.
+
+    The archive is read as a stream, so that it may be compressed and its
+    file object does not need to be seekable. The links are followed to the
+    members that come after them, or that are data source files. If
+    *assume_sorted* is true, the members of the archive are assumed to be
+    sorted by path name, and the archive is not read further once a member
+    comes after the last member that may be needed (unless the members read
+    so far show that it is not sorted). Otherwise, it is read to its end.
+
+    Raises:
+
+    * :py:exc:`tarfile.TarError`: The archive is invalid.
+
+    * :py:exc:`OSError`: The archive cannot be read.
+    """
+    import tarfile
+
+    layer = _Layer()
+    targets = set(targets)
+    # The greatest path, as a tuple of its components, of the members that
+    # may be needed.
+    last_needed_parts = max(
+        [_LAST_DATA_SOURCE_PATH, *(tuple(target.split("/")) for target in targets)]
+    )
+    last_parts: Tuple[str, ...] = ()
+    # Whether the members read so far are sorted, and whether some of them
+    # come before the last member that may be needed.
+    sorted_members = True
+    seen_needed_range = False
+    if isinstance(archive, str):
+        tar = tarfile.open(archive, mode="r|*")
+    else:
+        tar = tarfile.open(fileobj=archive, mode="r|*")
+    with tar:
+        for member in tar:
+            path = posixpath.normpath("/" + member.name)
+            parts = tuple(path.split("/"))
+            sorted_members = sorted_members and parts >= last_parts
+            last_parts = parts
+            if parts > last_needed_parts:
+                if assume_sorted and sorted_members and seen_needed_range:
+                    break
+            else:
+                seen_needed_range = True
+            directory, basename = posixpath.split(path)
+            if basename == _OPAQUE_WHITEOUT:
+                layer.opaque_dirs.add(directory)
+                continue
+            if basename.startswith(_WHITEOUT_PREFIX):
+                whiteout = basename.replace(_WHITEOUT_PREFIX, "", 1)
+                layer.whiteouts.add(posixpath.join(directory, whiteout))
+                continue
+            if not (_is_data_source_path(path) or path in targets):
+                continue
+            if member.issym():
+                target = posixpath.join(directory, member.linkname)
+            elif member.islnk():
+                # The target of a hard link comes before it in the archive.
+                target = posixpath.normpath("/" + member.linkname)
+                if target in layer.files:
+                    layer.files[path] = layer.files[target]
+                continue
+            elif member.isfile():
+                fileobj = tar.extractfile(member)
+                assert fileobj is not None
+                layer.files[path] = fileobj.read(size)
+                continue
+            else:
+                continue
+            target = layer.links[path] = posixpath.normpath(target)
+            targets.add(target)
+            last_needed_parts = max(last_needed_parts, tuple(target.split("/")))
+    return layer
+
+
+# The extended attributes marking opaque directories in the layers of
+# overlay file systems, for privileged and for unprivileged mounts.
+_OVERLAY_OPAQUE_XATTRS = ("trusted.overlay.opaque", "user.overlay.opaque")
+
+
+def _is_opaque_dir(path: str) -> bool:
+    """
+    Return whether the directory *path* of a layer of an overlay file system
+    is opaque, hiding the content of the lower layers.
+    """
+    if os.path.lexists(os.path.join(path, _OPAQUE_WHITEOUT)):
+        return True
+    for name in _OVERLAY_OPAQUE_XATTRS:
+        try:
+            if os.getxattr(path, name, follow_symlinks=False) == b"y":
+                return True
+        except (OSError, AttributeError):
+            # Not set, not supported by the file system, or os.getxattr()
+            # is not available on this platform.
+            pass
+    return False
+
+
+def _read_dir_layer(layer_dir: str, size: int, targets: Iterable[str] = ()) -> _Layer:
+    """
+    Return the first *size* bytes of the data source files in the directory
+    *layer_dir* of a layer of an overlay file system (e.g. the ``diff``
+    directory of a layer of container engine storage), by their absolute
+    path names in the layer, with its symbolic links to them, and its
+    whiteouts. The files at the path names *targets* (e.g. the targets of
+    links in upper layers) are read as well.
+
+    Whiteouts are character devices with device number 0/0, as written by
+    the kernel, or whiteout files as in image layers. Opaque directories are
+    marked by an extended attribute or by an opaque whiteout file.
+
+    The symbolic links of the layer are never followed in the file system
+    of the host: their targets are recorded, and looked up in the layers.
+
+    Raises:
+
+    * :py:exc:`OSError`: A data source file cannot be read.
+    """
+    import stat
+
+    layer = _Layer()
+    # Whether the directories of the layer checked so far are directories,
+    # rather than missing, whited out, or symbolic links.
+    dirs: Dict[str, bool] = {}
+
+    def host_path(path: str) -> str:
+        return os.path.join(layer_dir, path.lstrip("/"))
+
+    def is_dir(path: str) -> bool:
+        if path not in dirs:
+            parent = posixpath.dirname(path)
+            dirs[path] = (path == parent or is_dir(parent)) and check_dir(path)
+        return dirs[path]
+
+    def has_whiteout_file(path: str) -> bool:
+        directory, basename = posixpath.split(path)
+        whiteout = posixpath.join(directory, _WHITEOUT_PREFIX + basename)
+        return os.path.lexists(host_path(whiteout))
+
+    def check_dir(path: str) -> bool:
+        if has_whiteout_file(path):
+            layer.whiteouts.add(path)
+            return False
+        try:
+            st = os.lstat(host_path(path))
+        except OSError:
+            return False
+        if stat.S_ISCHR(st.st_mode) and st.st_rdev == 0:
+            layer.whiteouts.add(path)
+            return False
+        if not stat.S_ISDIR(st.st_mode):
+            return False
+        if _is_opaque_dir(host_path(path)):
+            layer.opaque_dirs.add(path)
+        return True
+
+    def read_entry(path: str) -> None:
+        if not is_dir(posixpath.dirname(path)):
+            return
+        try:
+            st = os.lstat(host_path(path))
+        except OSError:
+            if has_whiteout_file(path):
+                layer.whiteouts.add(path)
+            return
+        if stat.S_ISLNK(st.st_mode):
+            target = os.readlink(host_path(path))
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+            layer.links[path] = target
+            pending.append(target)
+        elif stat.S_ISREG(st.st_mode):
+            layer.files[path] = _read_file(host_path(path), size)
+        elif stat.S_ISCHR(st.st_mode) and st.st_rdev == 0:
+            layer.whiteouts.add(path)
+
+    pending = ["/usr/lib/os-release", *targets]
+    if is_dir("/etc"):
+        with os.scandir(host_path("/etc")) as entries:
+            for entry in entries:
+                if entry.name == _OPAQUE_WHITEOUT:
+                    continue
+                if entry.name.startswith(_WHITEOUT_PREFIX):
+                    whiteout = entry.name.replace(_WHITEOUT_PREFIX, "", 1)
+                    layer.whiteouts.add(posixpath.join("/etc", whiteout))
+                elif _DISTRO_RELEASE_BASENAME_PATTERN.match(entry.name):
+                    pending.append(posixpath.join("/etc", entry.name))
+    # The targets of links are read once, even if links form a cycle.
+    read = set()
+    while pending:
+        path = pending.pop()
+        if path not in read:
+            read.add(path)
+            read_entry(path)
+    return layer
+
+
+# The digests of content addressable blobs, as defined by the OCI image
+# specification.
+_OCI_DIGEST_PATTERN = re.compile(r"([a-z0-9]+(?:[+._-][a-z0-9]+)*):([a-zA-Z0-9=_-]+)$")
+
+_OCI_INDEX_MEDIA_TYPES = (
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+)
+
+
+class _ImageFiles:
+    """
+    The files of a container image, in an OCI image layout or a
+    ``docker save`` archive, which are directories or tar archives.
+    """
+
+    def __init__(self, image: str) -> None:
+        self.image = image
+        # The archive of the image, and its members by normalized path name,
+        # once opened (see _archive()).
+        self._tar: Optional["tarfile.TarFile"] = None
+        self._members: Dict[str, "tarfile.TarInfo"] = {}
+
+    def read(self, name: str, read: Callable[[IO[bytes]], _T]) -> _T:
+        """
+        Return the result of *read* for a binary file object of the file
+        *name* of the image, which is opened for the call only.
+
+        Raises:
+
+        * :py:exc:`ValueError`: *name* is outside of the image.
+
+        * :py:exc:`FileNotFoundError`: The image has no file *name*.
+
+        * :py:exc:`tarfile.TarError`: The image is an invalid archive.
+
+        * :py:exc:`OSError`: The file cannot be read.
+        """
+        path = self._path(name)
+        if os.path.isdir(self.image):
+            with open(os.path.join(self.image, path), "rb") as fp:
+                return read(fp)
+
+        tar = self._archive()
+        member = self._members.get(path)
+        fileobj = None if member is None else tar.extractfile(member)
+        if fileobj is None:
+            import errno
+
+            raise FileNotFoundError(
+                errno.ENOENT, os.strerror(errno.ENOENT), f"{self.image}:{path}"
+            )
+        with fileobj:
+            return read(fileobj)
+
+    def _archive(self) -> "tarfile.TarFile":
+        """
+        Return the archive of the image, opened and indexed on first use.
+
+        The archive stays open for the reads of all the files of the image,
+        so that its members are only listed once, which means decompressing
+        the whole archive if it is compressed. It is closed with this object.
+        The reads of the layers are serialized by :class:`_LayeredFiles`.
+        """
+        if self._tar is None:
+            import tarfile
+            import weakref
+
+            tar = tarfile.open(self.image)
+            weakref.finalize(self, tar.close)
+            # Like TarFile.getmember(), the last member of a name wins.
+            self._members = {posixpath.normpath(member.name): member for member in tar}
+            self._tar = tar
+        return self._tar
+
+    @staticmethod
+    def _path(name: str) -> str:
+        """
+        Return the normalized relative path name of the file *name* of an
+        image.
+
+        Raises:
+
+        * :py:exc:`ValueError`: *name* is outside of the image.
+        """
+        path = posixpath.normpath(name)
+        if path.startswith(("/", "../")) or path == "..":
+            raise ValueError(f"Invalid file name in image: {name!r}")
+        return path
+
+    def read_json(self, name: str) -> Any:
+        import json
+
+        return self.read(name, json.load)
+
+    def layer_names(self) -> List[str]:
+        """
+        Return the names of the files of the layers of the image, from the
+        bottom one up.
+
+        Raises:
+
+        * :py:exc:`ValueError`: The image is invalid.
+
+        * :py:exc:`OSError`: The image cannot be read.
+        """
+        os.stat(self.image)
+        try:
+            try:
+                # docker save archives, including those that are also OCI
+                # image layouts.
+                manifests = self.read_json("manifest.json")
+            except FileNotFoundError:
+                pass
+            else:
+                return [self._path(name) for name in manifests[0]["Layers"]]
+            try:
+                index = self.read_json("index.json")
+            except FileNotFoundError:
+                raise ValueError(
+                    f"Not an OCI image layout nor a docker save archive: {self.image}"
+                )
+            descriptor = self._manifest_descriptor(index)
+            while descriptor.get("mediaType") in _OCI_INDEX_MEDIA_TYPES:
+                index = self.read_json("blobs/" + _digest_path(descriptor["digest"]))
+                descriptor = self._manifest_descriptor(index)
+            manifest = self.read_json("blobs/" + _digest_path(descriptor["digest"]))
+            return [
+                "blobs/" + _digest_path(layer["digest"]) for layer in manifest["layers"]
+            ]
+        except (LookupError, TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid image manifest in {self.image}: {e!r}")
+
+    @staticmethod
+    def _manifest_descriptor(index: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the descriptor of the first manifest of the image index
+        *index*, skipping those that are not images (e.g. attestations).
+        """
+        for descriptor in index["manifests"]:
+            if descriptor.get("platform", {}).get("os") != "unknown":
+                return descriptor  # type: ignore[no-any-return]
+        raise LookupError("no image manifest")
+
+
+def _digest_path(digest: str) -> str:
+    """
+    Return the relative path name of the content addressed by the digest
+    *digest* (e.g. ``sha256/<hex>``), as used by OCI image layouts and by
+    the Docker image database.
+
+    Raises:
+
+    * :py:exc:`ValueError`: *digest* is not a valid digest.
+    """
+    match = _OCI_DIGEST_PATTERN.match(digest)
+    if match is None:
+        raise ValueError(f"Invalid digest: {digest!r}")
+    return f"{match.group(1)}/{match.group(2)}"
+
+
+def _archive_read_size(kwargs: Dict[str, Any]) -> int:
+    """
+    Return the number of bytes of the data source files to read from the
+    archives of an instance created with the keyword arguments *kwargs*,
+    which is one more than their largest size limit.
+
+    Raises:
+
+    * :py:exc:`ValueError`: ``root_dir`` or ``cache_file`` is passed, which
+      are not supported for archives.
+    """
+    for name in ("root_dir", "cache_file"):
+        if kwargs.get(name):
+            raise ValueError(f"{name} is not supported for archives")
+    limits: Dict[str, int] = kwargs.get("file_size_limits") or {}
+    return max([_FILE_SIZE_LIMIT, *limits.values()]) + 1
+
+
+def _is_valid_cache_entry(
+    entry: Dict[str, Any], inputs: Sequence[str], extra: Any
+) -> bool:
+    """
+    Return whether a detection cache entry was stored for the same inputs and
+    extra data, and none of its input files changed since.
+
+    This takes exactly one stat call per input file.
+    """
+    stored_inputs = entry["inputs"]
+    if entry["extra"] != extra or len(stored_inputs) < len(inputs):
+        return False
+    if any(stored[0] != path for stored, path in zip(stored_inputs, inputs)):
+        return False
+    return all(_stat_signature(path) == sig for path, sig in stored_inputs)
+
+
+def _read_cache_file(cache_file: str) -> Dict[str, Any]:
+    """
+    Return the entries of a detection cache file.
+
+    The file is only ever replaced atomically, so it is read without locking.
+    A missing, unreadable or incompatible file results in no entries.
+    """
+    import json
+
+    try:
+        with open(cache_file, encoding="utf-8") as fp:
+            content = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(content, dict) or content.get("version") != _CACHE_VERSION:
+        return {}
+    entries: Dict[str, Any] = content.get("entries", {})
+    return entries
+
+
+def _update_cache_file(cache_file: str, name: str, entry: Dict[str, Any]) -> None:
+    """
+    Store an entry in a detection cache file, keeping the entries stored by
+    other processes.
+
+    The new content is written to a temporary file that then atomically
+    replaces the cache file. Failures are ignored, since the cache is only an
+    optimization.
+    """
+    import json
+
+    # Data sources may be resolved concurrently (see the prefetch parameter
+    # of LinuxDistribution), which must not lose each other's entries.
+    with _cache_file_lock:
+        entries = _read_cache_file(cache_file)
+        entries[name] = entry
+        content = json.dumps({"version": _CACHE_VERSION, "entries": entries})
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+            with open(tmp_file, "w", encoding="utf-8") as fp:
+                fp.write(content)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+
+_cache_file_lock = threading.Lock()
+
+# Serializes the start of the prefetching of data sources.
+_prefetch_lock = threading.Lock()
+
+# Methods resolving the data sources that can be prefetched, by name.
+_PREFETCHABLE_SOURCES: Dict[str, Callable[[Any], Any]] = {}
+
+
+def _prefetchable(f: Callable[[Any], _T]) -> Callable[[Any], _T]:
+    """
+    Decorate the method resolving a data source of LinuxDistribution, so that
+    it waits for the result of the prefetching of the data source, if any,
+    instead of resolving it again.
+    """
+    _PREFETCHABLE_SOURCES[f.__name__] = f
+
+    @functools.wraps(f)
+    def wrapper(self: Any) -> _T:
+        future = self._prefetching.get(f.__name__)
+        if future is None:
+            return f(self)
+        if self._deadline is None:
+            result: _T = future.result()
+            return result
+        from concurrent.futures import TimeoutError
+
+        try:
+            result = future.result(timeout=max(self._deadline - time.monotonic(), 0))
+        except TimeoutError:
+            # Give up on the data source, which is still resolved in the
+            # background for later calls.
+            self._skipped.append(f.__name__[1:])
+            return _SKIPPED_SOURCE_VALUES.get(f.__name__, {})  # type: ignore
+        return result
+
+    return wrapper
+
+
+def _resolve_future(future: "Future[_T]", f: Callable[[Any], _T], arg: Any) -> None:
+    """Set the result of ``f(arg)``, or the exception it raises, to *future*."""
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        result = f(arg)
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        future.set_result(result)
+
+
+# Values of the data sources that could not be resolved within the deadline of
+# a call, by name, if not an empty dictionary.
+_SKIPPED_SOURCE_VALUES = {"_oslevel_info": ""}
+
+
+# Format version of LinuxDistribution.snapshot(), to be bumped whenever the
+# snapshot content changes in an incompatible way.
+_SNAPSHOT_VERSION = 1
+
+
 def linux_distribution(full_distribution_name: bool = True) -> Tuple[str, str, str]:
     """
     .. deprecated:: 1.6.0
@@ -192,6 +1373,8 @@ def linux_distribution(full_distribution_name: bool = True) -> Tuple[str, str, s
     method normalizes the distro ID string to a reliable machine-readable value
     for a number of popular OS distributions.
     """
+    import warnings
+
     warnings.warn(
         "distro.linux_distribution() is deprecated. It should only be used as a "
         "compatibility shim with Python's platform.linux_distribution(). Please use "
@@ -199,7 +1382,7 @@ def linux_distribution(full_distribution_name: bool = True) -> Tuple[str, str, s
         DeprecationWarning,
         stacklevel=2,
     )
-    return _distro.linux_distribution(full_distribution_name)
+    return _get_distro().linux_distribution(full_distribution_name)
 
 
 def id() -> str:
@@ -283,10 +1466,10 @@ def id() -> str:
       command, with ID values that differ from what was previously determined
       from the distro release file name.
     """
-    return _distro.id()
+    return _get_distro().id()
 
 
-def name(pretty: bool = False) -> str:
+def name(pretty: bool = False, deadline: Optional[float] = None) -> str:
     """
     Return the name of the current OS distribution, as a human-readable
     string.
@@ -321,11 +1504,15 @@ def name(pretty: bool = False) -> str:
       - the value of the "<name>" field of the distro release file, appended
         with the value of the pretty version ("<version_id>" and "<codename>"
         fields) of the distro release file, if available.
+
+    For a description of the *deadline* parameter, see :func:`distro.info`.
     """
-    return _distro.name(pretty)
+    return _get_distro().name(pretty, deadline)
 
 
-def version(pretty: bool = False, best: bool = False) -> str:
+def version(
+    pretty: bool = False, best: bool = False, deadline: Optional[float] = None
+) -> str:
     """
     Return the version of the current OS distribution, as a human-readable
     string.
@@ -369,8 +1556,10 @@ def version(pretty: bool = False, best: bool = False) -> str:
     * the version number parsed from the "Description" attribute returned by
       the lsb_release command, if it follows the format of the distro release
       files.
+
+    For a description of the *deadline* parameter, see :func:`distro.info`.
     """
-    return _distro.version(pretty, best)
+    return _get_distro().version(pretty, best, deadline)
 
 
 def version_parts(best: bool = False) -> Tuple[str, str, str]:
@@ -387,7 +1576,7 @@ def version_parts(best: bool = False) -> Tuple[str, str, str]:
     For a description of the *best* parameter, see the :func:`distro.version`
     method.
     """
-    return _distro.version_parts(best)
+    return _get_distro().version_parts(best)
 
 
 def major_version(best: bool = False) -> str:
@@ -400,7 +1589,7 @@ def major_version(best: bool = False) -> str:
     For a description of the *best* parameter, see the :func:`distro.version`
     method.
     """
-    return _distro.major_version(best)
+    return _get_distro().major_version(best)
 
 
 def minor_version(best: bool = False) -> str:
@@ -413,7 +1602,7 @@ def minor_version(best: bool = False) -> str:
     For a description of the *best* parameter, see the :func:`distro.version`
     method.
     """
-    return _distro.minor_version(best)
+    return _get_distro().minor_version(best)
 
 
 def build_number(best: bool = False) -> str:
@@ -426,7 +1615,7 @@ def build_number(best: bool = False) -> str:
     For a description of the *best* parameter, see the :func:`distro.version`
     method.
     """
-    return _distro.build_number(best)
+    return _get_distro().build_number(best)
 
 
 def like() -> str:
@@ -443,10 +1632,10 @@ def like() -> str:
     `os-release man page
     <http://www.freedesktop.org/software/systemd/man/os-release.html>`_.
     """
-    return _distro.like()
+    return _get_distro().like()
 
 
-def codename() -> str:
+def codename(deadline: Optional[float] = None) -> str:
     """
     Return the codename for the release of the current OS distribution,
     as a string.
@@ -466,11 +1655,15 @@ def codename() -> str:
       command,
 
     * the value of the "<codename>" field of the distro release file.
+
+    For a description of the *deadline* parameter, see :func:`distro.info`.
     """
-    return _distro.codename()
+    return _get_distro().codename(deadline)
 
 
-def info(pretty: bool = False, best: bool = False) -> InfoDict:
+def info(
+    pretty: bool = False, best: bool = False, deadline: Optional[float] = None
+) -> InfoDict:
     """
     Return certain machine-readable information items about the current OS
     distribution in a dictionary, as shown in the following example:
@@ -510,8 +1703,29 @@ def info(pretty: bool = False, best: bool = False) -> InfoDict:
 
     For a description of the *pretty* and *best* parameters, see the
     :func:`distro.version` method.
+
+    If *deadline* is not ``None``, the data sources are resolved in background
+    threads, and the call waits for them in priority order for at most
+    *deadline* seconds in total. The data sources that are not resolved in
+    time are treated as empty, so the result is the best answer available
+    within the deadline, and their names are returned by
+    :func:`distro.skipped_sources` afterwards. Their resolution goes on in
+    the background, so that later calls return the complete information,
+    but does not keep the interpreter from exiting.
+    """
+    return _get_distro().info(pretty, best, deadline)
+
+
+def skipped_sources() -> List[str]:
+    """
+    Return the names of the data sources that the last call with a
+    *deadline* in the current thread skipped, because they were not resolved
+    in time (e.g. ``["lsb_release_info"]``). The list is empty if the result
+    of that call was complete.
+
+    For details, see :func:`distro.info`.
     """
-    return _distro.info(pretty, best)
+    return _get_distro().skipped_sources()
 
 
 def os_release_info() -> Dict[str, str]:
@@ -521,7 +1735,7 @@ def os_release_info() -> Dict[str, str]:
 
     See `os-release file`_ for details about these information items.
     """
-    return _distro.os_release_info()
+    return _get_distro().os_release_info()
 
 
 def lsb_release_info() -> Dict[str, str]:
@@ -531,8 +1745,13 @@ def lsb_release_info() -> Dict[str, str]:
 
     See `lsb_release command output`_ for details about these information
     items.
+
+    When the command is used, single items obtained before with
+    :func:`distro.lsb_release_attr` or the accessor functions come from runs
+    of ``lsb_release`` for those items only, and this function runs
+    ``lsb_release -a`` once more, for the complete information.
     """
-    return _distro.lsb_release_info()
+    return _get_distro().lsb_release_info()
 
 
 def distro_release_info() -> Dict[str, str]:
@@ -542,7 +1761,7 @@ def distro_release_info() -> Dict[str, str]:
 
     See `distro release file`_ for details about these information items.
     """
-    return _distro.distro_release_info()
+    return _get_distro().distro_release_info()
 
 
 def uname_info() -> Dict[str, str]:
@@ -556,13 +1775,15 @@ def uname_info() -> Dict[str, str]:
     Return a dictionary containing key-value pairs for the information items
     from the distro release file data source of the current OS distribution.
     """
+    import warnings
+
     warnings.warn(
         "distro.uname_info() is deprecated and will be removed in a future version. "
         "Please use os.uname() or platform.uname() instead.",
         DeprecationWarning,
         stacklevel=2,
     )
-    return _distro.uname_info()
+    return _get_distro().uname_info()
 
 
 def os_release_attr(attribute: str) -> str:
@@ -581,95 +1802,488 @@ def os_release_attr(attribute: str) -> str:
 
     See `os-release file`_ for details about these information items.
     """
-    return _distro.os_release_attr(attribute)
+    return _get_distro().os_release_attr(attribute)
+
+
+def lsb_release_attr(attribute: str) -> str:
+    """
+    Return a single named information item from the lsb_release command output
+    data source of the current OS distribution.
+
+    Parameters:
+
+    * ``attribute`` (string): Key of the information item.
+
+    Returns:
+
+    * (string): Value of the information item, if the item exists.
+      The empty string, if the item does not exist.
+
+    See `lsb_release command output`_ for details about these information
+    items.
+    """
+    return _get_distro().lsb_release_attr(attribute)
+
+
+def distro_release_attr(attribute: str) -> str:
+    """
+    Return a single named information item from the distro release file
+    data source of the current OS distribution.
+
+    Parameters:
+
+    * ``attribute`` (string): Key of the information item.
+
+    Returns:
+
+    * (string): Value of the information item, if the item exists.
+      The empty string, if the item does not exist.
+
+    See `distro release file`_ for details about these information items.
+    """
+    return _get_distro().distro_release_attr(attribute)
+
+
+def uname_attr(attribute: str) -> str:
+    """
+    .. deprecated:: 1.10.0
+
+        :func:`distro.uname_attr()` is deprecated and will be removed in a
+        future version. Please use :func:`os.uname()` or :func:`platform.uname()`
+        instead.
+
+    Return a single named information item from the distro release file
+    data source of the current OS distribution.
+
+    Parameters:
+
+    * ``attribute`` (string): Key of the information item.
+
+    Returns:
+
+    * (string): Value of the information item, if the item exists.
+                The empty string, if the item does not exist.
+    """
+    import warnings
+
+    warnings.warn(
+        "distro.uname_attr() is deprecated and will be removed in a future version. "
+        "Please use os.uname() or platform.uname() instead.",
+        DeprecationWarning,
+        stacklevel=2,
+    )
+    return _get_distro().uname_attr(attribute)
+
+
+def command_probes() -> Dict[str, Optional[str]]:
+    """
+    Return the results of looking up the commands that ``distro`` runs, as
+    a dictionary mapping the command names to the path names of their
+    executables, or to ``None`` for commands that were not found.
+
+    Commands are looked up in the directories of the ``PATH`` environment
+    variable the first time they are needed, and the results are shared by
+    all :class:`LinuxDistribution` instances of the process. They are looked
+    up again when ``PATH`` changes. Commands that were not looked up with the
+    current ``PATH`` are not in the dictionary.
+
+    This function is intended for diagnostics.
+    """
+    with _command_probes_lock:
+        if _command_probes.get(None) != os.environ.get("PATH", os.defpath):
+            return {}
+        return {
+            name: path for name, path in _command_probes.items() if name is not None
+        }
+
+
+def command_timeout_counts() -> Dict[str, int]:
+    """
+    Return how many times the commands that ``distro`` runs were killed
+    because they did not complete within the timeout set with the
+    ``command_timeouts`` parameter of :class:`LinuxDistribution`, as a
+    dictionary mapping the command names to the counts, for all instances of
+    the process. Commands that never timed out are not in the dictionary.
+
+    This function is intended for diagnostics.
+    """
+    with _command_timeout_counts_lock:
+        return dict(_command_timeout_counts)
+
+
+def scan_roots(
+    roots: Iterable[str],
+    workers: Optional[int] = None,
+    ordered: bool = True,
+    pretty: bool = False,
+    best: bool = False,
+    pool: str = "thread",
+    chunksize: int = 32,
+    **kwargs: Any,
+) -> Generator[Tuple[str, Union[InfoDict, Exception]], None, None]:
+    """
+    Detect the OS distributions installed in the root directories *roots*
+    (e.g. unpacked container root file systems), on a pool of *workers*
+    threads or processes, and return an iterator of ``(root, result)``
+    tuples.
+
+    The result for a root directory is the result of
+    ``LinuxDistribution(root_dir=root, **kwargs).info(pretty, best)``, or the
+    exception raised by it. An exception for one root directory does not
+    stop the scan of the others.
+
+    If *ordered* is true, the results are returned in the order of *roots*.
+    Otherwise, they are returned as soon as they are available, which keeps
+    a slow root directory from holding back the results of the others.
+
+    *pool* is one of:
+
+    * ``"thread"`` (default): The root directories are scanned on a pool of
+      threads, which overlaps the latency of the file system, but not the
+      parsing of the files, which holds the GIL.
+
+    * ``"process"``: The root directories are scanned on a pool of
+      processes, in chunks of *chunksize* root directories, so that the
+      parsing of the files scales with the number of processors. Only the
+      roots and the information dictionaries are passed between the
+      processes, so *kwargs* must be picklable. If the results of a chunk
+      cannot be passed back (e.g. an exception that cannot be pickled), or
+      a worker process dies, the exception raised for the chunk is the
+      result of each of its root directories.
+
+    *roots* may be an iterator, which is consumed as the scan goes on: at
+    most a few roots (or chunks of roots) per worker are submitted to the
+    pool before their results are returned. If the returned iterator is
+    closed before its end, the roots that were not started yet are not
+    scanned, and closing it waits for the roots that are being scanned.
+
+    *workers* defaults to the number of processors plus four, but not more
+    than 32, for threads, and to the number of processors for processes,
+    like the defaults of :mod:`concurrent.futures`.
+
+    Raises:
+
+    * :py:exc:`ValueError`: *workers* or *chunksize* is smaller than 1, or
+      *pool* is not supported.
+    """
+    if pool not in ("thread", "process"):
+        raise ValueError(f"Unsupported pool: {pool!r}")
+    if workers is None:
+        cpu_count = os.cpu_count() or 1
+        workers = min(32, cpu_count + 4) if pool == "thread" else cpu_count
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, not {workers!r}")
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be at least 1, not {chunksize!r}")
+    if pool == "thread":
+        # Chunks only amortize the cost of passing work between processes.
+        chunksize = 1
+    return _scan_roots(roots, workers, ordered, pretty, best, pool, chunksize, kwargs)
+
+
+# The result of scanning a root directory with scan_roots().
+_ScanResult = Union[InfoDict, Exception]
+
+
+def _scan_chunk(
+    chunk: List[str], pretty: bool, best: bool, kwargs: Dict[str, Any]
+) -> List[_ScanResult]:
+    results: List[_ScanResult] = []
+    for root in chunk:
+        try:
+            results.append(
+                LinuxDistribution(root_dir=root, **kwargs).info(pretty, best)
+            )
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _scan_roots(
+    roots: Iterable[str],
+    workers: int,
+    ordered: bool,
+    pretty: bool,
+    best: bool,
+    pool: str,
+    chunksize: int,
+    kwargs: Dict[str, Any],
+) -> Generator[Tuple[str, _ScanResult], None, None]:
+    import collections
+    import itertools
+    from concurrent.futures import (
+        FIRST_COMPLETED,
+        Executor,
+        ProcessPoolExecutor,
+        ThreadPoolExecutor,
+        wait,
+    )
+
+    # Bounding the number of submitted chunks keeps the memory use constant
+    # for long iterators of roots, while keeping all workers busy.
+    max_pending = workers * 4
+    # Futures in submission order, and their chunks of roots.
+    pending: "collections.OrderedDict[Future[List[_ScanResult]], List[str]]"
+    pending = collections.OrderedDict()
+    executor: Executor
+    if pool == "thread":
+        executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="distro-scan"
+        )
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
 
+    def chunk_results(
+        future: "Future[List[_ScanResult]]", chunk: List[str]
+    ) -> List[Tuple[str, _ScanResult]]:
+        results: List[_ScanResult]
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [e] * len(chunk)
+        return list(zip(chunk, results))
+
+    def next_results() -> List[Tuple[str, _ScanResult]]:
+        if ordered:
+            return chunk_results(*pending.popitem(last=False))
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        return [
+            result
+            for future in done
+            for result in chunk_results(future, pending.pop(future))
+        ]
 
-def lsb_release_attr(attribute: str) -> str:
+    try:
+        roots = iter(roots)
+        while True:
+            chunk = list(itertools.islice(roots, chunksize))
+            if not chunk:
+                break
+            future = executor.submit(_scan_chunk, chunk, pretty, best, kwargs)
+            pending[future] = chunk
+            if len(pending) >= max_pending:
+                yield from next_results()
+        while pending:
+            yield from next_results()
+    finally:
+        # Cancel the chunks that were not started, and wait for the others:
+        # shutting down a process pool without waiting closes the pipe that
+        # its management thread still uses.
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def scan_image_storage(
+    storage_dir: str, pretty: bool = False, best: bool = False, **kwargs: Any
+) -> Generator[Tuple[str, Union[InfoDict, Exception]], None, None]:
     """
-    Return a single named information item from the lsb_release command output
-    data source of the current OS distribution.
-
-    Parameters:
+    Detect the OS distributions of the container images in the storage
+    directory *storage_dir* of a container engine, in place, and return an
+    iterator of ``(image_id, result)`` tuples.
+
+    *storage_dir* is the root directory of Docker with the ``overlay2``
+    storage driver (e.g. ``/var/lib/docker``), or of containers/storage
+    (used by Podman, Buildah and CRI-O) with the ``overlay`` driver (e.g.
+    ``/var/lib/containers/storage``).
+
+    The layers of each image are taken from the storage metadata: the
+    image configurations and layer database of Docker, and the ``lower``
+    files of their top layers, or the ``images.json`` and ``layers.json``
+    files of containers/storage. Their directories are read like the
+    layers of :meth:`LinuxDistribution.from_image`, without mounting them:
+    the whiteouts and opaque directories of the upper layers are applied,
+    and the symbolic links are resolved within the image. The layers shared
+    between images (e.g. a common base image) are read only once.
+
+    The result for an image is the result of
+    ``LinuxDistribution.info(pretty, best)`` for the root file system of the
+    image, with the keyword arguments *kwargs*, or the exception raised for
+    the image. An exception for one image does not stop the scan of the
+    others.
+
+    Raises:
+
+    * :py:exc:`ValueError`: *storage_dir* is not a supported storage
+      directory, or ``root_dir`` or ``cache_file`` is passed.
+
+    * :py:exc:`OSError`: The storage metadata cannot be read.
+    """
+    size = _archive_read_size(kwargs)
+    if os.path.isdir(os.path.join(storage_dir, "image", "overlay2")):
+        images = _docker_storage_images(storage_dir)
+    elif os.path.isfile(os.path.join(storage_dir, "overlay-images", "images.json")):
+        images = _containers_storage_images(storage_dir)
+    else:
+        raise ValueError(f"Unsupported container storage: {storage_dir}")
+    return _scan_image_storage(images, size, pretty, best, kwargs)
 
-    * ``attribute`` (string): Key of the information item.
 
-    Returns:
+# The identifiers of the layers of container engine storage, as used in the
+# names of their directories.
+_STORAGE_ID_PATTERN = re.compile(r"[a-zA-Z0-9][\w.-]*$")
 
-    * (string): Value of the information item, if the item exists.
-      The empty string, if the item does not exist.
 
-    See `lsb_release command output`_ for details about these information
-    items.
+def _storage_id(value: Any) -> str:
     """
-    return _distro.lsb_release_attr(attribute)
+    Return the layer identifier *value* read from container engine storage
+    metadata.
 
+    Raises:
 
-def distro_release_attr(attribute: str) -> str:
+    * :py:exc:`ValueError`: *value* is not a valid identifier.
     """
-    Return a single named information item from the distro release file
-    data source of the current OS distribution.
+    if not isinstance(value, str) or not _STORAGE_ID_PATTERN.match(value):
+        raise ValueError(f"Invalid layer identifier: {value!r}")
+    return value
 
-    Parameters:
 
-    * ``attribute`` (string): Key of the information item.
+def _read_json_file(path: str) -> Any:
+    import json
 
-    Returns:
+    return json.loads(_read_file(path))
 
-    * (string): Value of the information item, if the item exists.
-      The empty string, if the item does not exist.
 
-    See `distro release file`_ for details about these information items.
+def _docker_storage_images(
+    storage_dir: str,
+) -> Iterator[Tuple[str, Union[List[str], Exception]]]:
     """
-    return _distro.distro_release_attr(attribute)
+    Yield the IDs of the images in the Docker root directory *storage_dir*,
+    with the directories of their layers from the top one down, or the
+    exception raised for them.
 
+    Raises:
 
-def uname_attr(attribute: str) -> str:
+    * :py:exc:`OSError`: The image database cannot be listed.
     """
-    .. deprecated:: 1.10.0
+    import hashlib
 
-        :func:`distro.uname_attr()` is deprecated and will be removed in a
-        future version. Please use :func:`os.uname()` or :func:`platform.uname()`
-        instead.
+    image_dir = os.path.join(storage_dir, "image", "overlay2")
+    content_dir = os.path.join(image_dir, "imagedb", "content", "sha256")
+    layers_dir = os.path.join(storage_dir, "overlay2")
+    for name in sorted(os.listdir(content_dir)):
+        try:
+            config = _read_json_file(os.path.join(content_dir, name))
+            diff_ids = config["rootfs"]["diff_ids"]
+            if not diff_ids:
+                yield f"sha256:{name}", []
+                continue
+            # The chain ID of the top layer identifies it in the layer
+            # database.
+            chain_id = diff_ids[0]
+            for diff_id in diff_ids[1:]:
+                chain = f"{chain_id} {diff_id}".encode()
+                chain_id = "sha256:" + hashlib.sha256(chain).hexdigest()
+            layer_db_dir = os.path.join(image_dir, "layerdb", _digest_path(chain_id))
+            cache_id = _read_file(os.path.join(layer_db_dir, "cache-id")).decode()
+            top_dir = os.path.join(layers_dir, _storage_id(cache_id.strip()))
+            layer_dirs = [os.path.join(top_dir, "diff")]
+            try:
+                lower = _read_file(os.path.join(top_dir, "lower")).decode()
+            except FileNotFoundError:
+                # The bottom layer has no lower layers.
+                lower = ""
+            # Links to the directories of the lower layers, from the top one
+            # down, e.g. "l/ABCDEF:l/GHIJKL".
+            for link in filter(None, lower.strip().split(":")):
+                link_dir, link_name = posixpath.split(link)
+                if link_dir != "l":
+                    raise ValueError(f"Invalid lower layer: {link!r}")
+                layer_dirs.append(os.path.join(layers_dir, "l", _storage_id(link_name)))
+        except (ValueError, LookupError, TypeError, OSError) as e:
+            yield f"sha256:{name}", e
+        else:
+            yield f"sha256:{name}", layer_dirs
 
-    Return a single named information item from the distro release file
-    data source of the current OS distribution.
 
-    Parameters:
+def _containers_storage_images(
+    storage_dir: str,
+) -> Iterator[Tuple[str, Union[List[str], Exception]]]:
+    """
+    Yield the IDs of the images in the containers/storage root directory
+    *storage_dir*, with the directories of their layers from the top one
+    down, or the exception raised for them.
 
-    * ``attribute`` (string): Key of the information item.
+    Raises:
 
-    Returns:
+    * :py:exc:`OSError`: The image or layer metadata cannot be read.
 
-    * (string): Value of the information item, if the item exists.
-                The empty string, if the item does not exist.
+    * :py:exc:`ValueError`: The image or layer metadata is invalid.
+    """
+    images = _read_json_file(os.path.join(storage_dir, "overlay-images", "images.json"))
+    layers = _read_json_file(os.path.join(storage_dir, "overlay-layers", "layers.json"))
+    try:
+        parents = {layer["id"]: layer.get("parent") for layer in layers}
+        image_layers = [(str(image["id"]), image.get("layer")) for image in images]
+    except (LookupError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid container storage metadata: {e!r}")
+    for image_id, layer_id in image_layers:
+        layer_dirs: List[str] = []
+        try:
+            while layer_id:
+                if len(layer_dirs) > len(parents):
+                    raise ValueError(f"Cycle of parent layers: {layer_id!r}")
+                layer_dirs.append(
+                    os.path.join(storage_dir, "overlay", _storage_id(layer_id), "diff")
+                )
+                layer_id = parents[layer_id]
+        except (ValueError, LookupError) as e:
+            yield image_id, e
+        else:
+            yield image_id, layer_dirs
+
+
+def _scan_image_storage(
+    images: Iterator[Tuple[str, Union[List[str], Exception]]],
+    size: int,
+    pretty: bool,
+    best: bool,
+    kwargs: Dict[str, Any],
+) -> Generator[Tuple[str, Union[InfoDict, Exception]], None, None]:
+    # The layers read so far, by the real path name of their directory and
+    # the link targets of the upper layers they were read with.
+    layers: Dict[Tuple[str, FrozenSet[str]], _Layer] = {}
+
+    def layer_reader(layer_dir: str) -> Callable[[Set[str]], _Layer]:
+        def read(targets: Set[str]) -> _Layer:
+            key = (os.path.realpath(layer_dir), frozenset(targets))
+            if key not in layers:
+                layers[key] = _read_dir_layer(layer_dir, size, targets)
+            return layers[key]
+
+        return read
+
+    for image_id, layer_dirs in images:
+        result: Union[InfoDict, Exception]
+        if isinstance(layer_dirs, Exception):
+            result = layer_dirs
+        else:
+            readers = [layer_reader(layer_dir) for layer_dir in layer_dirs]
+            try:
+                distribution = LinuxDistribution._from_layers(readers, kwargs)
+                result = distribution.info(pretty, best)
+            except Exception as e:
+                result = e
+        yield image_id, result
+
+
+# functools.cached_property is not used: up to Python 3.11, it holds a lock
+# shared by all instances while computing a value, which serializes the
+# detection of different roots in threads (see scan_roots()).
+class cached_property(Generic[_T]):
+    """A version of @property which caches the value.  On access, it calls the
+    underlying function and sets the value in `__dict__` so future accesses
+    will not re-call the property.
     """
-    warnings.warn(
-        "distro.uname_attr() is deprecated and will be removed in a future version. "
-        "Please use os.uname() or platform.uname() instead.",
-        DeprecationWarning,
-        stacklevel=2,
-    )
-    return _distro.uname_attr(attribute)
-
-
-try:
-    from functools import cached_property
-except ImportError:
-    # Python < 3.8
-    class cached_property:  # type: ignore
-        """A version of @property which caches the value.  On access, it calls the
-        underlying function and sets the value in `__dict__` so future accesses
-        will not re-call the property.
-        """
 
-        def __init__(self, f: Callable[[Any], Any]) -> None:
-            self._fname = f.__name__
-            self._f = f
+    def __init__(self, f: Callable[[Any], _T]) -> None:
+        self._fname = f.__name__
+        self._f = f
 
-        def __get__(self, obj: Any, owner: Type[Any]) -> Any:
-            assert obj is not None, f"call {self._fname} on an instance"
-            ret = obj.__dict__[self._fname] = self._f(obj)
-            return ret
+    def __get__(self, obj: Any, owner: Type[Any]) -> _T:
+        assert obj is not None, f"call {self._fname} on an instance"
+        ret = obj.__dict__[self._fname] = self._f(obj)
+        return ret
 
 
 class LinuxDistribution:
@@ -677,7 +2291,7 @@ class LinuxDistribution:
     Provides information about a OS distribution.
 
     This package creates a private module-global instance of this class with
-    default initialization arguments, that is used by the
+    default initialization arguments on first use, that is used by the
     `consolidated accessor functions`_ and `single source accessor functions`_.
     By using default initialization arguments, that module-global instance
     returns data about the current OS distribution (i.e. the distro this
@@ -690,6 +2304,22 @@ class LinuxDistribution:
     lsb_release command.
     """
 
+    # Futures of the data sources being prefetched, by name.
+    _prefetching: Dict[str, "Future[Any]"] = {}
+
+    # Task resolving all data sources for the asynchronous accessors.
+    _aresolving: Optional["asyncio.Task[None]"] = None
+
+    # In the copies made for calls with a deadline: the time.monotonic() value
+    # until which the data sources being prefetched are waited for, and the
+    # names of the data sources that were not resolved in time.
+    _deadline: Optional[float] = None
+    _skipped: List[str] = []
+
+    # Access to the files of the data sources, replaced for the instances
+    # created from archives.
+    _files: _Files = _FILES
+
     def __init__(
         self,
         include_lsb: Optional[bool] = None,
@@ -698,6 +2328,12 @@ class LinuxDistribution:
         include_uname: Optional[bool] = None,
         root_dir: Optional[str] = None,
         include_oslevel: Optional[bool] = None,
+        cache_file: str = "",
+        lsb_source: str = "command",
+        prefetch: bool = False,
+        command_timeouts: Optional[Dict[str, float]] = None,
+        release_discovery: str = "list",
+        file_size_limits: Optional[Dict[str, int]] = None,
     ) -> None:
         """
         The initialization method of this class gathers information from the
@@ -732,20 +2368,93 @@ class LinuxDistribution:
           distro release file can be found, the data source for the distro
           release file will be empty.
 
-        * ``include_uname`` (bool): Controls whether uname command output is
-          included as a data source. If the uname command is not available in
-          the program execution path the data source for the uname command will
-          be empty.
+        * ``include_uname`` (bool): Controls whether the uname information
+          (the system name and release reported by :py:func:`os.uname`, as in
+          the output of ``uname -rs``) is included as a data source. The uname
+          command is run instead on platforms without :py:func:`os.uname`; if
+          it is not available in the program execution path the data source
+          for the uname command will be empty.
 
         * ``root_dir`` (string): The absolute path to the root directory to use
           to find distro-related information files. Note that ``include_*``
-          parameters must not be enabled in combination with ``root_dir``.
+          parameters must not be enabled in combination with ``root_dir``,
+          except for ``include_lsb`` with a ``lsb_source`` other than
+          ``"command"``.
 
         * ``include_oslevel`` (bool): Controls whether (AIX) oslevel command
           output is included as a data source. If the oslevel command is not
           available in the program execution path the data source will be
           empty.
 
+        * ``cache_file`` (string): The path name of a file in which the
+          results of the os-release, lsb_release and distro release file data
+          sources are stored across processes (e.g.
+          ``$XDG_CACHE_HOME/distro.json`` or ``/run/distro.json``).
+
+          Each stored result is keyed by the device, inode, size and
+          modification time of the files it was derived from (including the
+          lsb_release executable), and is recomputed when any of them changed.
+
+          An empty string (the default) disables the cache.
+
+        * ``lsb_source`` (string): Controls how the lsb_release information is
+          obtained, if it is included:
+
+          * ``"command"`` (the default): From the `lsb_release command
+            output`_.
+
+          * ``"file"``: From the ``lsb-release`` file in the ``etc``
+            directory, with the items it does not define taken from the
+            os-release file, as the lsb_release command does on Debian based
+            distributions. No command is run, so that this source can also be
+            used in combination with ``root_dir``, and is included by default
+            then.
+
+          * ``"auto"``: As with ``"file"`` if the ``lsb-release`` file exists
+            or ``root_dir`` is specified, and as with ``"command"`` otherwise.
+
+        * ``prefetch`` (bool): Controls whether all included data sources are
+          resolved concurrently in background threads, starting when the
+          instance is created. Accessing a data source then waits until it
+          is resolved, rather than resolving it. This reduces the latency of
+          the first accessor call when several data sources need to be read,
+          especially when commands have to be run.
+
+        * ``command_timeouts`` (dict): The maximum number of seconds that the
+          commands run for the data sources may take, by command name (e.g.
+          ``{"lsb_release": 5.0}``). A command that does not complete in
+          time is killed together with all processes it started, and its data
+          source is empty. Such timeouts are counted by
+          :func:`distro.command_timeout_counts`. Commands that are not in the
+          dictionary (by default, all of them) are waited for indefinitely.
+
+        * ``release_discovery`` (string): Controls how the distro release file
+          is searched for in the ``etc`` directory, if it is not specified:
+
+          * ``"list"`` (the default): The directory is listed, and the first
+            matching file in alphabetical order is used.
+
+          * ``"probe"``: The well-known distro release files and the one
+            named after the ID of the os-release file (e.g.
+            ``almalinux-release``) are tried first, in alphabetical order,
+            without listing the directory. The directory is only listed if
+            none of them exists. This is faster on file systems where
+            listing a directory is expensive compared to opening a file,
+            e.g. network or FUSE file systems mounted as ``root_dir``. The
+            file found is the same as with ``"list"``, unless a file with
+            another name comes first in alphabetical order.
+
+        * ``file_size_limits`` (dict): The maximum number of bytes that are
+          read from the files of the data sources, by data source:
+          ``"os_release"``, ``"lsb_release"`` (the ``lsb-release`` file),
+          ``"distro_release"``, ``"debian_version"`` and
+          ``"armbian_release"``. The limit of the data sources that are not
+          in the dictionary is 8 KiB. The content of a larger os-release,
+          ``lsb-release`` or ``armbian-release`` file is truncated after its
+          last complete line within the limit. A distro release or
+          ``debian_version`` file is skipped if its first line is larger than
+          the limit. Such files are reported by :meth:`oversized_files`.
+
         Public instance attributes:
 
         * ``os_release_file`` (string): The path name of the
@@ -771,6 +2480,21 @@ class LinuxDistribution:
           The absolute path to the root directory to use to find distro-related
           information files.
 
+        * ``cache_file`` (string): The result of the ``cache_file`` parameter.
+
+        * ``lsb_source`` (string): The result of the ``lsb_source`` parameter.
+
+        * ``prefetch`` (bool): The result of the ``prefetch`` parameter.
+
+        * ``command_timeouts`` (dict): The result of the ``command_timeouts``
+          parameter, as a new dictionary.
+
+        * ``release_discovery`` (string): The result of the
+          ``release_discovery`` parameter.
+
+        * ``file_size_limits`` (dict): The result of the ``file_size_limits``
+          parameter, as a new dictionary.
+
         Raises:
 
         * :py:exc:`ValueError`: Initialization parameters combination is not
@@ -798,7 +2522,7 @@ class LinuxDistribution:
 
             # NOTE: The idea is to respect order **and** have it set
             #       at all times for API backwards compatibility.
-            if os.path.isfile(etc_dir_os_release_file) or not os.path.isfile(
+            if self._files.isfile(etc_dir_os_release_file) or not self._files.isfile(
                 usr_lib_os_release_file
             ):
                 self.os_release_file = etc_dir_os_release_file
@@ -807,14 +2531,23 @@ class LinuxDistribution:
 
         self.distro_release_file = distro_release_file or ""  # updated later
 
+        if lsb_source not in ("command", "file", "auto"):
+            raise ValueError(f"Unsupported lsb_source: {lsb_source!r}")
+        if release_discovery not in ("list", "probe"):
+            raise ValueError(f"Unsupported release_discovery: {release_discovery!r}")
         is_root_dir_defined = root_dir is not None
-        if is_root_dir_defined and (include_lsb or include_uname or include_oslevel):
+        include_lsb_command = include_lsb and lsb_source == "command"
+        if is_root_dir_defined and (
+            include_lsb_command or include_uname or include_oslevel
+        ):
             raise ValueError(
                 "Including subprocess data sources from specific root_dir is disallowed"
                 " to prevent false information"
             )
         self.include_lsb = (
-            include_lsb if include_lsb is not None else not is_root_dir_defined
+            include_lsb
+            if include_lsb is not None
+            else not is_root_dir_defined or lsb_source != "command"
         )
         self.include_uname = (
             include_uname if include_uname is not None else not is_root_dir_defined
@@ -822,6 +2555,209 @@ class LinuxDistribution:
         self.include_oslevel = (
             include_oslevel if include_oslevel is not None else not is_root_dir_defined
         )
+        self.cache_file = cache_file
+        self.lsb_source = lsb_source
+        self.prefetch = prefetch
+        self.command_timeouts = dict(command_timeouts or {})
+        self.release_discovery = release_discovery
+        self.file_size_limits = dict(file_size_limits or {})
+        if prefetch:
+            self._prefetch()
+
+    def _prefetch(self) -> None:
+        """
+        Start resolving all included data sources in background threads,
+        except those that are already resolved or being resolved.
+        """
+        from concurrent.futures import Future
+
+        names = ["_os_release_info", "_distro_release_info"]
+        if self.include_lsb:
+            names.append("_lsb_release_info")
+        if self.include_uname:
+            names.append("_uname_info")
+        if self.include_oslevel:
+            names.append("_oslevel_info")
+        with _prefetch_lock:
+            names = [
+                name
+                for name in names
+                if name not in self.__dict__ and name not in self._prefetching
+            ]
+            if not names:
+                return
+            # The futures are published before any data source starts, so
+            # that those depending on another one wait for it instead of
+            # resolving it again.
+            futures: Dict[str, "Future[Any]"] = {name: Future() for name in names}
+            self._prefetching = {**self._prefetching, **futures}
+            # A data source may wait for another one it depends on, so each of
+            # them needs its own thread. They are daemon threads, so that a
+            # command still running after a deadline does not keep the
+            # interpreter from exiting.
+            for name, future in futures.items():
+                threading.Thread(
+                    target=_resolve_future,
+                    args=(future, _PREFETCHABLE_SOURCES[name], self),
+                    name=f"distro-prefetch-{name.lstrip('_')}",
+                    daemon=True,
+                ).start()
+
+    def _with_deadline(
+        self, deadline: float, call: Callable[["LinuxDistribution"], _T]
+    ) -> _T:
+        """
+        Return the result of *call* for a copy of this instance that waits at
+        most *deadline* seconds in total for the data sources it uses.
+
+        The data sources are resolved in background threads. Those that are
+        not resolved in time are empty for *call*, and their names are
+        recorded for :meth:`skipped_sources`; their resolution goes on for
+        later calls.
+        """
+        import copy
+
+        end = time.monotonic() + deadline
+        self._prefetch()
+        partial = copy.copy(self)
+        partial._deadline = end
+        partial._skipped = []
+        result = call(partial)
+        self._deadline_calls.skipped = partial._skipped
+        return result
+
+    @property
+    def _deadline_calls(self) -> threading.local:
+        """Per thread information about the last call with a deadline."""
+        # dict.setdefault() is atomic, so concurrent threads get the same object.
+        calls: threading.local = self.__dict__.setdefault(
+            "_deadline_calls", threading.local()
+        )
+        return calls
+
+    def skipped_sources(self) -> List[str]:
+        """
+        Return the names of the data sources that the last call with a
+        *deadline* in the current thread skipped.
+
+        For details, see :func:`distro.skipped_sources`.
+        """
+        return list(getattr(self._deadline_calls, "skipped", []))
+
+    async def _aresolve(self) -> None:
+        """
+        Resolve all included data sources without blocking the running event
+        loop, sharing a single resolution between concurrent callers.
+        """
+        import asyncio
+
+        task = self._aresolving
+        if task is not None and task.done():
+            if not task.cancelled() and task.exception() is None:
+                return
+            # Retry a failed resolution.
+            task = None
+        loop = asyncio.get_running_loop()
+        if task is None or task.get_loop() is not loop:
+            task = self._aresolving = loop.create_task(self._aresolve_sources())
+        # A cancelled caller must not cancel the resolution for the others.
+        await asyncio.shield(task)
+
+    async def _aresolve_sources(self) -> None:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        commands = await loop.run_in_executor(None, self._resolve_file_sources)
+        await asyncio.gather(*(self._arun_command(name) for name in commands))
+
+    def _resolve_file_sources(self) -> List[str]:
+        """
+        Resolve all included data sources that do not need to run a command,
+        and return the names of the ones that do.
+        """
+        commands = []
+        for name, runs_command in (
+            ("_os_release_info", False),
+            ("_distro_release_info", False),
+            ("_debian_version", False),
+            ("_armbian_version", False),
+            # With a cache file, the command is only run on a cache miss.
+            (
+                "_lsb_release_info",
+                self.include_lsb
+                and not self.cache_file
+                and not self._uses_lsb_release_file(),
+            ),
+            ("_uname_info", self.include_uname and not hasattr(os, "uname")),
+            ("_oslevel_info", self.include_oslevel),
+        ):
+            if (
+                runs_command
+                and name not in self.__dict__
+                and name not in self._prefetching
+            ):
+                commands.append(name)
+            else:
+                getattr(self, name)
+        return commands
+
+    async def _arun_command(self, name: str) -> None:
+        """
+        Resolve the named data source by running its command as a subprocess
+        of the running event loop.
+        """
+        import asyncio
+
+        command, *args = {
+            "_lsb_release_info": ("lsb_release", "-a"),
+            "_uname_info": ("uname", "-rs"),
+            "_oslevel_info": ("oslevel",),
+        }[name]
+        path = _probe_command(command)
+        timeout = self.command_timeouts.get(command)
+        stdout: Optional[bytes]
+        try:
+            if path is None:
+                raise FileNotFoundError(command)
+            # In a new session, so that the processes the command starts can
+            # be killed with it.
+            process = await asyncio.create_subprocess_exec(
+                path,
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        # Command not found
+        except OSError:
+            stdout = None
+        else:
+            try:
+                stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                _kill_process_group(process)
+                await process.wait()
+                _count_command_timeout(command)
+                stdout = None
+            except asyncio.CancelledError:
+                _kill_process_group(process)
+                await process.wait()
+                raise
+            else:
+                # Command returned error
+                if process.returncode:
+                    stdout = None
+
+        value: Any
+        if name == "_oslevel_info":
+            value = self._to_str(stdout).strip() if stdout is not None else ""
+        elif stdout is None:
+            value = {}
+        elif name == "_lsb_release_info":
+            value = self._parse_lsb_release_content(self._to_str(stdout).splitlines())
+        else:
+            value = self._parse_uname_content(self._to_str(stdout).splitlines())
+        self.__dict__.setdefault(name, value)
 
     def __repr__(self) -> str:
         """Return repr of all info"""
@@ -833,6 +2769,12 @@ class LinuxDistribution:
             "include_uname={self.include_uname!r}, "
             "include_oslevel={self.include_oslevel!r}, "
             "root_dir={self.root_dir!r}, "
+            "cache_file={self.cache_file!r}, "
+            "lsb_source={self.lsb_source!r}, "
+            "prefetch={self.prefetch!r}, "
+            "command_timeouts={self.command_timeouts!r}, "
+            "release_discovery={self.release_discovery!r}, "
+            "file_size_limits={self.file_size_limits!r}, "
             "_os_release_info={self._os_release_info!r}, "
             "_lsb_release_info={self._lsb_release_info!r}, "
             "_distro_release_info={self._distro_release_info!r}, "
@@ -840,6 +2782,200 @@ class LinuxDistribution:
             "_oslevel_info={self._oslevel_info!r})".format(self=self)
         )
 
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of all data sources of this instance, that can be
+        used to recreate an equivalent instance with :meth:`from_snapshot`.
+
+        All enabled data sources are resolved by this method, if they have not
+        been already. The snapshot is a dictionary of plain strings, booleans,
+        dictionaries and ``None`` values, so that it can be serialized (e.g.
+        with :py:mod:`json`) and stored.
+        """
+        return {
+            "version": _SNAPSHOT_VERSION,
+            "root_dir": self.root_dir,
+            "etc_dir": self.etc_dir,
+            "usr_lib_dir": self.usr_lib_dir,
+            "include_lsb": self.include_lsb,
+            "lsb_source": self.lsb_source,
+            "include_uname": self.include_uname,
+            "include_oslevel": self.include_oslevel,
+            "os_release_file": self.os_release_file,
+            # Resolving the distro release info may update the file name, so
+            # it must be read afterwards.
+            "distro_release_info": dict(self._distro_release_info),
+            "distro_release_file": self.distro_release_file,
+            "os_release_info": dict(self._os_release_info),
+            "lsb_release_info": dict(self._lsb_release_info),
+            "uname_info": dict(self._uname_info),
+            "oslevel_info": self._oslevel_info,
+            "debian_version": self._debian_version,
+            "armbian_version": self._armbian_version,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "LinuxDistribution":
+        """
+        Create an instance from a snapshot returned by :meth:`snapshot`.
+
+        The returned instance does not read any file nor run any command: all
+        of its data sources are taken from the snapshot.
+
+        Raises:
+
+        * :py:exc:`ValueError`: The snapshot was created by an incompatible
+          version of this package.
+        """
+        if snapshot.get("version") != _SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot version: {snapshot.get('version')!r}"
+            )
+        distribution = cls.__new__(cls)
+        distribution.root_dir = snapshot["root_dir"]
+        distribution.etc_dir = snapshot["etc_dir"]
+        distribution.usr_lib_dir = snapshot["usr_lib_dir"]
+        distribution.include_lsb = snapshot["include_lsb"]
+        distribution.lsb_source = snapshot.get("lsb_source", "command")
+        distribution.include_uname = snapshot["include_uname"]
+        distribution.include_oslevel = snapshot["include_oslevel"]
+        distribution.os_release_file = snapshot["os_release_file"]
+        distribution.distro_release_file = snapshot["distro_release_file"]
+        distribution.cache_file = ""
+        distribution.prefetch = False
+        distribution.command_timeouts = {}
+        distribution.release_discovery = "list"
+        distribution.file_size_limits = {}
+        # Pre-populate the cached properties, so that they are never computed.
+        distribution.__dict__.update(
+            _os_release_info=dict(snapshot["os_release_info"]),
+            _lsb_release_info=dict(snapshot["lsb_release_info"]),
+            _distro_release_info=dict(snapshot["distro_release_info"]),
+            _uname_info=dict(snapshot["uname_info"]),
+            _oslevel_info=snapshot["oslevel_info"],
+            _debian_version=snapshot["debian_version"],
+            _armbian_version=snapshot["armbian_version"],
+        )
+        return distribution
+
+    @classmethod
+    def from_tar(
+        cls,
+        archive: Union[str, IO[bytes]],
+        assume_sorted: bool = False,
+        **kwargs: Any,
+    ) -> "LinuxDistribution":
+        """
+        Create an instance for the root file system in the tar archive
+        *archive* (e.g. a container image layer), without extracting it.
+
+        *archive* is the path name of the archive or a binary file object,
+        which does not need to be seekable. The archive may be compressed
+        with any compression supported by :py:mod:`tarfile` (e.g. gzip or
+        xz).
+
+        The archive is read once, as a stream, and only the data source files
+        (``etc/os-release``, ``usr/lib/os-release`` and the distro release
+        files in ``etc``) are kept in memory, up to their size limit (see the
+        ``file_size_limits`` parameter). Symbolic links and hard links among
+        them are resolved within the archive, if their targets are data
+        source files or come after them in the archive.
+
+        If *assume_sorted* is true, the members of the archive are assumed to
+        be sorted by path name, as in the archives created by most container
+        image builders, and the archive is only read up to the last data
+        source file. A data source file coming after that point in an
+        archive that is not sorted is then missed. By default, the archive
+        is read to its end.
+
+        The returned instance does not read any other file. Its root
+        directory is ``/``, and its path names (e.g. ``os_release_file``) are
+        the path names of the members in the archive.
+
+        The keyword arguments are passed to :class:`LinuxDistribution`,
+        except ``root_dir`` and ``cache_file``, which are not supported.
+
+        Raises:
+
+        * :py:exc:`tarfile.TarError`: The archive is invalid.
+
+        * :py:exc:`OSError`: The archive cannot be read.
+
+        * :py:exc:`ValueError`: ``root_dir`` or ``cache_file`` is passed.
+        """
+        layer = _read_tar_layer(
+            archive, _archive_read_size(kwargs), assume_sorted=assume_sorted
+        )
+        return cls._from_layers([lambda targets: layer], kwargs)
+
+    @classmethod
+    def from_image(
+        cls, image: str, assume_sorted: bool = False, **kwargs: Any
+    ) -> "LinuxDistribution":
+        """
+        Create an instance for the root file system of the container image
+        *image*, without assembling it: *image* is the path name of an `OCI
+        image layout`_ or of a ``docker save`` archive, as a directory or a
+        tar archive.
+
+        The layers of the image are taken from its manifest
+        (``manifest.json`` for ``docker save`` archives, and the first image
+        manifest of ``index.json`` otherwise). They are read like the
+        archives of :meth:`from_tar`, with the same *assume_sorted*
+        parameter, from the top layer down, and only when needed: a data
+        source file is looked up in the lower layers only if the upper
+        layers have neither the file nor a whiteout file hiding it. Listing
+        the distro release files reads all layers, unless a layer makes
+        ``etc`` opaque; with ``release_discovery="probe"``, it is avoided
+        when a usual distro release file is found.
+
+        The returned instance does not read any file of the image that it
+        does not need. Errors reading the layers are raised by the methods
+        that need them. Its root directory is ``/``, and its path names
+        (e.g. ``os_release_file``) are the path names of the files in the
+        image.
+
+        The keyword arguments are passed to :class:`LinuxDistribution`,
+        except ``root_dir`` and ``cache_file``, which are not supported.
+
+        .. _OCI image layout:
+           https://github.com/opencontainers/image-spec/blob/main/image-layout.md
+
+        Raises:
+
+        * :py:exc:`ValueError`: The image is invalid, or ``root_dir`` or
+          ``cache_file`` is passed.
+
+        * :py:exc:`tarfile.TarError`: The image is an invalid archive.
+
+        * :py:exc:`OSError`: The image cannot be read.
+        """
+        size = _archive_read_size(kwargs)
+        files = _ImageFiles(image)
+
+        def layer_reader(name: str) -> Callable[[Set[str]], _Layer]:
+            return lambda targets: files.read(
+                name, lambda fp: _read_tar_layer(fp, size, targets, assume_sorted)
+            )
+
+        layers = [layer_reader(name) for name in reversed(files.layer_names())]
+        return cls._from_layers(layers, kwargs)
+
+    @classmethod
+    def _from_layers(
+        cls,
+        layers: Iterable[Callable[[Set[str]], _Layer]],
+        kwargs: Dict[str, Any],
+    ) -> "LinuxDistribution":
+        """
+        Create an instance for the root file system with the layers *layers*
+        (see :class:`_LayeredFiles`), with the keyword arguments *kwargs*.
+        """
+        distribution = cls.__new__(cls)
+        distribution._files = _LayeredFiles(layers)
+        distribution.__init__(root_dir="/", **kwargs)  # type: ignore[misc]
+        return distribution
+
     def linux_distribution(
         self, full_distribution_name: bool = True
     ) -> Tuple[str, str, str]:
@@ -884,12 +3020,14 @@ class LinuxDistribution:
 
         return ""
 
-    def name(self, pretty: bool = False) -> str:
+    def name(self, pretty: bool = False, deadline: Optional[float] = None) -> str:
         """
         Return the name of the OS distribution, as a string.
 
         For details, see :func:`distro.name`.
         """
+        if deadline is not None:
+            return self._with_deadline(deadline, lambda d: d.name(pretty))
         name = (
             self.os_release_attr("name")
             or self.lsb_release_attr("distributor_id")
@@ -907,12 +3045,16 @@ class LinuxDistribution:
                     name = f"{name} {version}"
         return name or ""
 
-    def version(self, pretty: bool = False, best: bool = False) -> str:
+    def version(
+        self, pretty: bool = False, best: bool = False, deadline: Optional[float] = None
+    ) -> str:
         """
         Return the version of the OS distribution, as a string.
 
         For details, see :func:`distro.version`.
         """
+        if deadline is not None:
+            return self._with_deadline(deadline, lambda d: d.version(pretty, best))
         # Optimization: query the version from subsequent sources lazily to avoid
         # as many expensive subprocess calls as possible (notably via lsb_release).
         version_sources: List[Callable[[], str]] = [
@@ -938,6 +3080,9 @@ class LinuxDistribution:
                 version_sources.append(lambda: self._armbian_version)
         version = ""
         if best:
+            if self._runs_lsb_release_items():
+                # Both lsb_release items are examined, so get them at once.
+                self._fetch_lsb_release_items(("release", "description"))
             # This algorithm uses the last version in priority order that has
             # the best precision. If the versions are not in conflict, that
             # does not matter; otherwise, using the last one instead of the
@@ -1004,12 +3149,14 @@ class LinuxDistribution:
         """
         return self.os_release_attr("id_like") or ""
 
-    def codename(self) -> str:
+    def codename(self, deadline: Optional[float] = None) -> str:
         """
         Return the codename of the OS distribution.
 
         For details, see :func:`distro.codename`.
         """
+        if deadline is not None:
+            return self._with_deadline(deadline, lambda d: d.codename())
         try:
             # Handle os_release specially since distros might purposefully set
             # this to empty string to have no codename
@@ -1021,13 +3168,17 @@ class LinuxDistribution:
                 or ""
             )
 
-    def info(self, pretty: bool = False, best: bool = False) -> InfoDict:
+    def info(
+        self, pretty: bool = False, best: bool = False, deadline: Optional[float] = None
+    ) -> InfoDict:
         """
         Return certain machine-readable information about the OS
         distribution.
 
         For details, see :func:`distro.info`.
         """
+        if deadline is not None:
+            return self._with_deadline(deadline, lambda d: d.info(pretty, best))
         return InfoDict(
             id=self.id(),
             version=self.version(pretty, best),
@@ -1040,6 +3191,23 @@ class LinuxDistribution:
             codename=self.codename(),
         )
 
+    async def ainfo(self, pretty: bool = False, best: bool = False) -> InfoDict:
+        """
+        Return certain machine-readable information about the OS
+        distribution, like :meth:`info`, without blocking the running event
+        loop.
+
+        All included data sources that are not resolved yet are resolved
+        first: files are read in the default executor of the event loop, and
+        commands are run as asyncio subprocesses. Concurrent calls share a
+        single resolution. Afterwards, no accessor of this instance does any
+        I/O anymore.
+
+        For details, see :func:`distro.info`.
+        """
+        await self._aresolve()
+        return self.info(pretty, best)
+
     def os_release_info(self) -> Dict[str, str]:
         """
         Return a dictionary containing key-value pairs for the information
@@ -1082,6 +3250,8 @@ class LinuxDistribution:
 
         For details, see :func:`distro.uname_info`.
         """
+        import warnings
+
         warnings.warn(
             (
                 "LinuxDistribution.uname_info() is deprecated and will be removed in a"
@@ -1105,7 +3275,17 @@ class LinuxDistribution:
 
         For details, see :func:`distro.os_release_attr`.
         """
-        return self._os_release_info.get(attribute, "")
+        if (
+            attribute in ("codename", "release_codename")
+            or "_os_release_info" in self.__dict__
+            or "_os_release_info" in self._prefetching
+            or self.cache_file
+        ):
+            return self._os_release_info.get(attribute, "")
+        # Only parse the os-release file as far as needed for this attribute.
+        # The codenames are derived from other items, so they need all of
+        # them.
+        return self._os_release_parser.get(attribute)
 
     def lsb_release_attr(self, attribute: str) -> str:
         """
@@ -1114,8 +3294,64 @@ class LinuxDistribution:
 
         For details, see :func:`distro.lsb_release_attr`.
         """
+        if attribute in _LSB_RELEASE_ITEM_OPTIONS and self._runs_lsb_release_items():
+            return self._fetch_lsb_release_items((attribute,))[attribute]
         return self._lsb_release_info.get(attribute, "")
 
+    def _runs_lsb_release_items(self) -> bool:
+        """
+        Return whether single lsb_release information items are obtained by
+        running the command for them only, rather than from the information
+        of the whole lsb_release data source.
+        """
+        return (
+            self.include_lsb
+            and not self.cache_file
+            and "_lsb_release_info" not in self.__dict__
+            and "_lsb_release_info" not in self._prefetching
+            and not self._uses_lsb_release_file()
+        )
+
+    def _fetch_lsb_release_items(self, attributes: Iterable[str]) -> Dict[str, str]:
+        """
+        Return the lsb_release information items known so far, after running
+        the command for the specified ones that are not known yet, together
+        with those that the os-release file does not provide. This avoids
+        computing all of them, including the list of LSB modules, with
+        ``-a``.
+        """
+        items: Dict[str, str] = self.__dict__.setdefault("_lsb_release_items", {})
+        missing = [
+            item
+            for item, (_, os_release_item) in _LSB_RELEASE_ITEM_OPTIONS.items()
+            if item not in items
+            and (item in attributes or not self.os_release_attr(os_release_item))
+        ]
+        if not any(item in missing for item in attributes):
+            return items
+        import subprocess
+
+        try:
+            stdout = _command_output(
+                "lsb_release",
+                [_LSB_RELEASE_ITEM_OPTIONS[item][0] for item in missing],
+                self.command_timeouts.get("lsb_release"),
+            )
+        except subprocess.TimeoutExpired:
+            # lsb_release -a would time out as well: the whole data source is
+            # given up on.
+            self.__dict__.setdefault("_lsb_release_info", {})
+        else:
+            if stdout is None:
+                # The command may only support -a, or not work at all.
+                items.update(self._lsb_release_info)
+            else:
+                content = self._to_str(stdout).splitlines()
+                items.update(self._parse_lsb_release_content(content))
+        for item in missing:
+            items.setdefault(item, "")
+        return items
+
     def distro_release_attr(self, attribute: str) -> str:
         """
         Return a single named information item from the distro release file
@@ -1138,6 +3374,8 @@ class LinuxDistribution:
 
         For details, see :func:`distro.uname_attr`.
         """
+        import warnings
+
         warnings.warn(
             (
                 "LinuxDistribution.uname_attr() is deprecated and will be removed in a"
@@ -1158,6 +3396,7 @@ class LinuxDistribution:
         return self._uname_info.get(attribute, "")
 
     @cached_property
+    @_prefetchable
     def _os_release_info(self) -> Dict[str, str]:
         """
         Get the information items from the specified os-release file.
@@ -1165,42 +3404,95 @@ class LinuxDistribution:
         Returns:
             A dictionary containing all information items.
         """
-        if os.path.isfile(self.os_release_file):
-            with open(self.os_release_file, encoding="utf-8") as release_file:
-                return self._parse_os_release_content(release_file)
-        return {}
+        info: Dict[str, str] = self._cached_source(
+            "os_release_info", [self.os_release_file], self._read_os_release_file
+        )
+        return info
+
+    def _read_os_release_file(self) -> Dict[str, str]:
+        return self._complete_os_release_info(self._os_release_parser.parse_all())
+
+    def _read_source_file(
+        self, source: str, path: str, first_line: bool = False
+    ) -> bytes:
+        """
+        Return the content of a file of the named data source, read up to
+        the size limit of the data source.
+
+        The content of a larger file is truncated after its last complete
+        line within the limit. If only the *first_line* of the file is used,
+        and it is larger than the limit, the file is skipped instead, by
+        returning empty content. Both cases are recorded for
+        :meth:`oversized_files`.
+
+        Raises:
+
+        * :py:exc:`OSError`: The file cannot be opened or read.
+        """
+        limit = self.file_size_limits.get(source, _FILE_SIZE_LIMIT)
+        content = self._files.read(path, limit + 1)
+        if len(content) <= limit:
+            return content
+        content = content[:limit]
+        end = max(content.rfind(b"\n"), content.rfind(b"\r")) + 1
+        oversized_files = self.__dict__.setdefault("_oversized_files", {})
+        if first_line:
+            if end:
+                # The first line is complete.
+                return content
+            oversized_files[path] = "skipped"
+            return b""
+        oversized_files[path] = "truncated"
+        return content[:end]
+
+    def oversized_files(self) -> Dict[str, str]:
+        """
+        Return the files of the data sources read so far that were larger
+        than the size limit of their data source, as a dictionary mapping
+        their path names to ``"truncated"`` if only their complete lines
+        within the limit were used, or to ``"skipped"`` if they were not used
+        at all.
+
+        For details, see the ``file_size_limits`` parameter of
+        :class:`LinuxDistribution`.
+        """
+        return dict(self.__dict__.get("_oversized_files", {}))
+
+    @cached_property
+    def _os_release_parser(self) -> _OSReleaseParser:
+        """
+        Get the incremental parser of the specified os-release file.
+        """
+        try:
+            content = self._read_source_file("os_release", self.os_release_file)
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return _OSReleaseParser("")
+        return _OSReleaseParser(_decode_text(content, "utf-8"))
 
     @staticmethod
-    def _parse_os_release_content(lines: TextIO) -> Dict[str, str]:
+    def _parse_os_release_content(lines: Union[str, TextIO]) -> Dict[str, str]:
         """
         Parse the lines of an os-release file.
 
         Parameters:
 
-        * lines: Iterable through the lines in the os-release file.
-                 Each line must be a unicode string or a UTF-8 encoded byte
-                 string.
+        * lines: The content of the os-release file, or a text stream from
+                 which it is read.
 
         Returns:
             A dictionary containing all information items.
         """
-        props = {}
-        lexer = shlex.shlex(lines, posix=True)
-        lexer.whitespace_split = True
-
-        tokens = list(lexer)
-        for token in tokens:
-            # At this point, all shell-like parsing has been done (i.e.
-            # comments processed, quotes and backslash escape sequences
-            # processed, multi-line values assembled, trailing newlines
-            # stripped, etc.), so the tokens are now either:
-            # * variable assignments: var=value
-            # * commands or their arguments (not allowed in os-release)
-            # Ignore any tokens that are not variable assignments
-            if "=" in token:
-                k, v = token.split("=", 1)
-                props[k.lower()] = v
+        content = lines if isinstance(lines, str) else lines.read()
+        props = _OSReleaseParser(content).parse_all()
+        return LinuxDistribution._complete_os_release_info(props)
 
+    @staticmethod
+    def _complete_os_release_info(props: Dict[str, str]) -> Dict[str, str]:
+        """
+        Return the information items of an os-release file, completed with
+        the codename items derived from its raw information items.
+        """
+        props = dict(props)
         if "version" in props:
             # extract release codename (if any) from version attribute
             match = re.search(r"\((\D+)\)|,\s*(\D+)", props["version"])
@@ -1221,6 +3513,7 @@ class LinuxDistribution:
         return props
 
     @cached_property
+    @_prefetchable
     def _lsb_release_info(self) -> Dict[str, str]:
         """
         Get the information items from the lsb_release command output.
@@ -1230,11 +3523,79 @@ class LinuxDistribution:
         """
         if not self.include_lsb:
             return {}
+        lsb_release_file = os.path.join(self.etc_dir, "lsb-release")
+        if self._uses_lsb_release_file():
+            return self._read_lsb_release_file(lsb_release_file)
+        if not self.cache_file:
+            return self._run_lsb_release()
+        # lsb_release reads the lsb-release and os-release files itself, and
+        # the debian_version file on Debian.
+        command = _probe_command("lsb_release")
+        inputs = [
+            lsb_release_file,
+            self.os_release_file,
+            os.path.join(self.etc_dir, "debian_version"),
+            *([command] if command else _command_search_path()),
+        ]
+        info: Dict[str, str] = self._cached_source(
+            "lsb_release_info",
+            inputs,
+            self._run_lsb_release,
+            extra=os.environ.get("PATH"),
+        )
+        return info
+
+    def _uses_lsb_release_file(self) -> bool:
+        """
+        Return whether the lsb_release information is read from the
+        lsb-release file rather than from the lsb_release command output.
+        """
+        return self.lsb_source == "file" or (
+            self.lsb_source == "auto"
+            and (
+                self.root_dir is not None
+                or self._files.isfile(os.path.join(self.etc_dir, "lsb-release"))
+            )
+        )
+
+    def _read_lsb_release_file(self, lsb_release_file: str) -> Dict[str, str]:
+        """
+        Get the information items of the lsb_release command output from the
+        specified lsb-release file, completed by the os-release file.
+
+        Returns:
+            A dictionary containing all information items.
+        """
         try:
-            cmd = ("lsb_release", "-a")
-            stdout = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
-        # Command not found or lsb_release returned error
-        except (OSError, subprocess.CalledProcessError):
+            content = self._read_source_file("lsb_release", lsb_release_file)
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            props = {}
+        else:
+            props = _OSReleaseParser(_decode_text(content, "utf-8")).parse_all()
+        os_release_info = self._os_release_info
+        info = {}
+        if props.get("lsb_version"):
+            info["lsb_version"] = props["lsb_version"]
+        info["distributor_id"] = (
+            props.get("distrib_id") or os_release_info.get("id", "").title()
+        )
+        info["description"] = props.get("distrib_description") or os_release_info.get(
+            "pretty_name", ""
+        )
+        info["release"] = props.get("distrib_release") or os_release_info.get(
+            "version_id", ""
+        )
+        info["codename"] = props.get("distrib_codename") or os_release_info.get(
+            "codename", ""
+        )
+        return {k: "" if v == "n/a" else v for k, v in info.items()}
+
+    def _run_lsb_release(self) -> Dict[str, str]:
+        stdout = _run_command(
+            "lsb_release", ("-a",), self.command_timeouts.get("lsb_release")
+        )
+        # Command not found, returned error or timed out
+        if stdout is None:
             return {}
         content = self._to_str(stdout).splitlines()
         return self._parse_lsb_release_content(content)
@@ -1266,46 +3627,56 @@ class LinuxDistribution:
         return props
 
     @cached_property
+    @_prefetchable
     def _uname_info(self) -> Dict[str, str]:
         if not self.include_uname:
             return {}
-        try:
-            cmd = ("uname", "-rs")
-            stdout = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
-        except (OSError, subprocess.CalledProcessError):
+        if not hasattr(os, "uname"):
+            return self._run_uname()
+        # Same as the output of "uname -rs", without running it.
+        kernel = os.uname()
+        return self._parse_uname_content([f"{kernel.sysname} {kernel.release}"])
+
+    def _run_uname(self) -> Dict[str, str]:
+        stdout = _run_command("uname", ("-rs",), self.command_timeouts.get("uname"))
+        if stdout is None:
             return {}
         content = self._to_str(stdout).splitlines()
         return self._parse_uname_content(content)
 
     @cached_property
+    @_prefetchable
     def _oslevel_info(self) -> str:
         if not self.include_oslevel:
             return ""
-        try:
-            stdout = subprocess.check_output("oslevel", stderr=subprocess.DEVNULL)
-        except (OSError, subprocess.CalledProcessError):
+        stdout = _run_command("oslevel", (), self.command_timeouts.get("oslevel"))
+        if stdout is None:
             return ""
         return self._to_str(stdout).strip()
 
     @cached_property
     def _debian_version(self) -> str:
         try:
-            with open(
-                os.path.join(self.etc_dir, "debian_version"), encoding="ascii"
-            ) as fp:
-                return fp.readline().rstrip()
+            content = self._read_source_file(
+                "debian_version",
+                os.path.join(self.etc_dir, "debian_version"),
+                first_line=True,
+            )
         except FileNotFoundError:
             return ""
+        return _first_line(content).decode("ascii").rstrip()
 
     @cached_property
     def _armbian_version(self) -> str:
         try:
-            with open(
-                os.path.join(self.etc_dir, "armbian-release"), encoding="ascii"
-            ) as fp:
-                return self._parse_os_release_content(fp).get("version", "")
+            content = self._read_source_file(
+                "armbian_release", os.path.join(self.etc_dir, "armbian-release")
+            )
         except FileNotFoundError:
             return ""
+        return self._parse_os_release_content(_decode_text(content, "ascii")).get(
+            "version", ""
+        )
 
     @staticmethod
     def _parse_uname_content(lines: Sequence[str]) -> Dict[str, str]:
@@ -1332,6 +3703,63 @@ class LinuxDistribution:
         return bytestring.decode(encoding)
 
     @cached_property
+    def _cache_entries(self) -> Dict[str, Any]:
+        """
+        Get the entries of the detection cache file, or an empty dictionary
+        if there is no usable cache file.
+        """
+        if not self.cache_file:
+            return {}
+        return _read_cache_file(self.cache_file)
+
+    def _cached_source(
+        self,
+        name: str,
+        inputs: Sequence[str],
+        compute: Callable[[], Any],
+        extra: Any = None,
+        late_inputs: Optional[Callable[[Any], Sequence[str]]] = None,
+    ) -> Any:
+        """
+        Return the result of *compute*, from the detection cache file if the
+        stored result is still valid.
+
+        Parameters:
+
+        * name: Name of the cache entry.
+
+        * inputs: Path names of the files the result is derived from. Their
+          signatures are taken before calling *compute*.
+
+        * compute: Callable returning the JSON-serializable result.
+
+        * extra: Additional JSON-serializable data the result depends on.
+
+        * late_inputs: Callable returning further input path names for a
+          computed result, for inputs that are only known once computed.
+        """
+        if not self.cache_file:
+            return compute()
+
+        # The results also depend on the options limiting what is read.
+        extra = [extra, self.file_size_limits, self.release_discovery]
+        entry = self._cache_entries.get(name)
+        if entry is not None and _is_valid_cache_entry(entry, inputs, extra):
+            return entry["value"]
+
+        signatures = [[path, _stat_signature(path)] for path in inputs]
+        value = compute()
+        if late_inputs is not None:
+            signatures.extend(
+                [path, _stat_signature(path)] for path in late_inputs(value)
+            )
+        entry = {"inputs": signatures, "extra": extra, "value": value}
+        self._cache_entries[name] = entry
+        _update_cache_file(self.cache_file, name, entry)
+        return value
+
+    @cached_property
+    @_prefetchable
     def _distro_release_info(self) -> Dict[str, str]:
         """
         Get the information items from the specified distro release file.
@@ -1339,6 +3767,29 @@ class LinuxDistribution:
         Returns:
             A dictionary containing all information items.
         """
+
+        def late_inputs(result: Dict[str, Any]) -> List[str]:
+            # The directory signature covers added and removed candidates,
+            # the file signatures cover changes of the selected file.
+            inputs = [result["file"]] if result["file"] else []
+            if result["info"].get("id") == "armbian":
+                inputs.append(os.path.join(self.etc_dir, "armbian-release"))
+            return inputs
+
+        result = self._cached_source(
+            "distro_release_info",
+            [self.distro_release_file or self.etc_dir],
+            lambda: {
+                "info": self._read_distro_release_info(),
+                "file": self.distro_release_file,
+            },
+            late_inputs=late_inputs,
+        )
+        self.distro_release_file = result["file"]
+        info: Dict[str, str] = result["info"]
+        return info
+
+    def _read_distro_release_info(self) -> Dict[str, str]:
         if self.distro_release_file:
             # If it was specified, we use it and parse what we can, even if
             # its file name or content does not match the expected pattern.
@@ -1350,24 +3801,7 @@ class LinuxDistribution:
             # possible.
             match = _DISTRO_RELEASE_BASENAME_PATTERN.match(basename)
         else:
-            try:
-                basenames = [
-                    basename
-                    for basename in os.listdir(self.etc_dir)
-                    if basename not in _DISTRO_RELEASE_IGNORE_BASENAMES
-                    and os.path.isfile(os.path.join(self.etc_dir, basename))
-                ]
-                # We sort for repeatability in cases where there are multiple
-                # distro specific files; e.g. CentOS, Oracle, Enterprise all
-                # containing `redhat-release` on top of their own.
-                basenames.sort()
-            except OSError:
-                # This may occur when /etc is not readable but we can't be
-                # sure about the *-release files. Check common entries of
-                # /etc for information. If they turn out to not be there the
-                # error is handled in `_parse_distro_release_file()`.
-                basenames = _DISTRO_RELEASE_BASENAMES
-            for basename in basenames:
+            for basename in self._distro_release_basenames():
                 match = _DISTRO_RELEASE_BASENAME_PATTERN.match(basename)
                 if match is None:
                     continue
@@ -1398,6 +3832,37 @@ class LinuxDistribution:
 
         return distro_info
 
+    def _distro_release_basenames(self) -> Iterator[str]:
+        """
+        Yield the base file names of the candidate distro release files, in
+        the order in which they are searched.
+        """
+        probed = set()
+        if self.release_discovery == "probe":
+            probed.update(_DISTRO_RELEASE_BASENAMES)
+            os_release_id = self.os_release_attr("id")
+            if os_release_id:
+                probed.add(
+                    _DISTRO_RELEASE_BASENAMES_BY_OS_RELEASE_ID.get(
+                        os_release_id, f"{os_release_id}-release"
+                    )
+                )
+            probed.difference_update(_DISTRO_RELEASE_IGNORE_BASENAMES)
+            # In the same order as the listed files, so that the same file is
+            # found if it has one of the probed names.
+            yield from sorted(probed)
+        try:
+            basenames = self._files.distro_release_candidates(self.etc_dir)
+        except OSError:
+            # This may occur when /etc is not readable but we can't be
+            # sure about the *-release files. Check common entries of
+            # /etc for information. If they turn out to not be there the
+            # error is handled in `_parse_distro_release_file()`.
+            basenames = _DISTRO_RELEASE_BASENAMES
+        for basename in basenames:
+            if basename not in probed:
+                yield basename
+
     def _parse_distro_release_file(self, filepath: str) -> Dict[str, str]:
         """
         Parse a distro release file.
@@ -1410,15 +3875,18 @@ class LinuxDistribution:
             A dictionary containing all information items.
         """
         try:
-            with open(filepath, encoding="utf-8") as fp:
-                # Only parse the first line. For instance, on SLES there
-                # are multiple lines. We don't want them...
-                return self._parse_distro_release_content(fp.readline())
+            content = self._read_source_file(
+                "distro_release", filepath, first_line=True
+            )
         except OSError:
             # Ignore not being able to read a specific, seemingly version
             # related file.
             # See https://github.com/python-distro/distro/issues/162
             return {}
+        # Only parse the first line. For instance, on SLES there
+        # are multiple lines. We don't want them...
+        line = _first_line(content).decode("utf-8")
+        return self._parse_distro_release_content(line)
 
     @staticmethod
     def _parse_distro_release_content(line: str) -> Dict[str, str]:
@@ -1446,13 +3914,73 @@ class LinuxDistribution:
         return distro_info
 
 
-_distro = LinuxDistribution()
+_distro_instance: Optional[LinuxDistribution] = None
+_distro_lock = threading.Lock()
 
 
-def main() -> None:
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(logging.StreamHandler(sys.stdout))
+def _get_distro() -> LinuxDistribution:
+    """
+    Return the module-global :class:`LinuxDistribution` instance, creating it
+    on first use.
+
+    Creating the instance looks up the os-release file, so it is deferred
+    until some information is actually requested instead of happening on
+    ``import distro``. An instance assigned to ``distro._distro`` takes
+    precedence, as it did when the instance was created on import.
+    """
+    global _distro_instance
+    assigned: Optional[LinuxDistribution] = globals().get("_distro")
+    if assigned is not None:
+        return assigned
+    instance = _distro_instance
+    if instance is None:
+        with _distro_lock:
+            instance = _distro_instance
+            if instance is None:
+                instance = _distro_instance = LinuxDistribution()
+    return instance
+
+
+def __getattr__(name: str) -> Any:
+    # Keep the historical ``distro._distro`` attribute working, without
+    # creating the module-global instance at import time.
+    if name == "_distro":
+        return _get_distro()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _parse_args_fast(argv: Sequence[str]) -> Optional[Tuple[bool, Optional[str]]]:
+    """
+    Parse the common command line invocations without argparse.
+
+    Only ``--json``/``-j`` and ``--root-dir``/``-r`` (with a separate value or
+    as ``--root-dir=<value>``) are understood. Anything else, including help
+    requests, abbreviations, combined short options and errors, returns
+    ``None`` so that the caller can fall back to the full argparse parser.
+
+    Returns:
+        A tuple ``(json, root_dir)``, or ``None``.
+    """
+    as_json = False
+    root_dir = None
+    args = iter(argv)
+    for arg in args:
+        if arg in ("--json", "-j"):
+            as_json = True
+        elif arg in ("--root-dir", "-r"):
+            value = next(args, None)
+            if value is None or value.startswith("-"):
+                return None
+            root_dir = value
+        elif arg.startswith("--root-dir="):
+            root_dir = arg.partition("=")[2]
+        else:
+            return None
+    return as_json, root_dir
+
+
+def _parse_args(argv: Sequence[str]) -> Tuple[bool, Optional[str]]:
+    import argparse
 
     parser = argparse.ArgumentParser(description="OS distro info tool")
     parser.add_argument(
@@ -1467,26 +3995,38 @@ def main() -> None:
         help="Path to the root filesystem directory (defaults to /)",
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    return args.json, args.root_dir
+
 
-    if args.root_dir:
+def main() -> None:
+    argv = sys.argv[1:]
+    # The common invocations are handled without building an argparse parser,
+    # since the CLI is typically called many times from shell scripts.
+    parsed = _parse_args_fast(argv)
+    as_json, root_dir = parsed if parsed is not None else _parse_args(argv)
+
+    if root_dir:
         dist = LinuxDistribution(
             include_lsb=False,
             include_uname=False,
             include_oslevel=False,
-            root_dir=args.root_dir,
+            root_dir=root_dir,
         )
     else:
-        dist = _distro
+        dist = _get_distro()
 
-    if args.json:
-        logger.info(json.dumps(dist.info(), indent=4, sort_keys=True))
+    if as_json:
+        import json
+
+        output = json.dumps(dist.info(), indent=4, sort_keys=True) + "\n"
     else:
-        logger.info("Name: %s", dist.name(pretty=True))
-        distribution_version = dist.version(pretty=True)
-        logger.info("Version: %s", distribution_version)
-        distribution_codename = dist.codename()
-        logger.info("Codename: %s", distribution_codename)
+        output = (
+            f"Name: {dist.name(pretty=True)}\n"
+            f"Version: {dist.version(pretty=True)}\n"
+            f"Codename: {dist.codename()}\n"
+        )
+    sys.stdout.write(output)
 
 
 if __name__ == "__main__":
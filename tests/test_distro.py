@@ -13,13 +13,25 @@
 # limitations under the License.
 
 import ast
+import asyncio
+import gzip
+import hashlib
 import io
 import json
+import lzma
 import os
+import random
+import shlex
+import shutil
+import signal
+import stat
 import subprocess
 import sys
+import tarfile
+import threading
+import time
 from types import FunctionType
-from typing import Any, Dict, List, NoReturn, Optional
+from typing import IO, Any, Callable, Dict, List, NoReturn, Optional, Tuple
 
 import pytest
 
@@ -33,7 +45,7 @@ DISTROS = [dist for dist in os.listdir(DISTROS_DIR) if dist != "__shared__"]
 
 IS_LINUX = sys.platform.startswith("linux")
 if IS_LINUX:
-    from distro import distro
+    from distro import aio, distro
 
     RELATIVE_UNIXCONFDIR = distro._UNIXCONFDIR[1:]
     RELATIVE_UNIXUSRLIBDIR = distro._UNIXUSRLIBDIR[1:]
@@ -48,6 +60,117 @@ class TestNonLinuxPlatform:
             assert "Unsupported platform" in str(ex)
 
 
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestImport:
+    def _run(self, script: str) -> str:
+        r = subprocess.run(
+            [sys.executable, "-c", script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+        )
+        assert r.returncode == 0, r.stderr
+        return r.stdout
+
+    @pytest.mark.skipif(
+        sys.version_info < (3, 8), reason="Audit hooks require Python 3.8"
+    )
+    def test_import_does_no_filesystem_access(self) -> None:
+        # Record every stat, directory listing, subprocess and non-module open
+        # performed while importing distro. The import system uses its own
+        # copies of the os functions, so patching the os module only catches
+        # the accesses done by the package itself.
+        script = """if True:
+            import os, sys
+
+            accessed = []
+
+            def record(name):
+                func = getattr(os, name)
+
+                def wrapper(path=".", *args, **kwargs):
+                    accessed.append((name, path))
+                    return func(path, *args, **kwargs)
+
+                setattr(os, name, wrapper)
+
+            def hook(event, args):
+                if event == "subprocess.Popen":
+                    accessed.append((event, args[0]))
+                elif event == "open" and isinstance(args[0], str):
+                    if not args[0].endswith((".py", ".pyc")):
+                        accessed.append((event, args[0]))
+
+            for name in ("stat", "lstat", "listdir", "scandir"):
+                record(name)
+            sys.addaudithook(hook)
+            import distro
+            print(accessed)
+        """
+        assert self._run(script) == "[]\n"
+
+    def test_import_does_not_load_heavy_modules(self) -> None:
+        r = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import distro.distro"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+        )
+        assert r.returncode == 0, r.stderr
+        # Each line reads "import time: self | cumulative | <indent>name", and
+        # the modules imported by a module are listed before it, one level
+        # deeper.
+        lines = [
+            line.rsplit("|", 1)[1]
+            for line in r.stderr.splitlines()
+            if line.startswith("import time:") and line.count("|") == 2
+        ]
+        names = [line.strip() for line in lines]
+        index = names.index("distro.distro")
+        depth = len(lines[index]) - len(names[index])
+        imported = set()
+        direct = set()
+        for line, name in zip(reversed(lines[:index]), reversed(names[:index])):
+            line_depth = len(line) - len(name)
+            if line_depth <= depth:
+                break
+            imported.add(name)
+            if line_depth == depth + 2:
+                direct.add(name)
+
+        # Only needed by the CLI, the subprocess data sources or the
+        # deprecated accessors, and imported there.
+        lazy = {"argparse", "asyncio", "json", "logging", "shlex", "subprocess"}
+        assert not imported & lazy
+        # Any new module-level import must be added here consciously.
+        assert direct <= {"functools", "os", "re", "sys", "threading", "typing"}
+
+    def test_module_global_instance_is_created_lazily(self) -> None:
+        script = """if True:
+            import distro.distro as d
+
+            print(d._distro_instance is None)
+            d.id()
+            print(d._distro_instance is d._distro)
+        """
+        assert self._run(script) == "True\nTrue\n"
+
+    def test_assigned_module_global_instance(self) -> None:
+        script = f"""if True:
+            import distro.distro as d
+
+            d._distro = d.LinuxDistribution(
+                root_dir={os.path.join(DISTROS_DIR, "centos7")!r},
+                include_lsb=False,
+                include_uname=False,
+            )
+            print(d.id(), d._distro_instance)
+            del d._distro
+            print(d._distro is d._distro_instance)
+        """
+        assert self._run(script) == "centos None\nTrue\n"
+
+
 @pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
 class TestCli:
     def _parse(self, command: str) -> None:
@@ -71,6 +194,56 @@ class TestCli:
         root_dir = os.path.join(RESOURCES, "cli", "fedora30")
         self._parse(f"distro --root-dir {root_dir}")
 
+    @pytest.mark.parametrize(
+        "argv, expected",
+        (
+            ([], (False, None)),
+            (["-j"], (True, None)),
+            (["--json", "--root-dir", "/x"], (True, "/x")),
+            (["-r", "/x", "-j"], (True, "/x")),
+            (["--root-dir=/x"], (False, "/x")),
+            (["-r"], None),
+            (["-r", "-j"], None),
+            (["-jr", "/x"], None),
+            (["--js"], None),
+            (["--help"], None),
+            (["extra"], None),
+        ),
+    )
+    def test_cli_fast_path_parsing(
+        self, argv: List[str], expected: Optional[Any]
+    ) -> None:
+        assert distro._parse_args_fast(argv) == expected
+
+    @pytest.mark.parametrize(
+        "argv",
+        (
+            ["-r", "/x"],
+            ["--json", "--root-dir", "/x"],
+            ["--root-dir=/x", "-j"],
+        ),
+    )
+    def test_cli_fast_path_matches_argparse(self, argv: List[str]) -> None:
+        assert distro._parse_args_fast(argv) == distro._parse_args(argv)
+
+    def test_cli_fallback_output_matches_fast_path(
+        self, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        root_dir = os.path.join(RESOURCES, "cli", "fedora30")
+        self._parse(f"distro -j -r {root_dir}")
+        fast = capsys.readouterr().out
+        self._parse(f"distro -jr {root_dir}")
+        assert capsys.readouterr().out == fast
+
+    def test_cli_fast_path_skips_argparse(self) -> None:
+        root_dir = os.path.join(RESOURCES, "cli", "fedora30")
+        script = (
+            "import sys, distro.distro; distro.distro.main();"
+            "print('argparse' in sys.modules, 'logging' in sys.modules)"
+        )
+        command = [sys.executable, "-c", script, "--root-dir", root_dir]
+        assert self._run(command).endswith("Codename: \nFalse False\n")
+
     def test_cli(self) -> None:
         command = [sys.executable, "-m", "distro"]
         desired_output = f"Name: {distro.name(pretty=True)}"
@@ -119,11 +292,13 @@ class DistroTestCase:
         self._saved_path = os.environ["PATH"]
         self._saved_UNIXCONFDIR = distro._UNIXCONFDIR
         self._saved_UNIXUSRLIBDIR = distro._UNIXUSRLIBDIR
+        self._saved_uname = os.uname
 
     def teardown_method(self, test_method: FunctionType) -> None:
         os.environ["PATH"] = self._saved_path
         distro._UNIXCONFDIR = self._saved_UNIXCONFDIR
         distro._UNIXUSRLIBDIR = self._saved_UNIXUSRLIBDIR
+        os.uname = self._saved_uname
 
     def _setup_for_distro(self, distro_root: str) -> None:
         distro_bin = os.path.join(distro_root, "bin")
@@ -132,6 +307,18 @@ class DistroTestCase:
         os.environ["PATH"] = distro_bin
         distro._UNIXCONFDIR = os.path.join(distro_root, RELATIVE_UNIXCONFDIR)
         distro._UNIXUSRLIBDIR = os.path.join(distro_root, RELATIVE_UNIXUSRLIBDIR)
+        # The uname data source uses os.uname(), so we emulate the kernel of
+        # the distro from the output of its uname command, if it has one:
+        uname = os.path.join(distro_bin, "uname")
+        if os.path.isfile(uname):
+            sysname, _, release = (
+                subprocess.check_output(("/bin/sh", uname, "-rs"))
+                .decode("utf-8")
+                .strip()
+                .partition(" ")
+            )
+            kernel = os.uname_result((sysname, "localhost", release, "", ""))
+            os.uname = lambda: kernel
 
 
 @pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
@@ -969,6 +1156,246 @@ class TestLSBRelease(DistroTestCase):
         assert lsb_release_info == {}
 
 
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestLSBReleaseFile(DistroTestCase):
+    """Test the lsb_release information read from the lsb-release and
+    os-release files, instead of the lsb_release command output."""
+
+    def _no_command(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def _run_lsb_release(self: distro.LinuxDistribution) -> NoReturn:
+            raise AssertionError("lsb_release must not be run")
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_run_lsb_release", _run_lsb_release
+        )
+
+    @pytest.mark.parametrize(
+        "dist",
+        (
+            "debian10",
+            "debian13",
+            "debiantesting",
+            "linuxmint17",
+            "manjaro1512",
+            "ubuntu14",
+            "ubuntu16",
+        ),
+    )
+    def test_same_as_command(self, monkeypatch: pytest.MonkeyPatch, dist: str) -> None:
+        distro_root = os.path.join(DISTROS_DIR, dist)
+        # Not all of the lsb_release scripts of the test distros are
+        # executable, so they are run through bash.
+        stdout = subprocess.check_output(
+            ("/bin/bash", os.path.join(distro_root, "bin", "lsb_release"), "-a")
+        )
+        expected = distro.LinuxDistribution._parse_lsb_release_content(
+            stdout.decode("utf-8").splitlines()
+        )
+
+        self._no_command(monkeypatch)
+        self._setup_for_distro(distro_root)
+        _distro = distro.LinuxDistribution(lsb_source="file")
+        assert _distro.lsb_release_info() == expected
+        _distro = distro.LinuxDistribution(root_dir=distro_root, lsb_source="file")
+        assert _distro.include_lsb
+        assert _distro.lsb_release_info() == expected
+
+    def test_lsb_version(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._no_command(monkeypatch)
+        _distro = distro.LinuxDistribution(
+            root_dir=os.path.join(TESTDISTROS, "distro", "lsbversion"),
+            lsb_source="file",
+        )
+        assert _distro.lsb_release_info() == {
+            "lsb_version": "core-4.1-amd64:core-4.1-noarch",
+            "distributor_id": "Distro",
+            "description": "",
+            "release": "1.0",
+            "codename": "",
+        }
+
+    def test_no_files(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> None:
+        self._no_command(monkeypatch)
+        _distro = distro.LinuxDistribution(root_dir=str(tmp_path), lsb_source="file")
+        assert _distro.lsb_release_info() == {
+            "distributor_id": "",
+            "description": "",
+            "release": "",
+            "codename": "",
+        }
+
+    def test_auto(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(
+            distro.LinuxDistribution,
+            "_run_lsb_release",
+            lambda self: {"distributor_id": "command"},
+        )
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        _distro = distro.LinuxDistribution(lsb_source="auto")
+        assert _distro.lsb_release_attr("distributor_id") == "Ubuntu"
+
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "debian10"))
+        _distro = distro.LinuxDistribution(lsb_source="auto")
+        assert _distro.lsb_release_attr("distributor_id") == "command"
+
+        _distro = distro.LinuxDistribution(
+            root_dir=os.path.join(DISTROS_DIR, "debian10"), lsb_source="auto"
+        )
+        assert _distro.lsb_release_attr("distributor_id") == "Debian"
+
+    def test_root_dir_with_command(self) -> None:
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution(
+                root_dir=os.path.join(DISTROS_DIR, "ubuntu16"), include_lsb=True
+            )
+        _distro = distro.LinuxDistribution(
+            root_dir=os.path.join(DISTROS_DIR, "ubuntu16"), include_lsb=False
+        )
+        assert not _distro.include_lsb
+
+    def test_unsupported_source(self) -> None:
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution(lsb_source="lsb_release")
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestLSBReleaseItems(DistroTestCase):
+    def _record_commands(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> List[Tuple[str, List[str]]]:
+        calls: List[Tuple[str, List[str]]] = []
+        command_output = distro._command_output
+
+        def _command_output(
+            name: str, args: List[str], timeout: Optional[float]
+        ) -> Optional[bytes]:
+            calls.append((name, list(args)))
+            return command_output(name, args, timeout)
+
+        monkeypatch.setattr(distro, "_command_output", _command_output)
+        return calls
+
+    def test_provided_by_os_release(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        expected = distro.LinuxDistribution(include_oslevel=False)
+        expected.lsb_release_info()
+        calls = self._record_commands(monkeypatch)
+        _distro = distro.LinuxDistribution(include_oslevel=False)
+        assert _distro.info(pretty=True) == expected.info(pretty=True)
+        assert calls == []
+        # All version sources are examined.
+        assert _distro.version(best=True) == expected.version(best=True)
+        assert calls == [("lsb_release", ["-d", "-r"])]
+        assert _distro.info(pretty=True, best=True) == expected.info(
+            pretty=True, best=True
+        )
+        assert len(calls) == 1
+
+    def test_no_os_release(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu14"))
+        os_release_file = "path-to-non-existing-file"
+        expected = distro.LinuxDistribution(
+            include_oslevel=False, os_release_file=os_release_file
+        )
+        expected.lsb_release_info()
+        calls = self._record_commands(monkeypatch)
+        _distro = distro.LinuxDistribution(
+            include_oslevel=False, os_release_file=os_release_file
+        )
+        assert _distro.id() == "ubuntu"
+        assert calls == [("lsb_release", ["-i", "-d", "-r", "-c"])]
+        assert _distro.info(pretty=True, best=True) == expected.info(
+            pretty=True, best=True
+        )
+        assert _distro.name(pretty=True) == expected.name(pretty=True)
+        assert len(calls) == 1
+        assert _distro.lsb_release_info() == expected.lsb_release_info()
+        assert calls[1:] == [("lsb_release", ["-a"])]
+
+    def test_only_all_option(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Any
+    ) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu14"))
+        lsb_release = tmp_path / "lsb_release"
+        lsb_release.write_text(
+            '#!/bin/sh\n[ "$*" = -a ] || exit 2\n'
+            "echo 'Distributor ID:\tUbuntu'\necho 'Release:\t14.04'\n"
+        )
+        lsb_release.chmod(0o755)
+        os.environ["PATH"] = str(tmp_path)
+        calls = self._record_commands(monkeypatch)
+        _distro = distro.LinuxDistribution(
+            include_oslevel=False, os_release_file="path-to-non-existing-file"
+        )
+        assert _distro.lsb_release_attr("release") == "14.04"
+        assert _distro.lsb_release_attr("codename") == ""
+        assert calls == [
+            ("lsb_release", ["-i", "-d", "-r", "-c"]),
+            ("lsb_release", ["-a"]),
+        ]
+
+    def test_command_error(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(TESTDISTROS, "lsb", "lsb_rc001"))
+        calls = self._record_commands(monkeypatch)
+        _distro = distro.LinuxDistribution(include_oslevel=False)
+        assert _distro.lsb_release_attr("distributor_id") == ""
+        assert _distro.lsb_release_attr("release") == ""
+        assert len(calls) == 2
+        assert _distro.lsb_release_info() == {}
+        assert len(calls) == 2
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestUname(DistroTestCase):
+    """Test that the uname information from os.uname() is the same as from the
+    uname command."""
+
+    @pytest.mark.parametrize(
+        "distro_root",
+        (
+            os.path.join(DISTROS_DIR, "freebsd111"),
+            os.path.join(DISTROS_DIR, "midnightbsd12"),
+            os.path.join(DISTROS_DIR, "netbsd711"),
+            os.path.join(DISTROS_DIR, "openbsd62"),
+            os.path.join(TESTDISTROS, "distro", "baduname"),
+            os.path.join(TESTDISTROS, "distro", "emptyuname"),
+        ),
+        ids=os.path.basename,
+    )
+    def test_same_as_command(
+        self, monkeypatch: pytest.MonkeyPatch, distro_root: str
+    ) -> None:
+        self._setup_for_distro(distro_root)
+        expected = distro.LinuxDistribution()._run_uname()
+
+        def _run_uname(self: distro.LinuxDistribution) -> NoReturn:
+            raise AssertionError("uname must not be run")
+
+        monkeypatch.setattr(distro.LinuxDistribution, "_run_uname", _run_uname)
+        assert distro.LinuxDistribution()._uname_info == expected
+
+    def test_bsd(self) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "freebsd111"))
+        assert distro.LinuxDistribution()._uname_info == {
+            "id": "freebsd",
+            "name": "FreeBSD",
+            "release": "11.1",
+        }
+
+    def test_linux(self) -> None:
+        os.uname = lambda: os.uname_result(("Linux", "host", "6.1.0", "#1", "x86_64"))
+        assert distro.LinuxDistribution()._uname_info == {}
+
+    def test_command_fallback(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "openbsd62"))
+        monkeypatch.delattr(os, "uname")
+        assert distro.LinuxDistribution()._uname_info == {
+            "id": "openbsd",
+            "name": "OpenBSD",
+            "release": "6.2",
+        }
+
+
 @pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
 class TestSpecialRelease(DistroTestCase):
     def _test_outcome(self, outcome: Dict[str, str]) -> None:
@@ -2286,9 +2713,9 @@ class TestOverall(DistroTestCase):
         self._test_release_file_info("armbian-release", desired_info)
 
 
-def _bad_os_listdir(path: str = ".") -> NoReturn:
+def _bad_os_scandir(path: str = ".") -> NoReturn:
     """This function is used by TestOverallWithEtcNotReadable to simulate
-    a folder that cannot be called with os.listdir() but files are still
+    a folder that cannot be called with os.scandir() but files are still
     readable. Forces distro to guess which *-release files are available."""
     raise OSError()
 
@@ -2296,16 +2723,16 @@ def _bad_os_listdir(path: str = ".") -> NoReturn:
 @pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
 class TestOverallWithEtcNotReadable(TestOverall):
     def setup_method(self, test_method: FunctionType) -> None:
-        self._old_listdir = os.listdir
+        self._old_scandir = os.scandir
         # Incompatible types in assignment (expression has type
         # "Callable[[str], NoReturn]", variable has type overloaded function)
-        os.listdir = _bad_os_listdir  # type: ignore[assignment]
+        os.scandir = _bad_os_scandir  # type: ignore[assignment]
         super().setup_method(test_method)
 
     def teardown_method(self, test_method: FunctionType) -> None:
         super().teardown_method(test_method)
-        if os.listdir is _bad_os_listdir:
-            os.listdir = self._old_listdir
+        if os.scandir is _bad_os_scandir:
+            os.scandir = self._old_scandir
 
     def test_almalinux10_release(self) -> None:
         # When /etc is not listable, centos-release is found before almalinux-release
@@ -2493,6 +2920,706 @@ class TestInfo(DistroTestCase):
             _test_all(info, pretty=True, best=True)
 
 
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestSnapshot(DistroTestCase):
+    def _info(self, _distro: distro.LinuxDistribution) -> Dict[str, Any]:
+        return {
+            "info": _distro.info(),
+            "best_info": _distro.info(pretty=True, best=True),
+            "name": _distro.name(pretty=True),
+            "linux_distribution": _distro.linux_distribution(),
+            "os_release_info": _distro.os_release_info(),
+            "lsb_release_info": _distro.lsb_release_info(),
+            "distro_release_info": _distro.distro_release_info(),
+            "distro_release_file": _distro.distro_release_file,
+            "oslevel_info": _distro.oslevel_info(),
+        }
+
+    def test_snapshot_roundtrip(self) -> None:
+        for dist in DISTROS:
+            self._setup_for_distro(os.path.join(DISTROS_DIR, dist))
+            snapshot = distro.LinuxDistribution().snapshot()
+            expected = self._info(distro.LinuxDistribution())
+
+            # Nothing must be read from the filesystem or from commands
+            # when restoring the snapshot.
+            self._setup_for_distro(os.path.join(DISTROS_DIR, "non-existing"))
+            restored = distro.LinuxDistribution.from_snapshot(
+                json.loads(json.dumps(snapshot))
+            )
+            assert self._info(restored) == expected, dist
+            assert restored.snapshot() == snapshot
+
+    def test_snapshot_with_root_dir(self) -> None:
+        root_dir = os.path.join(DISTROS_DIR, "centos7")
+        snapshot = distro.LinuxDistribution(root_dir=root_dir).snapshot()
+        restored = distro.LinuxDistribution.from_snapshot(snapshot)
+        assert restored.root_dir == root_dir
+        assert restored.include_lsb is False
+        assert restored.distro_release_file == os.path.join(
+            root_dir, "etc", "centos-release"
+        )
+        assert restored.id() == "centos"
+
+    def test_snapshot_unsupported_version(self) -> None:
+        snapshot = distro.LinuxDistribution(include_lsb=False).snapshot()
+        snapshot["version"] = 0
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_snapshot(snapshot)
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestCacheFile(DistroTestCase):
+    def _setup_root(self, tmp_path: Any, dist: str) -> str:
+        root = str(tmp_path / dist)
+        shutil.copytree(os.path.join(DISTROS_DIR, dist), root, symlinks=True)
+        self._setup_for_distro(root)
+        return root
+
+    def _fail(self, *args: Any) -> NoReturn:
+        raise AssertionError("data source must be read from the cache")
+
+    def _disable_sources(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        for method in (
+            "_read_os_release_file",
+            "_run_lsb_release",
+            "_read_distro_release_info",
+            "_run_uname",
+        ):
+            monkeypatch.setattr(distro.LinuxDistribution, method, self._fail)
+
+    def test_cache_hit(self, tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_root(tmp_path, "ubuntu16")
+        cache_file = str(tmp_path / "cache" / "distro.json")
+        _distro = distro.LinuxDistribution(cache_file=cache_file)
+        expected = _distro.info()
+        expected_lsb = _distro.lsb_release_info()
+        assert expected["id"] == "ubuntu"
+        assert expected_lsb["codename"] == "xenial"
+        assert os.listdir(tmp_path / "cache") == ["distro.json"]
+
+        self._disable_sources(monkeypatch)
+        cached = distro.LinuxDistribution(cache_file=cache_file)
+        assert cached.info() == expected
+        assert cached.lsb_release_info() == expected_lsb
+
+    def test_cache_distro_release_file(
+        self, tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        root = self._setup_root(tmp_path, "centos7")
+        cache_file = str(tmp_path / "distro.json")
+        expected = distro.LinuxDistribution(cache_file=cache_file)
+        expected_info = expected.distro_release_info()
+
+        self._disable_sources(monkeypatch)
+        cached = distro.LinuxDistribution(cache_file=cache_file)
+        assert cached.distro_release_info() == expected_info
+        assert cached.distro_release_file == os.path.join(root, "etc", "centos-release")
+
+    def test_stale_entries(self, tmp_path: Any) -> None:
+        root = self._setup_root(tmp_path, "ubuntu16")
+        cache_file = str(tmp_path / "distro.json")
+        assert distro.LinuxDistribution(cache_file=cache_file).id() == "ubuntu"
+
+        with open(os.path.join(root, "etc", "os-release"), "a") as fp:
+            fp.write("ID=changed\n")
+        assert distro.LinuxDistribution(cache_file=cache_file).id() == "changed"
+
+        with open(os.path.join(root, "etc", "lsb-release"), "w") as fp:
+            fp.write("DISTRIB_CODENAME=other\n")
+        _distro = distro.LinuxDistribution(cache_file=cache_file)
+        assert _distro.lsb_release_attr("codename") == "other"
+
+        with open(os.path.join(root, "etc", "other-release"), "w") as fp:
+            fp.write("Other 1.0\n")
+        _distro = distro.LinuxDistribution(cache_file=cache_file)
+        assert _distro.distro_release_attr("id") == "other"
+
+    def test_debian_version_invalidates_lsb_release(
+        self, tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        root = self._setup_root(tmp_path, "ubuntu16")
+        cache_file = str(tmp_path / "distro.json")
+        expected = distro.LinuxDistribution(cache_file=cache_file).lsb_release_info()
+
+        with open(os.path.join(root, "etc", "debian_version"), "a") as fp:
+            fp.write("changed\n")
+        runs = []
+        run_lsb_release = distro.LinuxDistribution._run_lsb_release
+
+        def _run_lsb_release(self: distro.LinuxDistribution) -> Dict[str, str]:
+            runs.append(self)
+            return run_lsb_release(self)
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_run_lsb_release", _run_lsb_release
+        )
+        _distro = distro.LinuxDistribution(cache_file=cache_file)
+        assert _distro.lsb_release_info() == expected
+        assert len(runs) == 1
+
+    def test_cache_keyed_on_read_options(self, tmp_path: Any) -> None:
+        self._setup_root(tmp_path, "centos7")
+        cache_file = str(tmp_path / "distro.json")
+        limited = distro.LinuxDistribution(
+            cache_file=cache_file,
+            file_size_limits={"os_release": 16, "distro_release": 16},
+        )
+        assert limited.os_release_info() == {}
+        assert limited.distro_release_info() == {}
+
+        _distro = distro.LinuxDistribution(cache_file=cache_file)
+        assert _distro.os_release_attr("id") == "centos"
+        assert _distro.distro_release_attr("id") == "centos"
+
+        probing = distro.LinuxDistribution(
+            cache_file=cache_file, release_discovery="probe"
+        )
+        assert probing.distro_release_attr("id") == "centos"
+        entries = json.loads((tmp_path / "distro.json").read_text())["entries"]
+        assert entries["distro_release_info"]["extra"][2] == "probe"
+
+    def test_cache_not_shared_between_files(self, tmp_path: Any) -> None:
+        cache_file = str(tmp_path / "distro.json")
+        for dist, distro_id in (("ubuntu16", "ubuntu"), ("centos7", "centos")):
+            _distro = distro.LinuxDistribution(
+                root_dir=os.path.join(DISTROS_DIR, dist), cache_file=cache_file
+            )
+            assert _distro.os_release_attr("id") == distro_id
+
+    def test_invalid_cache_file(self, tmp_path: Any) -> None:
+        self._setup_root(tmp_path, "ubuntu16")
+        cache_file = tmp_path / "distro.json"
+        cache_file.write_text("{not json")
+        assert distro.LinuxDistribution(cache_file=str(cache_file)).id() == "ubuntu"
+        assert json.loads(cache_file.read_text())["version"] == 1
+
+    def test_unwritable_cache_file(self, tmp_path: Any) -> None:
+        self._setup_root(tmp_path, "ubuntu16")
+        cache_file = str(tmp_path / "file" / "distro.json")
+        (tmp_path / "file").write_text("")
+        assert distro.LinuxDistribution(cache_file=cache_file).id() == "ubuntu"
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestCommandProbes(DistroTestCase):
+    def setup_method(self, test_method: FunctionType) -> None:
+        super().setup_method(test_method)
+        self._saved_probes = dict(distro._command_probes)
+        distro._command_probes.clear()
+
+    def teardown_method(self, test_method: FunctionType) -> None:
+        distro._command_probes.clear()
+        distro._command_probes.update(self._saved_probes)
+        super().teardown_method(test_method)
+
+    def _count_subprocesses(self, monkeypatch: pytest.MonkeyPatch) -> List[Any]:
+        calls: List[Any] = []
+        check_output = subprocess.check_output
+
+        def _check_output(*args: Any, **kwargs: Any) -> Any:
+            calls.append(args[0])
+            return check_output(*args, **kwargs)
+
+        monkeypatch.setattr(subprocess, "check_output", _check_output)
+        return calls
+
+    def test_missing_commands_not_run(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "centos7"))
+        calls = self._count_subprocesses(monkeypatch)
+        for _ in range(3):
+            _distro = distro.LinuxDistribution(include_lsb=True, lsb_source="command")
+            assert _distro.lsb_release_info() == {}
+            assert _distro._oslevel_info == ""
+        assert calls == []
+        assert distro.command_probes() == {"lsb_release": None, "oslevel": None}
+
+    def test_found_command(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        calls = self._count_subprocesses(monkeypatch)
+        lsb_release = os.path.join(DISTROS_DIR, "ubuntu16", "bin", "lsb_release")
+        for _ in range(2):
+            _distro = distro.LinuxDistribution(include_oslevel=False)
+            assert _distro.lsb_release_info()["distributor_id"] == "Ubuntu"
+        assert calls == [(lsb_release, "-a")] * 2
+        assert distro.command_probes() == {"lsb_release": lsb_release}
+
+    def test_path_change(self) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "centos7"))
+        distro.LinuxDistribution(
+            include_lsb=True, lsb_source="command"
+        )._lsb_release_info
+        assert distro.command_probes() == {"lsb_release": None}
+
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        assert distro.command_probes() == {}
+        _distro = distro.LinuxDistribution(include_oslevel=False)
+        assert _distro.lsb_release_info()["distributor_id"] == "Ubuntu"
+        assert distro.command_probes() == {
+            "lsb_release": os.path.join(DISTROS_DIR, "ubuntu16", "bin", "lsb_release")
+        }
+
+    def test_async(self) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "centos7"))
+        _distro = distro.LinuxDistribution(include_lsb=True, lsb_source="command")
+        asyncio.run(_distro.ainfo())
+        assert _distro.lsb_release_info() == {}
+        assert distro.command_probes() == {"lsb_release": None, "oslevel": None}
+
+    def test_concurrent(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "centos7"))
+        barrier = threading.Barrier(4)
+        lookups: List[str] = []
+        find_command = distro._find_command
+
+        def _find_command(name: str) -> Optional[str]:
+            lookups.append(name)
+            time.sleep(0.05)
+            return find_command(name)
+
+        monkeypatch.setattr(distro, "_find_command", _find_command)
+        results: List[Optional[str]] = []
+
+        def probe() -> None:
+            barrier.wait()
+            results.append(distro._probe_command("lsb_release"))
+
+        threads = [threading.Thread(target=probe) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [None] * 4
+        assert lookups == ["lsb_release"]
+        assert distro.command_probes() == {"lsb_release": None}
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestCommandTimeouts(DistroTestCase):
+    def _setup_hanging_lsb_release(self, tmp_path: Any) -> None:
+        sleep = shutil.which("sleep")
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "centos7"))
+        self.pid_file = tmp_path / "pid"
+        lsb_release = tmp_path / "lsb_release"
+        # The command hangs in a process it started, which must be killed too.
+        lsb_release.write_text(
+            f"#!/bin/sh\n{sleep} 60 &\necho $! >{self.pid_file}\nwait\n"
+        )
+        lsb_release.chmod(0o755)
+        os.environ["PATH"] = str(tmp_path)
+
+    def _assert_killed(self) -> None:
+        pid = int(self.pid_file.read_text())
+        for _ in range(100):
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    state = f.read().rpartition(")")[2].split()[0]
+            except FileNotFoundError:
+                return
+            if state == "Z":
+                return
+            threading.Event().wait(0.05)
+        pytest.fail(f"process {pid} is still running")
+
+    def test_timeout(self, tmp_path: Any) -> None:
+        self._setup_hanging_lsb_release(tmp_path)
+        count = distro.command_timeout_counts().get("lsb_release", 0)
+        _distro = distro.LinuxDistribution(
+            include_lsb=True, command_timeouts={"lsb_release": 0.5}
+        )
+        assert _distro.lsb_release_info() == {}
+        assert _distro.id() == "centos"
+        self._assert_killed()
+        assert distro.command_timeout_counts()["lsb_release"] == count + 1
+
+    def test_timeout_of_single_items(self, tmp_path: Any) -> None:
+        self._setup_hanging_lsb_release(tmp_path)
+        count = distro.command_timeout_counts().get("lsb_release", 0)
+        _distro = distro.LinuxDistribution(
+            include_oslevel=False,
+            os_release_file="path-to-non-existing-file",
+            command_timeouts={"lsb_release": 0.5},
+        )
+        # lsb_release -a is not run after lsb_release -r timed out.
+        assert _distro.lsb_release_attr("release") == ""
+        assert _distro.lsb_release_attr("codename") == ""
+        assert _distro.lsb_release_info() == {}
+        self._assert_killed()
+        assert distro.command_timeout_counts()["lsb_release"] == count + 1
+
+    def test_async_timeout(self, tmp_path: Any) -> None:
+        self._setup_hanging_lsb_release(tmp_path)
+        count = distro.command_timeout_counts().get("lsb_release", 0)
+        _distro = distro.LinuxDistribution(
+            include_lsb=True, command_timeouts={"lsb_release": 0.5}
+        )
+        assert asyncio.run(_distro.ainfo())["id"] == "centos"
+        assert _distro.lsb_release_info() == {}
+        self._assert_killed()
+        assert distro.command_timeout_counts()["lsb_release"] == count + 1
+
+    def test_async_cancel(self, tmp_path: Any) -> None:
+        self._setup_hanging_lsb_release(tmp_path)
+        _distro = distro.LinuxDistribution(include_lsb=True)
+
+        async def main() -> None:
+            task = asyncio.ensure_future(_distro.ainfo())
+            while not self.pid_file.exists() or not self.pid_file.read_text():
+                await asyncio.sleep(0.05)
+            # Cancelling a caller does not cancel the shared resolution, but
+            # cancelling the resolution (e.g. at event loop shutdown) does.
+            assert _distro._aresolving is not None
+            _distro._aresolving.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(asyncio.wait_for(main(), 30))
+        self._assert_killed()
+
+    def test_in_time(self) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        count = distro.command_timeout_counts()
+        expected = distro.LinuxDistribution().lsb_release_info()
+        _distro = distro.LinuxDistribution(command_timeouts={"lsb_release": 30})
+        assert _distro.lsb_release_info() == expected
+        assert _distro.lsb_release_info()["distributor_id"] == "Ubuntu"
+        assert distro.command_timeout_counts() == count
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestPrefetch(DistroTestCase):
+    @pytest.mark.parametrize("dist", ("centos7", "freebsd111", "ubuntu16"))
+    def test_same_as_lazy(self, dist: str) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, dist))
+        expected = distro.LinuxDistribution()
+        _distro = distro.LinuxDistribution(prefetch=True)
+        assert _distro.id() == expected.id()
+        assert _distro.info() == expected.info()
+        assert _distro.os_release_info() == expected.os_release_info()
+        assert _distro.lsb_release_info() == expected.lsb_release_info()
+        assert _distro.distro_release_info() == expected.distro_release_info()
+        assert _distro._uname_info == expected._uname_info
+        assert _distro.distro_release_file == expected.distro_release_file
+
+    def test_concurrent(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        # Both data sources can only pass the barrier if they are resolved
+        # at the same time.
+        barrier = threading.Barrier(2, timeout=10)
+
+        def _run_lsb_release(self: distro.LinuxDistribution) -> Dict[str, str]:
+            barrier.wait()
+            return {"distributor_id": "Lsb"}
+
+        def _read_distro_release_info(
+            self: distro.LinuxDistribution,
+        ) -> Dict[str, str]:
+            barrier.wait()
+            return {"id": "release"}
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_run_lsb_release", _run_lsb_release
+        )
+        monkeypatch.setattr(
+            distro.LinuxDistribution,
+            "_read_distro_release_info",
+            _read_distro_release_info,
+        )
+        _distro = distro.LinuxDistribution(prefetch=True)
+        assert _distro.lsb_release_attr("distributor_id") == "Lsb"
+        assert _distro.distro_release_attr("id") == "release"
+
+    def test_futures_published_before_start(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # The first data source to start sees the futures of all the others.
+        seen: List[List[str]] = []
+        read_os_release_info = distro._PREFETCHABLE_SOURCES["_os_release_info"]
+
+        def _os_release_info(self: distro.LinuxDistribution) -> Dict[str, str]:
+            seen.append(sorted(self._prefetching))
+            return read_os_release_info(self)  # type: ignore
+
+        monkeypatch.setitem(
+            distro._PREFETCHABLE_SOURCES, "_os_release_info", _os_release_info
+        )
+        _distro = distro.LinuxDistribution(include_oslevel=False, prefetch=True)
+        _distro.info()
+        assert seen == [
+            [
+                "_distro_release_info",
+                "_lsb_release_info",
+                "_os_release_info",
+                "_uname_info",
+            ]
+        ]
+
+    def test_only_included_sources(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def _fail(self: distro.LinuxDistribution) -> NoReturn:
+            raise AssertionError("data source must not be resolved")
+
+        monkeypatch.setattr(distro.LinuxDistribution, "_run_lsb_release", _fail)
+        _distro = distro.LinuxDistribution(
+            include_lsb=False,
+            include_uname=False,
+            include_oslevel=False,
+            prefetch=True,
+        )
+        assert sorted(_distro._prefetching) == [
+            "_distro_release_info",
+            "_os_release_info",
+        ]
+        assert _distro.lsb_release_info() == {}
+
+    def test_error(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def _read_os_release_file(self: distro.LinuxDistribution) -> NoReturn:
+            raise OSError("unreadable")
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_read_os_release_file", _read_os_release_file
+        )
+        _distro = distro.LinuxDistribution(include_lsb=False, prefetch=True)
+        with pytest.raises(OSError):
+            _distro.os_release_info()
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestDeadline(DistroTestCase):
+    def setup_method(self, test_method: FunctionType) -> None:
+        super().setup_method(test_method)
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        self.lsb_release_done = threading.Event()
+
+    def teardown_method(self, test_method: FunctionType) -> None:
+        self.lsb_release_done.set()
+        super().teardown_method(test_method)
+
+    def _slow_lsb_release(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        run_lsb_release = distro.LinuxDistribution._run_lsb_release
+
+        def _run_lsb_release(_distro: distro.LinuxDistribution) -> Dict[str, str]:
+            self.lsb_release_done.wait()
+            return run_lsb_release(_distro)
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_run_lsb_release", _run_lsb_release
+        )
+
+    def test_complete(self) -> None:
+        expected = distro.LinuxDistribution()
+        _distro = distro.LinuxDistribution()
+        assert _distro.info(True, True, deadline=5) == expected.info(True, True)
+        assert _distro.skipped_sources() == []
+        assert _distro.name(True, deadline=5) == expected.name(True)
+        assert _distro.version(True, True, deadline=5) == expected.version(True, True)
+        assert _distro.codename(deadline=5) == expected.codename()
+        assert _distro.skipped_sources() == []
+
+    def test_skipped(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        expected = distro.LinuxDistribution()
+        expected_info = expected.info(best=True)
+        expected.__dict__["_lsb_release_info"] = {}
+        self._slow_lsb_release(monkeypatch)
+        _distro = distro.LinuxDistribution()
+        assert _distro.info(best=True, deadline=0.5) == expected.info(best=True)
+        assert _distro.skipped_sources() == ["lsb_release_info"]
+        assert "_lsb_release_info" not in _distro.__dict__
+
+        self.lsb_release_done.set()
+        assert _distro.info(best=True, deadline=5) == expected_info
+        assert _distro.skipped_sources() == []
+        assert _distro.info(best=True) == expected_info
+
+    def test_unused_source_not_waited_for(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        self._slow_lsb_release(monkeypatch)
+        _distro = distro.LinuxDistribution()
+        assert _distro.version(deadline=60) == "16.04"
+        assert _distro.name(deadline=60) == "Ubuntu"
+        assert _distro.skipped_sources() == []
+
+    def test_skipped_per_thread(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._slow_lsb_release(monkeypatch)
+        _distro = distro.LinuxDistribution()
+        _distro.info(best=True, deadline=0.5)
+        assert _distro.skipped_sources() == ["lsb_release_info"]
+        skipped: List[List[str]] = []
+        thread = threading.Thread(
+            target=lambda: skipped.append(_distro.skipped_sources())
+        )
+        thread.start()
+        thread.join()
+        assert skipped == [[]]
+
+    def test_exit_with_hanging_command(self, tmp_path: Any) -> None:
+        pid_file = tmp_path / "pid"
+        (tmp_path / "lsb_release").write_text(
+            f"#!/bin/sh\necho $$ >{pid_file}\nexec /bin/sleep 30\n"
+        )
+        (tmp_path / "lsb_release").chmod(0o755)
+        etc_dir = os.path.join(DISTROS_DIR, "ubuntu16", "etc")
+        script = f"""if True:
+            import distro
+
+            _distro = distro.LinuxDistribution(
+                os_release_file={os.path.join(etc_dir, "os-release")!r},
+                distro_release_file={os.path.join(etc_dir, "lsb-release")!r},
+                include_uname=False,
+                include_oslevel=False,
+            )
+            print(_distro.version(best=True, deadline=0.3))
+        """
+        env = dict(os.environ, PATH=str(tmp_path), PYTHONPATH=os.pathsep.join(sys.path))
+        # The interpreter exits without waiting for lsb_release, which is
+        # killed here so that it does not hold on to the pipes of pytest.
+        try:
+            r = subprocess.run(
+                [sys.executable, "-c", script],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                encoding="utf-8",
+                env=env,
+                timeout=20,
+            )
+        finally:
+            if pid_file.exists():
+                try:
+                    os.kill(int(pid_file.read_text()), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        assert pid_file.exists()
+        assert r.stdout == "16.04.1\n"
+
+    def test_module_functions(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        expected = distro.LinuxDistribution()
+        monkeypatch.setattr(distro, "_distro_instance", distro.LinuxDistribution())
+        assert distro.info(deadline=5) == expected.info()
+        assert distro.name(deadline=5) == expected.name()
+        assert distro.version(deadline=5) == expected.version()
+        assert distro.codename(deadline=5) == expected.codename()
+        assert distro.skipped_sources() == []
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestAsync(DistroTestCase):
+    def _no_commands(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def _fail(self: distro.LinuxDistribution) -> NoReturn:
+            raise AssertionError("command must be run as an asyncio subprocess")
+
+        for method in ("_run_lsb_release", "_run_uname"):
+            monkeypatch.setattr(distro.LinuxDistribution, method, _fail)
+
+    @pytest.mark.parametrize("dist", ("centos7", "freebsd111", "ubuntu16"))
+    def test_same_as_info(self, monkeypatch: pytest.MonkeyPatch, dist: str) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, dist))
+        expected = distro.LinuxDistribution()
+        expected_info = expected.info(pretty=True, best=True)
+        expected.lsb_release_info()
+
+        self._no_commands(monkeypatch)
+        _distro = distro.LinuxDistribution()
+        assert asyncio.run(_distro.ainfo(pretty=True, best=True)) == expected_info
+        assert _distro.lsb_release_info() == expected.lsb_release_info()
+        assert _distro.distro_release_info() == expected.distro_release_info()
+        assert _distro.os_release_info() == expected.os_release_info()
+        assert _distro._uname_info == expected._uname_info
+        assert _distro._oslevel_info == expected._oslevel_info
+
+    def test_uname_command(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "openbsd62"))
+        monkeypatch.delattr(os, "uname")
+        self._no_commands(monkeypatch)
+        _distro = distro.LinuxDistribution()
+        assert asyncio.run(_distro.ainfo())["id"] == "openbsd"
+        assert _distro._uname_info == {
+            "id": "openbsd",
+            "name": "OpenBSD",
+            "release": "6.2",
+        }
+
+    def test_command_error(self) -> None:
+        self._setup_for_distro(os.path.join(TESTDISTROS, "lsb", "lsb_rc001"))
+        _distro = distro.LinuxDistribution()
+        asyncio.run(_distro.ainfo())
+        assert _distro.lsb_release_info() == {}
+        assert _distro._oslevel_info == ""
+
+    def test_single_resolution(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        calls = []
+        resolve_file_sources = distro.LinuxDistribution._resolve_file_sources
+
+        def _resolve_file_sources(self: distro.LinuxDistribution) -> List[str]:
+            calls.append(self)
+            return resolve_file_sources(self)
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_resolve_file_sources", _resolve_file_sources
+        )
+        _distro = distro.LinuxDistribution()
+
+        async def main() -> List[distro.InfoDict]:
+            return await asyncio.gather(*(_distro.ainfo() for _ in range(5)))
+
+        infos = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(info == _distro.info() for info in infos)
+        assert infos[0]["id"] == "ubuntu"
+        asyncio.run(_distro.ainfo())
+        assert len(calls) == 1
+
+    def test_retry_after_error(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "centos7"))
+        resolve_file_sources = distro.LinuxDistribution._resolve_file_sources
+        errors = [OSError("unreadable")]
+
+        def _resolve_file_sources(self: distro.LinuxDistribution) -> List[str]:
+            if errors:
+                raise errors.pop()
+            return resolve_file_sources(self)
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_resolve_file_sources", _resolve_file_sources
+        )
+        _distro = distro.LinuxDistribution()
+        with pytest.raises(OSError):
+            asyncio.run(_distro.ainfo())
+        assert asyncio.run(_distro.ainfo())["id"] == "centos"
+
+    def test_prefetch(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._setup_for_distro(os.path.join(DISTROS_DIR, "ubuntu16"))
+        expected = distro.LinuxDistribution().info()
+        _distro = distro.LinuxDistribution(prefetch=True)
+        assert asyncio.run(_distro.ainfo()) == expected
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestAio:
+    """Test that the functions of distro.aio return the same as the
+    module-level functions of distro."""
+
+    @pytest.mark.parametrize("name", aio.__all__)
+    def test_function(self, name: str) -> None:
+        args: Tuple[Any, ...] = ("id",) if name.endswith("_attr") else ()
+        expected = getattr(distro, name)(*args)
+        assert asyncio.run(getattr(aio, name)(*args)) == expected
+
+    def test_lazy_import(self) -> None:
+        script = """if True:
+            import sys
+            import distro
+
+            print("distro.aio" in sys.modules)
+            print(distro.aio is sys.modules["distro.aio"])
+        """
+        r = subprocess.run(
+            [sys.executable, "-c", script],
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+        )
+        assert r.stdout == "False\nTrue\n"
+
+
 @pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
 class TestOSReleaseParsing:
     """Test the parsing of os-release files."""
@@ -2648,6 +3775,1290 @@ class TestOSReleaseParsing:
         assert props.get("key2", None) == "value  2"
 
 
+def _shlex_split(content: str) -> Any:
+    """Split like the shlex based parser used to, for differential tests."""
+    lexer = shlex.shlex(io.StringIO(content), posix=True)
+    lexer.whitespace_split = True
+    try:
+        return list(lexer)
+    except ValueError as ex:
+        return str(ex)
+
+
+def _split(content: str) -> Any:
+    try:
+        return distro._split_os_release_content(content)
+    except ValueError as ex:
+        return str(ex)
+
+
+def _resource_files() -> List[str]:
+    files: List[str] = []
+    for dirpath, _, filenames in os.walk(RESOURCES):
+        files.extend(os.path.join(dirpath, filename) for filename in filenames)
+    return sorted(files)
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestOSReleaseSplitting:
+    """Test that the os-release parser splits words exactly like shlex."""
+
+    @pytest.mark.parametrize(
+        "path", _resource_files(), ids=lambda path: os.path.relpath(path, RESOURCES)
+    )
+    def test_resource_file(self, path: str) -> None:
+        with open(path, encoding="utf-8", errors="surrogateescape") as fp:
+            content = fp.read()
+        assert _split(content) == _shlex_split(content)
+
+    @pytest.mark.parametrize(
+        "content",
+        (
+            "",
+            "KEY=value#comment\nKEY2=value2",
+            "KEY=a#comment",
+            "# comment\r\nKEY=value",
+            'KEY="a \\\\ b \\x c \\"d\\""',
+            "KEY='a \\ b'",
+            "KEY=a\\\nb",
+            "KEY=a\\ b 'c'\"d\"e",
+            "KEY=''",
+            "''",
+            "KEY='unclosed",
+            'KEY="unclosed',
+            'KEY="escaped\\',
+            "KEY=escaped\\",
+            "\\",
+            "\\\n",
+        ),
+    )
+    def test_syntax(self, content: str) -> None:
+        assert _split(content) == _shlex_split(content)
+
+    def test_random(self) -> None:
+        rng = random.Random(0)
+        alphabet = "a=  \t\r\n#'\"\\\u00e9"
+        for _ in range(5000):
+            length = rng.randint(0, 16)
+            content = "".join(rng.choice(alphabet) for _ in range(length))
+            assert _split(content) == _shlex_split(content), repr(content)
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestOSReleasePartialParsing:
+    """Test the parsing of os-release files only as far as needed."""
+
+    def _parser(self, content: str) -> Any:
+        return distro._OSReleaseParser(content)
+
+    def test_stops_after_key(self) -> None:
+        parser = self._parser('NAME="Distro"\nID=distro\nVERSION_ID=1\n')
+        assert parser.get("id") == "distro"
+        assert not parser.done
+        assert "version_id" not in parser.props
+        assert parser.get("name") == "Distro"
+        assert parser.get("version_id") == "1"
+
+    def test_missing_key(self) -> None:
+        parser = self._parser("ID=distro\n")
+        assert parser.get("version_id") == ""
+        assert parser.done
+
+    @pytest.mark.parametrize(
+        "content",
+        (
+            "ID=first\nNAME=x\nID=distro\n",
+            "ID=first\nNAME=x\nId=distro\n",
+            'ID=first\nNAME=x\n"ID"=distro\n',
+            "ID=first\nNAME=x\nI'D'=distro\n",
+            "ID=first\nNAME=x\nI\\D=distro\n",
+            'ID=first\nNAME="x"ID=other ID=distro\n',
+        ),
+    )
+    def test_last_assignment_wins(self, content: str) -> None:
+        assert self._parser(content).get("id") == "distro"
+
+    def test_key_in_later_value(self) -> None:
+        parser = self._parser('ID=distro\nPRETTY_NAME="ID=other"\n')
+        assert parser.get("id") == "distro"
+        assert parser.done
+
+    def test_consistency_with_full_parsing(self) -> None:
+        for dist in DISTROS:
+            root_dir = os.path.join(DISTROS_DIR, dist)
+            info = distro.LinuxDistribution(root_dir=root_dir).os_release_info()
+            for key, value in info.items():
+                _distro = distro.LinuxDistribution(root_dir=root_dir)
+                assert _distro.os_release_attr(key) == value, (dist, key)
+                assert _distro.os_release_info() == info, dist
+
+    def test_concurrent_use(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        content = "".join(f"KEY{i}=value{i}\n" for i in range(50))
+        parser = self._parser(content)
+        active: List[None] = []
+        overlaps = []
+        parse_assignment = distro._OSReleaseParser._parse_assignment
+
+        def _parse_assignment(self: Any) -> Optional[str]:
+            overlaps.append(len(active))
+            active.append(None)
+            try:
+                # Give the other threads a chance to enter the parser.
+                time.sleep(0.0001)
+                return parse_assignment(self)
+            finally:
+                active.pop()
+
+        monkeypatch.setattr(
+            distro._OSReleaseParser, "_parse_assignment", _parse_assignment
+        )
+        keys = [f"key{i}" for i in range(0, 50, 7)]
+        values: Dict[str, str] = {}
+        threads = [
+            threading.Thread(
+                target=lambda key=key: values.update({key: parser.get(key)})
+            )
+            for key in keys
+        ]
+        threads.append(threading.Thread(target=parser.parse_all))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert values == {key: f"value{key[3:]}" for key in keys}
+        assert len(parser.props) == 50
+        assert not any(overlaps)
+
+    def test_id_parses_partially(self) -> None:
+        root_dir = os.path.join(DISTROS_DIR, "ubuntu16")
+        _distro = distro.LinuxDistribution(root_dir=root_dir)
+        assert _distro.id() == "ubuntu"
+        assert "_os_release_info" not in _distro.__dict__
+        assert not _distro._os_release_parser.done
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestFileReading:
+    """Test that the bytes-level file readers behave like text mode files."""
+
+    def _write(self, tmp_path: Any, name: str, content: bytes) -> str:
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+
+    def _text_mode_read(self, path: str) -> str:
+        with open(path, encoding="utf-8") as fp:
+            return fp.read()
+
+    def _text_mode_readline(self, path: str) -> str:
+        with open(path, encoding="utf-8") as fp:
+            return fp.readline()
+
+    @pytest.mark.parametrize(
+        "content",
+        (
+            b"",
+            b"ID=a\n",
+            b"ID=a\r\nNAME='x\r\ny'\r\n",
+            b"# comment\rID=a\r",
+            b'NAME="\xc3\x89"\n',
+            b"ID=a\n" + b"X" * 20000 + b"\nNAME=b\n",
+        ),
+    )
+    def test_os_release_file(self, tmp_path: Any, content: bytes) -> None:
+        path = self._write(tmp_path, "os-release", content)
+        _distro = distro.LinuxDistribution(
+            include_lsb=False,
+            os_release_file=path,
+            file_size_limits={"os_release": 65536},
+        )
+        expected = distro.LinuxDistribution._parse_os_release_content(
+            self._text_mode_read(path)
+        )
+        assert _distro.os_release_info() == expected
+
+    @pytest.mark.parametrize(
+        "content",
+        (
+            b"",
+            b"\n",
+            b"Distro release 1.0 (Code)",
+            b"Distro release 1.0 (Code)\nsecond line\n",
+            b"Distro release 1.0 (Code)\r\nsecond line\r\n",
+            b"Distro release 1.0\rsecond line",
+        ),
+    )
+    def test_distro_release_file(self, tmp_path: Any, content: bytes) -> None:
+        path = self._write(tmp_path, "distro-release", content)
+        _distro = distro.LinuxDistribution(include_lsb=False)
+        expected = _distro._parse_distro_release_content(self._text_mode_readline(path))
+        assert _distro._parse_distro_release_file(path) == expected
+
+    def test_distro_release_file_only_first_line_decoded(self, tmp_path: Any) -> None:
+        path = self._write(tmp_path, "distro-release", b"\xc3\x89 Linux 2\n\xff")
+        _distro = distro.LinuxDistribution(include_lsb=False)
+        assert _distro._parse_distro_release_file(path) == {
+            "name": "\u00c9 Linux",
+            "version_id": "2",
+        }
+
+    def test_os_release_file_is_directory(self, tmp_path: Any) -> None:
+        _distro = distro.LinuxDistribution(
+            include_lsb=False, os_release_file=str(tmp_path)
+        )
+        assert _distro.os_release_info() == {}
+
+    def test_debian_version(self, tmp_path: Any) -> None:
+        (tmp_path / "etc").mkdir()
+        self._write(tmp_path, "etc/debian_version", b"12.5  \r\nextra\n")
+        _distro = distro.LinuxDistribution(root_dir=str(tmp_path))
+        assert _distro._debian_version == "12.5"
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestFileSizeLimits:
+    def _root_dir(self, tmp_path: Any, files: Dict[str, bytes]) -> str:
+        (tmp_path / "etc").mkdir()
+        for name, content in files.items():
+            (tmp_path / "etc" / name).write_bytes(content)
+        return str(tmp_path)
+
+    def test_read_file_size(self, tmp_path: Any) -> None:
+        path = tmp_path / "file"
+        path.write_bytes(b"x" * 20000)
+        assert distro._read_file(str(path), 5) == b"xxxxx"
+        assert distro._read_file(str(path), 10000) == b"x" * 10000
+        assert distro._read_file(str(path), 30000) == b"x" * 20000
+
+    def test_os_release_truncated(self, tmp_path: Any) -> None:
+        content = b"ID=a\n" + b"#" * 9000 + b"\nNAME=b\n"
+        root_dir = self._root_dir(tmp_path, {"os-release": content})
+        _distro = distro.LinuxDistribution(root_dir=root_dir)
+        assert _distro.os_release_info() == {"id": "a"}
+        assert _distro.oversized_files() == {
+            os.path.join(root_dir, "etc", "os-release"): "truncated"
+        }
+
+    def test_os_release_within_limit(self, tmp_path: Any) -> None:
+        root_dir = self._root_dir(tmp_path, {"os-release": b"ID=a\nNAME=b\n"})
+        _distro = distro.LinuxDistribution(root_dir=root_dir)
+        assert _distro.os_release_info() == {"id": "a", "name": "b"}
+        assert _distro.oversized_files() == {}
+
+    def test_custom_limit(self, tmp_path: Any) -> None:
+        content = b"ID=a\nNAME=b\nVERSION_ID=1\n"
+        root_dir = self._root_dir(tmp_path, {"os-release": content})
+        _distro = distro.LinuxDistribution(
+            root_dir=root_dir, file_size_limits={"os_release": 12}
+        )
+        assert _distro.os_release_info() == {"id": "a", "name": "b"}
+        assert "file_size_limits={'os_release': 12}" in repr(_distro)
+
+    def test_distro_release_skipped(self, tmp_path: Any) -> None:
+        root_dir = self._root_dir(
+            tmp_path,
+            {
+                "a-release": b"A" * 9000,
+                "centos-release": b"CentOS Linux release 7.1.1503 (Core)\n",
+            },
+        )
+        _distro = distro.LinuxDistribution(root_dir=root_dir)
+        assert _distro.distro_release_attr("id") == "centos"
+        assert _distro.oversized_files() == {
+            os.path.join(root_dir, "etc", "a-release"): "skipped"
+        }
+
+    def test_distro_release_long_file(self, tmp_path: Any) -> None:
+        content = b"CentOS Linux release 7.1.1503 (Core)\n" + b"x" * 9000
+        root_dir = self._root_dir(tmp_path, {"centos-release": content})
+        _distro = distro.LinuxDistribution(root_dir=root_dir)
+        assert _distro.distro_release_attr("version_id") == "7.1.1503"
+        assert _distro.oversized_files() == {}
+
+    def test_debian_version_skipped(self, tmp_path: Any) -> None:
+        root_dir = self._root_dir(tmp_path, {"debian_version": b"1" * 9000})
+        _distro = distro.LinuxDistribution(root_dir=root_dir)
+        assert _distro._debian_version == ""
+        assert _distro.oversized_files() == {
+            os.path.join(root_dir, "etc", "debian_version"): "skipped"
+        }
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestScanRoots:
+    roots = [os.path.join(DISTROS_DIR, dist) for dist in sorted(DISTROS)]
+
+    def _expected(self, root: str) -> distro.InfoDict:
+        return distro.LinuxDistribution(root_dir=root).info()
+
+    def test_ordered(self) -> None:
+        assert list(distro.scan_roots(iter(self.roots), workers=4)) == [
+            (root, self._expected(root)) for root in self.roots
+        ]
+
+    def test_unordered(self) -> None:
+        results = distro.scan_roots(self.roots, workers=4, ordered=False)
+        assert sorted(results, key=lambda result: result[0]) == [
+            (root, self._expected(root)) for root in self.roots
+        ]
+
+    def test_info_arguments(self) -> None:
+        root = os.path.join(DISTROS_DIR, "ubuntu14")
+        assert list(distro.scan_roots([root], pretty=True, best=True)) == [
+            (root, distro.LinuxDistribution(root_dir=root).info(True, True))
+        ]
+
+    def test_error(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bad_root = self.roots[1]
+        info = distro.LinuxDistribution.info
+
+        def _info(self: distro.LinuxDistribution, *args: Any) -> distro.InfoDict:
+            if self.root_dir == bad_root:
+                raise OSError("bad root")
+            return info(self, *args)
+
+        monkeypatch.setattr(distro.LinuxDistribution, "info", _info)
+        results = list(distro.scan_roots(self.roots[:3], workers=2))
+        assert [root for root, _ in results] == self.roots[:3]
+        assert isinstance(results[1][1], OSError)
+        assert results[2] == (self.roots[2], self._expected(self.roots[2]))
+
+    def test_concurrent(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        roots = [
+            root
+            for root in self.roots
+            if os.path.isfile(os.path.join(root, "etc", "os-release"))
+        ][:4]
+        expected = [(root, self._expected(root)) for root in roots]
+        # The roots can only pass the barrier if they are detected at the same
+        # time.
+        barrier = threading.Barrier(len(roots), timeout=10)
+        read_os_release_file = distro.LinuxDistribution._read_os_release_file
+
+        def _read_os_release_file(self: distro.LinuxDistribution) -> Dict[str, str]:
+            barrier.wait()
+            return read_os_release_file(self)
+
+        monkeypatch.setattr(
+            distro.LinuxDistribution, "_read_os_release_file", _read_os_release_file
+        )
+        assert list(distro.scan_roots(roots, workers=len(roots))) == expected
+
+    def test_invalid_arguments(self) -> None:
+        results = list(distro.scan_roots(self.roots[:2], include_uname=True))
+        assert all(isinstance(result, ValueError) for _, result in results)
+
+    def test_invalid_workers(self) -> None:
+        with pytest.raises(ValueError):
+            distro.scan_roots(self.roots, workers=0)
+
+    def test_invalid_pool(self) -> None:
+        with pytest.raises(ValueError):
+            distro.scan_roots(self.roots, pool="fiber")
+        with pytest.raises(ValueError):
+            distro.scan_roots(self.roots, pool="process", chunksize=0)
+
+    @pytest.mark.parametrize("chunksize", (1, 7, 1000))
+    @pytest.mark.parametrize("ordered", (True, False))
+    def test_process_pool(self, chunksize: int, ordered: bool) -> None:
+        results = list(
+            distro.scan_roots(
+                iter(self.roots),
+                workers=2,
+                ordered=ordered,
+                pool="process",
+                chunksize=chunksize,
+            )
+        )
+        if not ordered:
+            results.sort(key=lambda result: result[0])
+        assert results == [(root, self._expected(root)) for root in self.roots]
+
+    def test_process_pool_error(self) -> None:
+        results = list(
+            distro.scan_roots(
+                self.roots[:3], workers=2, pool="process", include_uname=True
+            )
+        )
+        assert [root for root, _ in results] == self.roots[:3]
+        assert all(isinstance(result, ValueError) for _, result in results)
+
+    def test_process_pool_closed(self) -> None:
+        results = distro.scan_roots(
+            self.roots * 10, workers=2, pool="process", chunksize=1
+        )
+        assert next(results) == (self.roots[0], self._expected(self.roots[0]))
+        results.close()
+
+    def test_unordered_slow_root(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        slow_root = self.roots[0]
+        release = threading.Event()
+        info = distro.LinuxDistribution.info
+
+        def _info(self: distro.LinuxDistribution, *args: Any) -> distro.InfoDict:
+            if self.root_dir == slow_root:
+                assert release.wait(30)
+            return info(self, *args)
+
+        monkeypatch.setattr(distro.LinuxDistribution, "info", _info)
+        results = distro.scan_roots(self.roots[:3], workers=2, ordered=False)
+        try:
+            first_root, _ = next(results)
+        finally:
+            release.set()
+        assert first_root != slow_root
+        roots = [first_root] + [root for root, _ in results]
+        assert sorted(roots) == self.roots[:3]
+
+    def test_lazy_roots(self) -> None:
+        consumed = []
+
+        def roots() -> Any:
+            while True:
+                consumed.append(self.roots[0])
+                yield self.roots[0]
+
+        results = distro.scan_roots(roots(), workers=2)
+        for _ in range(10):
+            assert next(results) == (self.roots[0], self._expected(self.roots[0]))
+        results.close()
+        assert len(consumed) <= 10 + 2 * 4
+
+
+def _tar_bytes(members: List[Tuple[str, str]]) -> bytes:
+    """
+    Return a tar archive of *members*, given as (name, content) pairs, where
+    a content starting with "->" or "=>" is the target of a symbolic link or
+    hard link.
+    """
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            if content.startswith("->"):
+                info.type = tarfile.SYMTYPE
+                info.linkname = content[2:]
+            elif content.startswith("=>"):
+                info.type = tarfile.LNKTYPE
+                info.linkname = content[2:]
+            else:
+                info.size = len(content.encode())
+            tar.addfile(info, io.BytesIO(content.encode()))
+    return buf.getvalue()
+
+
+def _tar_files(
+    archive: IO[bytes], size: int, assume_sorted: bool = False
+) -> Dict[str, bytes]:
+    """Return the data source files read from a tar archive, by path name."""
+    layer = distro._read_tar_layer(archive, size, assume_sorted=assume_sorted)
+    files = distro._LayeredFiles([lambda targets: layer])
+    return {
+        path: files.read(path)
+        for path in [*layer.files, *layer.links]
+        if files.isfile(path)
+    }
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestFromTar:
+    @pytest.mark.parametrize(
+        "dist",
+        [d for d in DISTROS if os.path.isdir(os.path.join(DISTROS_DIR, d, "etc"))],
+    )
+    def test_same_as_root_dir(self, dist: str, tmp_path: Any) -> None:
+        root_dir = os.path.join(DISTROS_DIR, dist)
+        archive = str(tmp_path / "root.tar.gz")
+        with tarfile.open(archive, mode="w:gz") as tar:
+            tar.add(root_dir, arcname=".")
+        expected = distro.LinuxDistribution(root_dir=root_dir)
+        _distro = distro.LinuxDistribution.from_tar(archive)
+        assert _distro.info() == expected.info()
+        assert _distro.os_release_info() == expected.os_release_info()
+        assert _distro.distro_release_info() == expected.distro_release_info()
+        assert _distro.distro_release_file == (
+            expected.distro_release_file.replace(root_dir, "", 1)
+        )
+
+    @pytest.mark.parametrize("compress", (bytes, gzip.compress, lzma.compress))
+    def test_file_object(self, compress: Callable[[bytes], bytes]) -> None:
+        archive = _tar_bytes(
+            [
+                ("./etc/os-release", "ID=alpine\nVERSION_ID=3.20.0\n"),
+                ("./etc/alpine-release", "3.20.0\n"),
+            ]
+        )
+        _distro = distro.LinuxDistribution.from_tar(io.BytesIO(compress(archive)))
+        assert _distro.id() == "alpine"
+        assert _distro.version() == "3.20.0"
+        assert _distro.os_release_file == "/etc/os-release"
+
+    def test_links(self) -> None:
+        archive = _tar_bytes(
+            [
+                ("etc/centos-release", "CentOS Linux release 7.1.1503 (Core)\n"),
+                ("etc/os-release", "->../usr/lib/os-release"),
+                ("etc/redhat-release", "=>etc/centos-release"),
+                ("etc/system-release", "->/etc/redhat-release"),
+                ("etc/dangling-release", "->missing"),
+                ("usr/lib/os-release", "->../../usr/share/os-release"),
+                ("usr/share/os-release", "ID=centos\n"),
+            ]
+        )
+        files = _tar_files(io.BytesIO(archive), 100)
+        assert files == {
+            "/etc/centos-release": b"CentOS Linux release 7.1.1503 (Core)\n",
+            "/etc/os-release": b"ID=centos\n",
+            "/etc/redhat-release": b"CentOS Linux release 7.1.1503 (Core)\n",
+            "/etc/system-release": b"CentOS Linux release 7.1.1503 (Core)\n",
+            "/usr/lib/os-release": b"ID=centos\n",
+            "/usr/share/os-release": b"ID=centos\n",
+        }
+
+    def test_only_data_source_files(self) -> None:
+        archive = _tar_bytes(
+            [
+                ("etc/motd", "hello\n"),
+                ("etc/os-release", "ID=a\n" + "#" * 100),
+                ("etc/sub/b-release", "B release 1\n"),
+                ("usr/lib/os-release", "ID=b\n"),
+                ("usr/lib/x-release", "X release 1\n"),
+            ]
+        )
+        assert _tar_files(io.BytesIO(archive), 10) == {
+            "/etc/os-release": b"ID=a\n#####",
+            "/usr/lib/os-release": b"ID=b\n",
+        }
+
+    def test_sorted_archive_read_up_to_last_data_source(self) -> None:
+        archive = _tar_bytes(
+            [
+                ("etc/os-release", "ID=a\n"),
+                ("usr/lib/os-release", "ID=b\n"),
+                ("var/big", "x" * 100000),
+            ]
+        )
+        # The archive is cut in the middle of the last member.
+        truncated = io.BytesIO(archive[:50000])
+        assert _tar_files(truncated, 100, assume_sorted=True) == {
+            "/etc/os-release": b"ID=a\n",
+            "/usr/lib/os-release": b"ID=b\n",
+        }
+        with pytest.raises(tarfile.TarError):
+            with tarfile.open(fileobj=io.BytesIO(archive[:50000]), mode="r|") as tar:
+                tar.getmembers()
+        truncated = io.BytesIO(archive[:50000])
+        _distro = distro.LinuxDistribution.from_tar(truncated, assume_sorted=True)
+        assert _distro.id() == "a"
+        with pytest.raises(tarfile.TarError):
+            distro.LinuxDistribution.from_tar(io.BytesIO(archive[:50000]))
+
+    def test_unsorted_archive(self) -> None:
+        archive = _tar_bytes(
+            [
+                ("var/big", "x" * 1000),
+                ("etc/os-release", "ID=a\n"),
+                ("var/a", "a"),
+                ("etc/debian_version", "12.5\n"),
+            ]
+        )
+        assert _tar_files(io.BytesIO(archive), 100, assume_sorted=True) == {
+            "/etc/os-release": b"ID=a\n",
+            "/etc/debian_version": b"12.5\n",
+        }
+
+    @pytest.mark.parametrize(
+        "members, path",
+        (
+            (
+                [
+                    ("etc/hostname", "host\n"),
+                    ("usr/lib/x", "x"),
+                    ("usr/lib/os-release", "ID=a\n"),
+                ],
+                "/usr/lib/os-release",
+            ),
+            (
+                [
+                    ("bin/sh", "sh"),
+                    ("usr/share/x", "x"),
+                    ("etc/redhat-release", "A release 1\n"),
+                ],
+                "/etc/redhat-release",
+            ),
+        ),
+    )
+    def test_archive_unsorted_after_sorted_members(
+        self, members: List[Tuple[str, str]], path: str
+    ) -> None:
+        # The first members are sorted, and the data source file comes after
+        # a member that would be past it in a sorted archive.
+        archive = _tar_bytes(members)
+        content = dict(members)[path.lstrip("/")].encode()
+        assert _tar_files(io.BytesIO(archive), 100) == {path: content}
+        assert distro.LinuxDistribution.from_tar(io.BytesIO(archive)).info()["id"]
+        # The archive is only read partially when it is assumed to be sorted.
+        assert _tar_files(io.BytesIO(archive), 100, assume_sorted=True) == {}
+
+    def test_link_target_after_last_data_source(self) -> None:
+        archive = _tar_bytes(
+            [
+                ("etc/os-release", "->../var/os-release"),
+                ("usr/lib/x", "x"),
+                ("var/os-release", "ID=a\n"),
+                ("var/z", "x"),
+            ]
+        )
+        assert _tar_files(io.BytesIO(archive), 100) == {
+            "/etc/os-release": b"ID=a\n",
+            "/var/os-release": b"ID=a\n",
+        }
+
+    def test_file_size_limits(self) -> None:
+        content = "ID=a\n" + "#" * 10000 + "\nNAME=b\n"
+        archive = _tar_bytes([("etc/os-release", content)])
+        _distro = distro.LinuxDistribution.from_tar(io.BytesIO(archive))
+        assert _distro.os_release_info() == {"id": "a"}
+        assert _distro.oversized_files() == {"/etc/os-release": "truncated"}
+        _distro = distro.LinuxDistribution.from_tar(
+            io.BytesIO(archive), file_size_limits={"os_release": 20000}
+        )
+        assert _distro.os_release_info() == {"id": "a", "name": "b"}
+
+    def test_lsb_release_file(self) -> None:
+        archive = _tar_bytes(
+            [("etc/lsb-release", "DISTRIB_ID=Ubuntu\nDISTRIB_RELEASE=14.04\n")]
+        )
+        _distro = distro.LinuxDistribution.from_tar(
+            io.BytesIO(archive), lsb_source="file"
+        )
+        assert _distro.lsb_release_attr("release") == "14.04"
+
+    def test_unsupported_arguments(self) -> None:
+        archive = _tar_bytes([])
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_tar(
+                io.BytesIO(archive), cache_file="/tmp/cache"
+            )
+        with pytest.raises(ValueError, match="root_dir"):
+            distro.LinuxDistribution.from_tar(io.BytesIO(archive), root_dir="/tmp")
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_tar(io.BytesIO(archive), include_uname=True)
+
+    def test_invalid_archive(self) -> None:
+        with pytest.raises(tarfile.TarError):
+            distro.LinuxDistribution.from_tar(io.BytesIO(b"not an archive"))
+
+
+def _write_oci_layout(image_dir: Any, layers: List[bytes]) -> str:
+    """
+    Write an OCI image layout with the tar archives *layers*, from the bottom
+    one up, to *image_dir*, and return its path name.
+    """
+
+    def write_blob(content: bytes) -> Dict[str, Any]:
+        digest = hashlib.sha256(content).hexdigest()
+        (image_dir / "blobs" / "sha256" / digest).write_bytes(content)
+        return {"digest": f"sha256:{digest}", "size": len(content)}
+
+    (image_dir / "blobs" / "sha256").mkdir(parents=True)
+    (image_dir / "oci-layout").write_text('{"imageLayoutVersion": "1.0.0"}')
+    manifest = {
+        "schemaVersion": 2,
+        "mediaType": "application/vnd.oci.image.manifest.v1+json",
+        "config": write_blob(b"{}"),
+        "layers": [
+            {
+                "mediaType": "application/vnd.oci.image.layer.v1.tar+gzip",
+                **write_blob(gzip.compress(layer)),
+            }
+            for layer in layers
+        ],
+    }
+    descriptor = {
+        "mediaType": "application/vnd.oci.image.manifest.v1+json",
+        **write_blob(json.dumps(manifest).encode()),
+    }
+    (image_dir / "index.json").write_text(
+        json.dumps({"schemaVersion": 2, "manifests": [descriptor]})
+    )
+    return str(image_dir)
+
+
+def _docker_save_archive(path: Any, layers: List[bytes]) -> str:
+    """
+    Write a docker save archive with the tar archives *layers*, from the
+    bottom one up, to *path*, and return its path name.
+    """
+    names = [f"{i:064x}/layer.tar" for i in range(len(layers))]
+    manifest = [{"Config": "config.json", "RepoTags": [], "Layers": names}]
+    with tarfile.open(str(path), mode="w") as tar:
+        for name, content in [
+            ("manifest.json", json.dumps(manifest).encode()),
+            *zip(names, layers),
+        ]:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return str(path)
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestFromImage:
+    centos_layer = _tar_bytes(
+        [
+            ("etc/centos-release", "CentOS Linux release 7.1.1503 (Core)\n"),
+            ("etc/os-release", 'ID="centos"\nVERSION_ID="7"\n'),
+            ("etc/redhat-release", "->centos-release"),
+        ]
+    )
+
+    @pytest.mark.parametrize(
+        "dist",
+        [d for d in DISTROS if os.path.isdir(os.path.join(DISTROS_DIR, d, "etc"))],
+    )
+    def test_same_as_root_dir(self, dist: str, tmp_path: Any) -> None:
+        root_dir = os.path.join(DISTROS_DIR, dist)
+        layer = io.BytesIO()
+        with tarfile.open(fileobj=layer, mode="w") as tar:
+            tar.add(root_dir, arcname=".")
+        image = _write_oci_layout(tmp_path / "image", [layer.getvalue()])
+        expected = distro.LinuxDistribution(root_dir=root_dir)
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.info() == expected.info()
+        assert _distro.os_release_info() == expected.os_release_info()
+        assert _distro.distro_release_info() == expected.distro_release_info()
+
+    def test_docker_save_archive(self, tmp_path: Any) -> None:
+        upper_layer = _tar_bytes([("app/main.py", "")])
+        image = _docker_save_archive(
+            tmp_path / "image.tar", [self.centos_layer, upper_layer]
+        )
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.id() == "centos"
+        assert _distro.distro_release_attr("codename") == "Core"
+
+    @pytest.mark.parametrize("compress", (False, True))
+    def test_archive_opened_once(
+        self, compress: bool, tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        upper_layers = [_tar_bytes([(f"app/{i}.py", "")]) for i in range(4)]
+        image = _docker_save_archive(
+            tmp_path / "image.tar", [self.centos_layer, *upper_layers]
+        )
+        if compress:
+            (tmp_path / "image.tar").write_bytes(
+                gzip.compress((tmp_path / "image.tar").read_bytes())
+            )
+        opened = []
+        tarfile_open = tarfile.open
+
+        def _open(name: Any = None, *args: Any, **kwargs: Any) -> tarfile.TarFile:
+            opened.append(name)
+            return tarfile_open(name, *args, **kwargs)
+
+        monkeypatch.setattr(tarfile, "open", _open)
+        _distro = distro.LinuxDistribution.from_image(image)
+        # Listing the distro release files reads all layers.
+        assert _distro.distro_release_attr("id") == "centos"
+        assert [name for name in opened if name is not None] == [image]
+
+    def test_oci_layout_archive(self, tmp_path: Any) -> None:
+        image_dir = _write_oci_layout(tmp_path / "image", [self.centos_layer])
+        image = str(tmp_path / "image.tar")
+        with tarfile.open(image, mode="w") as tar:
+            for name in sorted(os.listdir(image_dir)):
+                tar.add(os.path.join(image_dir, name), arcname=name)
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.id() == "centos"
+
+    def test_whiteout(self, tmp_path: Any) -> None:
+        upper_layer = _tar_bytes(
+            [("etc/.wh.centos-release", ""), ("etc/.wh.os-release", "")]
+        )
+        image = _write_oci_layout(tmp_path, [self.centos_layer, upper_layer])
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.os_release_info() == {}
+        assert _distro.distro_release_info() == {}
+        assert _distro._files.distro_release_candidates("/etc") == []
+
+    def test_whiteout_directory(self, tmp_path: Any) -> None:
+        upper_layer = _tar_bytes([(".wh.etc", "")])
+        image = _write_oci_layout(tmp_path, [self.centos_layer, upper_layer])
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.os_release_info() == {}
+        assert _distro.distro_release_info() == {}
+
+    def test_opaque_directory(self, tmp_path: Any) -> None:
+        upper_layer = _tar_bytes(
+            [
+                ("etc/.wh..wh..opq", ""),
+                ("etc/fedora-release", "Fedora release 40 (Forty)\n"),
+            ]
+        )
+        image = _write_oci_layout(tmp_path, [self.centos_layer, upper_layer])
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.os_release_info() == {}
+        assert _distro.distro_release_file == ""
+        assert _distro.distro_release_attr("id") == "fedora"
+        assert _distro.distro_release_file == "/etc/fedora-release"
+
+    def test_upper_layer_overrides(self, tmp_path: Any) -> None:
+        upper_layer = _tar_bytes(
+            [
+                ("etc/centos-release", "CentOS Linux release 7.9.2009 (Core)\n"),
+                ("etc/os-release", "->../usr/lib/os-release"),
+            ]
+        )
+        base_layer = _tar_bytes(
+            [("usr/lib/os-release", 'ID="centos"\nVERSION_ID="7.9"\n')]
+        )
+        image = _write_oci_layout(
+            tmp_path, [base_layer, self.centos_layer, upper_layer]
+        )
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.version() == "7.9"
+        # Through the link of the centos layer.
+        assert _distro.distro_release_attr("version_id") == "7.9.2009"
+        assert _distro._files.read("/etc/redhat-release").startswith(
+            b"CentOS Linux release 7.9.2009"
+        )
+
+    def test_lower_layers_read_on_demand(self, tmp_path: Any) -> None:
+        upper_layer = _tar_bytes([("etc/os-release", "ID=alpine\nVERSION_ID=3.20.0\n")])
+        image = _write_oci_layout(tmp_path, [b"not a tar archive", upper_layer])
+        _distro = distro.LinuxDistribution.from_image(image)
+        assert _distro.id() == "alpine"
+        assert _distro.version() == "3.20.0"
+        with pytest.raises(tarfile.TarError):
+            _distro.distro_release_info()
+
+    def test_image_index(self, tmp_path: Any) -> None:
+        attestation = {
+            "mediaType": "application/vnd.oci.image.manifest.v1+json",
+            "digest": "sha256:" + "0" * 64,
+            "platform": {"os": "unknown", "architecture": "unknown"},
+        }
+        image = _write_oci_layout(tmp_path, [self.centos_layer])
+        index = json.loads((tmp_path / "index.json").read_text())
+        # The attestation and the image manifest, in a nested index.
+        nested = json.dumps(
+            {"schemaVersion": 2, "manifests": [attestation, *index["manifests"]]}
+        )
+        digest = hashlib.sha256(nested.encode()).hexdigest()
+        (tmp_path / "blobs" / "sha256" / digest).write_text(nested)
+        index["manifests"] = [
+            {
+                "mediaType": "application/vnd.oci.image.index.v1+json",
+                "digest": f"sha256:{digest}",
+            }
+        ]
+        (tmp_path / "index.json").write_text(json.dumps(index))
+        assert distro.LinuxDistribution.from_image(image).id() == "centos"
+
+    def test_invalid_images(self, tmp_path: Any) -> None:
+        with pytest.raises(FileNotFoundError):
+            distro.LinuxDistribution.from_image(str(tmp_path / "missing"))
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_image(str(tmp_path))
+        (tmp_path / "index.json").write_text('{"manifests": [{"digest": "x"}]}')
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_image(str(tmp_path))
+        (tmp_path / "index.json").write_text(
+            '{"manifests": [{"digest": "sha256:../../etc/passwd"}]}'
+        )
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_image(str(tmp_path))
+        (tmp_path / "manifest.json").write_text('[{"Layers": ["../layer.tar"]}]')
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_image(str(tmp_path))
+
+    def test_unsupported_arguments(self, tmp_path: Any) -> None:
+        image = _write_oci_layout(tmp_path, [self.centos_layer])
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution.from_image(image, cache_file="/tmp/cache")
+        with pytest.raises(ValueError, match="root_dir"):
+            distro.LinuxDistribution.from_image(image, root_dir="/tmp")
+
+
+def _write_image_storage(
+    storage_dir: Any,
+    driver: str,
+    layers: Dict[str, Any],
+    images: List[List[str]],
+) -> List[str]:
+    """
+    Write the storage directory of a container engine with the storage
+    driver *driver* ("overlay2" for Docker, "overlay" for containers/storage)
+    to *storage_dir*, and return the IDs of its images.
+
+    *layers* are the layers by name, given as the path name of a directory
+    or as (name, content) pairs, where a content starting with "->" is the
+    target of a symbolic link. *images* are the names of the layers of the
+    images, from the bottom one up.
+    """
+    layer_ids: Dict[Tuple[str, ...], str] = {}
+    lower_links: Dict[str, List[str]] = {}
+    parents: Dict[str, Optional[str]] = {}
+    image_ids = []
+    for image in images:
+        chain_id = ""
+        parent = None
+        for i, name in enumerate(image):
+            diff_id = "sha256:" + hashlib.sha256(name.encode()).hexdigest()
+            chain = f"{chain_id} {diff_id}" if chain_id else diff_id
+            if chain_id:
+                chain_id = "sha256:" + hashlib.sha256(chain.encode()).hexdigest()
+            else:
+                chain_id = diff_id
+            layer_id = chain_id.split(":")[1]
+            layer_ids[tuple(image[: i + 1])] = layer_id
+            if layer_id in parents:
+                parent = layer_id
+                continue
+            parents[layer_id] = parent
+            layer_dir = storage_dir / driver / layer_id
+            layer_dir.mkdir(parents=True)
+            content = layers[name]
+            if isinstance(content, str):
+                os.symlink(content, str(layer_dir / "diff"))
+            else:
+                (layer_dir / "diff").mkdir()
+                for path, data in content:
+                    (layer_dir / "diff" / path).parent.mkdir(
+                        parents=True, exist_ok=True
+                    )
+                    if data.startswith("->"):
+                        os.symlink(data[2:], str(layer_dir / "diff" / path))
+                    else:
+                        (layer_dir / "diff" / path).write_text(data)
+            if driver == "overlay2":
+                short_id = layer_id[:26].upper()
+                (storage_dir / "overlay2" / "l").mkdir(exist_ok=True)
+                os.symlink(
+                    f"../{layer_id}/diff",
+                    str(storage_dir / "overlay2" / "l" / short_id),
+                )
+                (layer_dir / "link").write_text(short_id)
+                lower = lower_links.get(parent or "", [])
+                if lower:
+                    (layer_dir / "lower").write_text(":".join(lower))
+                lower_links[layer_id] = [f"l/{short_id}", *lower]
+                layer_db_dir = storage_dir / "image" / "overlay2" / "layerdb"
+                (layer_db_dir / "sha256" / layer_id).mkdir(parents=True)
+                (layer_db_dir / "sha256" / layer_id / "cache-id").write_text(layer_id)
+            parent = layer_id
+        if driver == "overlay2":
+            config = json.dumps(
+                {
+                    "rootfs": {
+                        "type": "layers",
+                        "diff_ids": [
+                            "sha256:" + hashlib.sha256(name.encode()).hexdigest()
+                            for name in image
+                        ],
+                    }
+                }
+            )
+            image_id = hashlib.sha256(config.encode()).hexdigest()
+            content_dir = storage_dir / "image" / "overlay2" / "imagedb" / "content"
+            (content_dir / "sha256").mkdir(parents=True, exist_ok=True)
+            (content_dir / "sha256" / image_id).write_text(config)
+            image_ids.append(f"sha256:{image_id}")
+        else:
+            image_ids.append(hashlib.sha256(" ".join(image).encode()).hexdigest())
+    if driver == "overlay":
+        (storage_dir / "overlay-layers").mkdir()
+        (storage_dir / "overlay-layers" / "layers.json").write_text(
+            json.dumps(
+                [
+                    {"id": layer_id, "parent": parent}
+                    for layer_id, parent in parents.items()
+                ]
+            )
+        )
+        (storage_dir / "overlay-images").mkdir()
+        (storage_dir / "overlay-images" / "images.json").write_text(
+            json.dumps(
+                [
+                    {"id": image_id, "layer": layer_ids[tuple(image)]}
+                    for image_id, image in zip(image_ids, images)
+                ]
+            )
+        )
+    return image_ids
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestScanImageStorage:
+    centos_layer = [
+        ("etc/centos-release", "CentOS Linux release 7.1.1503 (Core)\n"),
+        ("etc/os-release", 'ID="centos"\nVERSION_ID="7"\n'),
+        ("etc/redhat-release", "->centos-release"),
+    ]
+
+    def _scan(self, storage_dir: Any, **kwargs: Any) -> Dict[str, Any]:
+        return dict(distro.scan_image_storage(str(storage_dir), **kwargs))
+
+    @pytest.mark.parametrize("driver", ["overlay2", "overlay"])
+    def test_same_as_root_dir(self, driver: str, tmp_path: Any) -> None:
+        dists = [
+            d for d in DISTROS if os.path.isdir(os.path.join(DISTROS_DIR, d, "etc"))
+        ]
+        layers = {dist: os.path.join(DISTROS_DIR, dist) for dist in dists}
+        image_ids = _write_image_storage(
+            tmp_path, driver, layers, [[dist] for dist in dists]
+        )
+        results = self._scan(tmp_path)
+        assert sorted(results) == sorted(image_ids)
+        for image_id, dist in zip(image_ids, dists):
+            expected = distro.LinuxDistribution(root_dir=layers[dist])
+            assert results[image_id] == expected.info()
+
+    @pytest.mark.parametrize("driver", ["overlay2", "overlay"])
+    def test_layers(self, driver: str, tmp_path: Any) -> None:
+        layers = {
+            "centos": self.centos_layer,
+            "app": [("app/main.py", "")],
+            "update": [
+                ("etc/centos-release", "CentOS Linux release 7.9.2009 (Core)\n"),
+                ("etc/os-release", "->../usr/lib/os-release"),
+                ("usr/lib/os-release", 'ID="centos"\nVERSION_ID="7.9"\n'),
+            ],
+            "wipe": [("etc/.wh.centos-release", ""), ("etc/.wh.os-release", "")],
+        }
+        image_ids = _write_image_storage(
+            tmp_path,
+            driver,
+            layers,
+            [["centos"], ["centos", "app"], ["centos", "update"], ["centos", "wipe"]],
+        )
+        results = self._scan(tmp_path, best=True)
+        if driver == "overlay2":
+            # Docker images are listed in the order of their IDs.
+            assert list(results) == sorted(image_ids)
+        centos, app, update, wipe = (results[image_id] for image_id in image_ids)
+        assert centos["id"] == app["id"] == update["id"] == "centos"
+        assert centos["version"] == app["version"] == "7.1.1503"
+        assert update["version"] == "7.9.2009"
+        assert wipe["id"] == ""
+
+    def test_shared_layers_read_once(
+        self, tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        layers = {
+            "centos": self.centos_layer,
+            "app1": [("app/main.py", "")],
+            "app2": [("app/main.py", "")],
+        }
+        _write_image_storage(
+            tmp_path, "overlay2", layers, [["centos", "app1"], ["centos", "app2"]]
+        )
+        read_dirs = []
+        read_dir_layer = distro._read_dir_layer
+
+        def _read_dir_layer(layer_dir: str, *args: Any) -> Any:
+            read_dirs.append(os.path.realpath(layer_dir))
+            return read_dir_layer(layer_dir, *args)
+
+        monkeypatch.setattr(distro, "_read_dir_layer", _read_dir_layer)
+        results = self._scan(tmp_path)
+        assert [result["id"] for result in results.values()] == ["centos", "centos"]
+        assert len(read_dirs) == len(set(read_dirs)) == 3
+
+    def test_opaque_directory(self, tmp_path: Any) -> None:
+        layers = {
+            "centos": self.centos_layer,
+            "fedora": [
+                ("etc/.wh..wh..opq", ""),
+                ("etc/fedora-release", "Fedora release 40 (Forty)\n"),
+            ],
+        }
+        _write_image_storage(tmp_path, "overlay", layers, [["centos", "fedora"]])
+        [result] = self._scan(tmp_path).values()
+        assert result["id"] == "fedora"
+        assert result["version"] == "40"
+
+    def test_whiteout_directory(self, tmp_path: Any) -> None:
+        layers = {"centos": self.centos_layer, "wipe": [(".wh.etc", "")]}
+        _write_image_storage(tmp_path, "overlay", layers, [["centos", "wipe"]])
+        [result] = self._scan(tmp_path).values()
+        assert result["id"] == ""
+
+    def test_kernel_whiteouts(self, tmp_path: Any) -> None:
+        layers = {"centos": self.centos_layer, "wipe": [("etc/.keep", "")]}
+        _write_image_storage(tmp_path, "overlay", layers, [["centos", "wipe"]])
+        [keep] = tmp_path.glob("overlay/*/diff/etc/.keep")
+        etc_dir = keep.parent
+        try:
+            # The whiteouts of the kernel are character devices 0/0.
+            for name in ("centos-release", "os-release"):
+                os.mknod(str(etc_dir / name), stat.S_IFCHR | 0o600, 0)
+        except PermissionError:
+            pytest.skip("Creating character devices is not permitted")
+        [result] = self._scan(tmp_path).values()
+        assert result["id"] == ""
+
+    def test_opaque_directory_xattr(self, tmp_path: Any) -> None:
+        layers = {
+            "centos": self.centos_layer,
+            "fedora": [("etc/fedora-release", "Fedora release 40 (Forty)\n")],
+        }
+        _write_image_storage(tmp_path, "overlay", layers, [["centos", "fedora"]])
+        [fedora_release] = tmp_path.glob("overlay/*/diff/etc/fedora-release")
+        try:
+            os.setxattr(str(fedora_release.parent), "user.overlay.opaque", b"y")
+        except OSError:
+            pytest.skip("Extended attributes are not supported")
+        [result] = self._scan(tmp_path).values()
+        assert result["id"] == "fedora"
+
+    def test_links_not_followed_on_host(self, tmp_path: Any) -> None:
+        layers = {
+            "links": [
+                ("etc/os-release", "->/usr/lib/os-release"),
+                ("etc/centos-release", "->../../../../../../../etc/os-release"),
+                ("usr", "->/usr"),
+            ]
+        }
+        _write_image_storage(tmp_path, "overlay", layers, [["links"]])
+        [result] = self._scan(tmp_path).values()
+        assert result["id"] == ""
+
+    def test_links_resolved_in_image(self, tmp_path: Any) -> None:
+        layers = {
+            "base": [("usr/lib/os-release", 'ID="centos"\nVERSION_ID="7"\n')],
+            "links": [("etc/os-release", "->/usr/lib/os-release")],
+        }
+        _write_image_storage(tmp_path, "overlay2", layers, [["base", "links"]])
+        [result] = self._scan(tmp_path).values()
+        assert result["id"] == "centos"
+        assert result["version"] == "7"
+
+    def test_image_errors(self, tmp_path: Any) -> None:
+        layers = {"centos": self.centos_layer, "app": [("app/main.py", "")]}
+        image_ids = _write_image_storage(
+            tmp_path, "overlay", layers, [["centos"], ["centos", "app"]]
+        )
+        layers_json = tmp_path / "overlay-layers" / "layers.json"
+        # The base layer of both images is missing from the layer metadata.
+        layers_json.write_text(json.dumps(json.loads(layers_json.read_text())[1:]))
+        results = self._scan(tmp_path)
+        assert isinstance(results[image_ids[0]], KeyError)
+        assert isinstance(results[image_ids[1]], KeyError)
+
+        docker_dir = tmp_path / "docker"
+        image_ids = _write_image_storage(
+            docker_dir, "overlay2", layers, [["centos"], ["app"]]
+        )
+        app_layer_id = hashlib.sha256(b"app").hexdigest()
+        layer_db_dir = docker_dir / "image" / "overlay2" / "layerdb" / "sha256"
+        (layer_db_dir / app_layer_id / "cache-id").write_text("../../etc")
+        results = self._scan(docker_dir)
+        assert results[image_ids[0]]["id"] == "centos"
+        assert isinstance(results[image_ids[1]], ValueError)
+
+    def test_invalid_storage(self, tmp_path: Any) -> None:
+        with pytest.raises(ValueError):
+            distro.scan_image_storage(str(tmp_path))
+        _write_image_storage(tmp_path, "overlay", {"app": []}, [["app"]])
+        with pytest.raises(ValueError):
+            distro.scan_image_storage(str(tmp_path), cache_file="/tmp/cache")
+        with pytest.raises(ValueError, match="root_dir"):
+            distro.scan_image_storage(str(tmp_path), root_dir="/tmp")
+
+
+@pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
+class TestDistroReleaseDiscovery:
+    def test_candidates(self, tmp_path: Any) -> None:
+        for name in ("centos-release", "os-release", "motd", "lsb-release"):
+            (tmp_path / name).write_text("CentOS Linux release 7.1.1503 (Core)\n")
+        (tmp_path / "a-release").mkdir()
+        (tmp_path / "b-release").symlink_to(tmp_path / "missing")
+        (tmp_path / "c-release").symlink_to(tmp_path / "centos-release")
+        (tmp_path / "d-release").symlink_to(tmp_path / "a-release")
+        assert distro._distro_release_candidates(str(tmp_path)) == [
+            "c-release",
+            "centos-release",
+        ]
+
+    @pytest.mark.parametrize(
+        "dist",
+        [d for d in DISTROS if os.path.isdir(os.path.join(DISTROS_DIR, d, "etc"))],
+    )
+    def test_same_as_listdir(self, dist: str) -> None:
+        etc_dir = os.path.join(DISTROS_DIR, dist, "etc")
+        expected = sorted(
+            basename
+            for basename in os.listdir(etc_dir)
+            if basename not in distro._DISTRO_RELEASE_IGNORE_BASENAMES
+            and os.path.isfile(os.path.join(etc_dir, basename))
+            and distro._DISTRO_RELEASE_BASENAME_PATTERN.match(basename)
+        )
+        assert distro._distro_release_candidates(etc_dir) == expected
+
+    def test_missing_directory(self, tmp_path: Any) -> None:
+        with pytest.raises(OSError):
+            distro._distro_release_candidates(str(tmp_path / "missing"))
+
+    def _no_listing(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        def _fail(etc_dir: str) -> NoReturn:
+            raise AssertionError("etc directory must not be listed")
+
+        monkeypatch.setattr(distro, "_distro_release_candidates", _fail)
+
+    @pytest.mark.parametrize(
+        "dist",
+        [d for d in DISTROS if os.path.isdir(os.path.join(DISTROS_DIR, d, "etc"))],
+    )
+    def test_probe_same_as_list(self, dist: str) -> None:
+        root_dir = os.path.join(DISTROS_DIR, dist)
+        listed = distro.LinuxDistribution(root_dir=root_dir)
+        probed = distro.LinuxDistribution(root_dir=root_dir, release_discovery="probe")
+        assert probed.distro_release_info() == listed.distro_release_info()
+        assert probed.distro_release_file == listed.distro_release_file
+
+    def test_probe_does_not_list(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self._no_listing(monkeypatch)
+        _distro = distro.LinuxDistribution(
+            root_dir=os.path.join(DISTROS_DIR, "centos7"), release_discovery="probe"
+        )
+        assert _distro.distro_release_attr("id") == "centos"
+        assert os.path.basename(_distro.distro_release_file) == "centos-release"
+
+    def test_probe_os_release_id(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Any
+    ) -> None:
+        (tmp_path / "etc").mkdir()
+        (tmp_path / "etc" / "os-release").write_text("ID=almalinux\n")
+        (tmp_path / "etc" / "almalinux-release").write_text(
+            "AlmaLinux release 9.2 (Turquoise Kodkod)\n"
+        )
+        self._no_listing(monkeypatch)
+        _distro = distro.LinuxDistribution(
+            root_dir=str(tmp_path), release_discovery="probe"
+        )
+        assert _distro.distro_release_info() == {
+            "id": "almalinux",
+            "name": "AlmaLinux",
+            "version_id": "9.2",
+            "codename": "Turquoise Kodkod",
+        }
+
+    def test_probe_falls_back_to_list(self, tmp_path: Any) -> None:
+        (tmp_path / "etc").mkdir()
+        (tmp_path / "etc" / "os-release").write_text("ID=foo\n")
+        (tmp_path / "etc" / "bar-release").write_text("Bar release 1.0\n")
+        _distro = distro.LinuxDistribution(
+            root_dir=str(tmp_path), release_discovery="probe"
+        )
+        assert _distro.distro_release_attr("id") == "bar"
+
+    def test_unsupported_release_discovery(self) -> None:
+        with pytest.raises(ValueError):
+            distro.LinuxDistribution(release_discovery="glob")
+
+
 @pytest.mark.skipif(not IS_LINUX, reason="Irrelevant on non-linux")
 class TestGlobal:
     """Test the global module-level functions, and default values of their
@@ -2758,6 +5169,10 @@ class TestRepr:
                 "usr_lib_dir",
                 "_debian_version",
                 "_armbian_version",
+                "_os_release_parser",
+                "_lsb_release_items",
+                "_oversized_files",
+                "_aresolving",
             ):
                 continue
             assert f"{attr}=" in repr_str